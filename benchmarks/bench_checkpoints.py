@@ -0,0 +1,87 @@
+"""Disk usage and creation time of checkpoints.
+
+Compare the default ``FileCheckpoints`` of the ``FileContentsManager`` (one
+full copy of the file per checkpoint) with ``ContentAddressedCheckpoints``
+keeping 1 and 5 checkpoints per file.  A notebook with text and image
+outputs is edited one cell at a time and checkpointed after each edit, in
+several copies.
+
+    python benchmarks/bench_checkpoints.py [cells] [edits] [copies]
+"""
+from __future__ import print_function
+
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+# run from a checkout, without installing the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from nbformat.v4 import new_notebook, new_code_cell, new_output
+from notebook.services.contents.filemanager import FileContentsManager
+from traitlets.config import Config
+
+
+def make_notebook(cells):
+    return new_notebook(cells=[
+        new_code_cell('plot(%d)' % i, outputs=[
+            new_output('stream', text='step %d\n' % i * 200),
+            new_output('display_data', data={
+                'image/png': base64.b64encode(os.urandom(30000)).decode('ascii')}),
+        ]) for i in range(cells)])
+
+
+def disk_usage(directory):
+    total = 0
+    for parent, _, names in os.walk(directory):
+        for name in names:
+            total += os.path.getsize(os.path.join(parent, name))
+    return total
+
+
+def run(name, config, cells, edits, copies):
+    root_dir = tempfile.mkdtemp()
+    try:
+        config.FileContentsManager.root_dir = root_dir
+        if 'ContentAddressedCheckpoints' in config:
+            config.ContentAddressedCheckpoints.store_dir = os.path.join(root_dir, '.store')
+        cm = FileContentsManager(config=config)
+        nb = make_notebook(cells)
+        times = []
+        for copy in range(copies):
+            path = 'copy%d.ipynb' % copy
+            for edit in range(edits):
+                nb.cells[edit % cells].source = 'plot(%d, edit=%d)' % (edit % cells, edit)
+                cm.save({'type': 'notebook', 'content': nb}, path)
+                start = timeit.default_timer()
+                cm.create_checkpoint(path)
+                times.append(timeit.default_timer() - start)
+        notebooks = sum(os.path.getsize(os.path.join(root_dir, 'copy%d.ipynb' % copy))
+                        for copy in range(copies))
+        checkpoints = disk_usage(root_dir) - notebooks
+        times.sort()
+        print('{:<34} {:>9.1f} MB {:>9.1f} ms {:>9.1f} ms'.format(
+            name, checkpoints / 1e6, times[len(times) // 2] * 1e3,
+            times[int(len(times) * 0.99)] * 1e3))
+    finally:
+        shutil.rmtree(root_dir)
+
+
+def main(cells=50, edits=20, copies=3):
+    print('{} cells, {} edits, {} copies'.format(cells, edits, copies))
+    print('{:<34} {:>12} {:>12} {:>12}'.format('checkpoints', 'disk', 'create p50', 'create p99'))
+    run('FileCheckpoints', Config(), cells, edits, copies)
+    for kept in (1, 5):
+        config = Config()
+        config.FileContentsManager.checkpoints_class = \
+            'jupyterdrive.checkpointstore.ContentAddressedCheckpoints'
+        config.ContentAddressedCheckpoints.max_checkpoints = kept
+        config.ContentAddressedCheckpoints.gc_every = 1
+        run('ContentAddressedCheckpoints (%d kept)' % kept, config, cells, edits, copies)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,68 @@
+"""Micro-benchmark of the MixedContentsManager path dispatch.
+
+Compare the per-call cost of the original ``_split_path`` based dispatch
+with the precompiled ``MountRouter``, with and without recording the calls
+in ``DispatchMetrics``.
+
+    python benchmarks/bench_dispatch.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+# run from a checkout, without installing the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from jupyterdrive.metrics import DispatchMetrics
+from jupyterdrive.mixednbmanager import MountRouter
+
+
+class Stub(object):
+
+    def get(self, path, **kwargs):
+        return path
+
+
+def _split_path(path):
+    path = path.strip('/')
+    list_path = path.split('/')
+    sentinel = list_path.pop(0)
+    return sentinel, list_path, path
+
+
+def legacy_dispatch(managers, path):
+    sentinel, _path, path = _split_path(path)
+    man = managers.get(sentinel, None)
+    meth = getattr(man, 'get')
+    return meth('/'.join(_path))
+
+
+def router_dispatch(router, path):
+    meth, path = router.route('get', path)
+    return meth(path)
+
+
+def main(number=200000):
+    managers = dict((root, Stub()) for root in ('local', 'gdrive', 'scratch'))
+    router = MountRouter(managers)
+    nested = MountRouter(dict(managers, **{'team/shared': Stub()}))
+    instrumented = MountRouter(managers, DispatchMetrics())
+    path = '/gdrive/projects/2015/analysis/results.ipynb'
+
+    cases = [
+        ('legacy _split_path', lambda: legacy_dispatch(managers, path)),
+        ('MountRouter', lambda: router_dispatch(router, path)),
+        ('MountRouter (nested mounts)', lambda: router_dispatch(nested, path)),
+        ('MountRouter (in nested mount)',
+            lambda: router_dispatch(nested, 'team/shared/results.ipynb')),
+        ('MountRouter + DispatchMetrics', lambda: router_dispatch(instrumented, path)),
+    ]
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print('{:<30} {:8.3f} us/call'.format(name, best / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+/*
+ * End-to-end benchmarks of the Drive contents (GoogleDriveContents, and
+ * MixedContents routing to it) against the fake Drive server, with an
+ * injected network latency.  For each scenario, prints the number of
+ * operations, their p50 and p99 latency, and per operation the HTTP round
+ * trips, the Drive API calls (batched ones included) and the bytes sent
+ * and received, as counted by the server.
+ *
+ *     node benchmarks/bench_drive_e2e.js [--latency ms] [--jitter ms]
+ *         [--iterations n] [--depth n] [--listing-size n]
+ *         [--notebook-size kB] [--large-file-size MB] [--rate requests/s]
+ *         [--json]
+ *
+ * --rate overrides gapiutils.REQUESTS_PER_SECOND, the client's own rate
+ * limit, which otherwise dominates the latency of long scenarios.  The
+ * server (jupyterdrive/tests/fakedrive.py) is run with $PYTHON (default:
+ * python).
+ */
+'use strict';
+
+var child_process = require('child_process');
+var path = require('path');
+var drive_env = require('./drive_env');
+
+var ROOT = path.join(__dirname, '..');
+
+var parse_args = function(argv) {
+    var options = {
+        'latency': 50, 'jitter': 0, 'iterations': 20, 'depth': 8,
+        'listing-size': 2500, 'notebook-size': 200, 'large-file-size': 20, 'rate': null,
+        'json': false
+    };
+    for (var i = 0; i < argv.length; i++) {
+        var name = argv[i].replace(/^--/, '');
+        if (!(name in options)) {
+            throw new Error('Unknown option ' + argv[i]);
+        }
+        options[name] = name === 'json' ? true : Number(argv[++i]);
+    }
+    return options;
+};
+
+/* Starts the fake Drive server, resolves with its base URL and process. */
+var start_server = function(options) {
+    var python = process.env.PYTHON || 'python';
+    var server = child_process.spawn(python, [
+        path.join(ROOT, 'jupyterdrive', 'tests', 'fakedrive.py'),
+        '--latency', String(options['latency']), '--jitter', String(options['jitter'])
+    ], {stdio: ['ignore', 'pipe', 'inherit']});
+    return new Promise(function(resolve, reject) {
+        var output = '';
+        server.stdout.on('data', function(data) {
+            output += data;
+            var match = /listening on (\S+)/.exec(output);
+            if (match) {
+                resolve({url: match[1], process: server});
+            }
+        });
+        server.on('exit', function(code) {
+            reject(new Error('Fake Drive server exited with code ' + code));
+        });
+    });
+};
+
+var control = function(base_url, method, body) {
+    return fetch(base_url + '/fakedrive/' + (body ? 'files' : 'stats'), {
+        method: method,
+        body: body ? JSON.stringify(body) : undefined
+    }).then(function(response) {
+        return response.text();
+    }).then(function(text) {
+        return text ? JSON.parse(text) : null;
+    });
+};
+
+var make_notebook = function(kilobytes, seed) {
+    var line = 'values = [x ** 2 for x in range(100) if x % 3 == 0]  # ' + seed + '\n';
+    var cells = [];
+    var size = 0;
+    while (size < kilobytes * 1024) {
+        var source = new Array(20 + 1).join(line);
+        cells.push({
+            'cell_type': 'code',
+            'execution_count': cells.length,
+            'source': source,
+            'outputs': [{'output_type': 'stream', 'name': 'stdout', 'text': source}],
+            'metadata': {}
+        });
+        size += 2 * source.length;
+    }
+    return {'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 0};
+};
+
+var make_csv = function(megabytes) {
+    var rows = ['id,name,value\n'];
+    var size = 0;
+    for (var i = 0; size < megabytes * 1024 * 1024; i++) {
+        var row = i + ',name ' + i + ',' + (i * 0.37).toFixed(2) + '\n';
+        rows.push(row);
+        size += row.length;
+    }
+    return rows.join('');
+};
+
+var percentile = function(sorted, p) {
+    return sorted[Math.min(sorted.length - 1, Math.ceil(p / 100 * sorted.length) - 1)];
+};
+
+var sleep = function(ms) {
+    return new Promise(function(resolve) { setTimeout(resolve, ms); });
+};
+
+/**
+ * Runs `operation(i)` `count` times in sequence, and resolves with the
+ * latencies and the server counters of the run.
+ */
+var run_scenario = function(base_url, name, count, operation) {
+    var times = [];
+    var run = function(i) {
+        if (i >= count) {
+            return Promise.resolve();
+        }
+        var start = process.hrtime();
+        return Promise.resolve(operation(i)).then(function() {
+            var elapsed = process.hrtime(start);
+            times.push(elapsed[0] * 1e3 + elapsed[1] / 1e6);
+            return run(i + 1);
+        });
+    };
+    return control(base_url, 'DELETE')
+    .then(function() { return run(0); })
+    .then(function() { return control(base_url, 'GET'); })
+    .then(function(stats) {
+        times.sort(function(a, b) { return a - b; });
+        return {
+            'scenario': name,
+            'operations': count,
+            'p50_ms': percentile(times, 50),
+            'p99_ms': percentile(times, 99),
+            'round_trips': stats['round_trips'] / count,
+            'api_calls': stats['api_calls'] / count,
+            'bytes_sent': stats['bytes_received'] / count,
+            'bytes_received': stats['bytes_sent'] / count
+        };
+    });
+};
+
+/* The contents of the 'local' mount point of the mixed scenarios: an
+ * in-memory stand-in for the notebook server's contents. */
+var MemoryContents = function(options) {
+    this._files = {'notes.txt': 'some notes\n'};
+};
+MemoryContents.prototype.get = function(path, options) {
+    return Promise.resolve({'type': 'file', 'path': path, 'content': this._files[path]});
+};
+MemoryContents.prototype.list_contents = function(path, options) {
+    var files = this._files;
+    return Promise.resolve({'content': Object.keys(files).map(function(name) {
+        return {'type': 'file', 'path': name};
+    })});
+};
+
+var print_table = function(results, options) {
+    console.log('latency ' + options['latency'] + ' ms, jitter ' + options['jitter'] + ' ms' +
+                (options['rate'] ? ', client rate limit ' + options['rate'] + ' requests/s' : ''));
+    var columns = [['scenario', 34], ['operations', 10], ['p50_ms', 9], ['p99_ms', 9],
+                   ['round_trips', 11], ['api_calls', 9], ['bytes_sent', 11], ['bytes_received', 14]];
+    var pad = function(value, width, left) {
+        var text = typeof value === 'number' ? String(Math.round(value * 10) / 10) : value;
+        while (text.length < width) {
+            text = left ? text + ' ' : ' ' + text;
+        }
+        return text;
+    };
+    console.log(columns.map(function(c, i) { return pad(c[0], c[1], i === 0); }).join(' '));
+    results.forEach(function(result) {
+        console.log(columns.map(function(c, i) { return pad(result[c[0]], c[1], i === 0); }).join(' '));
+    });
+};
+
+var main = function(options) {
+    return start_server(options).then(function(server) {
+        var base_url = server.url;
+        var env = drive_env.create_environment(base_url, {
+            'services/contents': {Contents: MemoryContents}
+        });
+        var gapiutils = env.require('./gapiutils');
+        var driveutils = env.require('./driveutils');
+        var drive_contents = env.require('./drive-contents');
+        var mixed_contents = env.require('./mixed-contents');
+        if (options['rate']) {
+            gapiutils.REQUESTS_PER_SECOND = options['rate'];
+        }
+        // Time for the client's rate limit bucket to refill between scenarios.
+        var refill = function() {
+            return sleep(1000 * gapiutils.REQUEST_BURST / gapiutils.REQUESTS_PER_SECOND);
+        };
+
+        var folders = [];
+        for (var i = 1; i < options['depth']; i++) {
+            folders.push('level' + i);
+        }
+        var deep_path = folders.concat(['deep.ipynb']).join('/');
+        var files = [
+            {'path': deep_path, 'content': JSON.stringify(make_notebook(options['notebook-size'], 0))},
+            {'path': 'autosave.ipynb', 'content': JSON.stringify(make_notebook(options['notebook-size'], 0))}
+        ];
+        files.push({'path': 'large.csv', 'content': make_csv(options['large-file-size'])});
+        for (var j = 0; j < options['listing-size']; j++) {
+            files.push({'path': 'large/file' + j + '.txt', 'content': 'file ' + j + '\n'});
+        }
+
+        var config = env.config({'gdrive': {}});
+        var contents = new drive_contents.Contents({'base_url': '', 'common_config': config});
+        var mixed = new mixed_contents.Contents({'base_url': '', 'common_config': env.config({
+            'mixed_contents': {'schema': [
+                {'root': 'local', 'stripjs': false, 'contents': 'services/contents'},
+                {'root': 'gdrive', 'stripjs': true, 'contents': './drive-contents'}
+            ]}
+        })});
+        var n = options['iterations'];
+        var results = [];
+        var scenario = function(name, count, operation) {
+            return function() {
+                return refill().then(function() {
+                    return run_scenario(base_url, name, count, operation);
+                }).then(function(result) {
+                    results.push(result);
+                });
+            };
+        };
+        var autosave_model = null;
+        var steps = [
+            scenario('deep-path open, cold path cache', n, function() {
+                driveutils.resource_id_cache.clear();
+                return contents.get(deep_path, {});
+            }),
+            scenario('deep-path open, warm path cache', n, function() {
+                return contents.get(deep_path, {});
+            }),
+            scenario('large-folder listing (' + options['listing-size'] + ')', Math.max(1, Math.floor(n / 4)), function() {
+                return contents.list_contents('large', {});
+            }),
+            function() {
+                return contents.get('autosave.ipynb', {}).then(function(model) {
+                    autosave_model = model;
+                });
+            },
+            scenario('autosave, changed notebook', n, function(i) {
+                autosave_model.content.cells[0].source = 'print(' + i + ')\n';
+                return contents.save('autosave.ipynb', autosave_model);
+            }),
+            scenario('autosave, unchanged notebook', n, function() {
+                return contents.save('autosave.ipynb', autosave_model);
+            }),
+            scenario('large file: open (' + options['large-file-size'] + ' MB)', Math.max(1, Math.floor(n / 5)), function() {
+                return contents.get('large.csv', {});
+            }),
+            scenario('large file: open as bytes', Math.max(1, Math.floor(n / 5)), function() {
+                return contents.get('large.csv', {'format': 'binary'});
+            }),
+            scenario('large file: head preview (64 kB)', n, function() {
+                return contents.get('large.csv', {'head': 64 * 1024});
+            }),
+            scenario('mixed: list mount points', n, function() {
+                return mixed.list_contents('', {});
+            }),
+            scenario('mixed: open local file', n, function() {
+                return mixed.get('local/notes.txt', {});
+            }),
+            scenario('mixed: open Drive notebook', n, function() {
+                return mixed.get('gdrive/' + deep_path, {});
+            })
+        ];
+        return gapiutils.gapi_ready
+        .then(function() { return control(base_url, 'POST', {'files': files}); })
+        .then(function() {
+            return steps.reduce(function(prm, step) { return prm.then(step); }, Promise.resolve());
+        })
+        .then(function() {
+            if (options['json']) {
+                console.log(JSON.stringify({'options': options, 'results': results, 'dialogs': env.dialogs}, null, 1));
+            } else {
+                print_table(results, options);
+            }
+        })
+        .then(function() {
+            server.process.kill();
+        }, function(error) {
+            server.process.kill();
+            throw error;
+        });
+    });
+};
+
+main(parse_args(process.argv.slice(2))).then(function() {
+    process.exit(0);
+}, function(error) {
+    console.error(error);
+    process.exit(1);
+});
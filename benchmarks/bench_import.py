@@ -0,0 +1,47 @@
+"""Import time of jupyterdrive and of its contents managers.
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+(Python 3.7+); the times of jupyterdrive's own modules are reported apart
+from those of the modules they import.
+
+    python benchmarks/bench_import.py [module ...]
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+MODULES = ('jupyterdrive', 'jupyterdrive.mixednbmanager', 'jupyterdrive.clientsidenbmanager')
+
+
+def importtime(module):
+    """{module name: (self us, cumulative us)} from `python -X importtime`"""
+    # run from a checkout, without installing the package.
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        p for p in (ROOT, os.environ.get('PYTHONPATH')) if p))
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.STDOUT, universal_newlines=True, env=env)
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(modules=MODULES):
+    for module in modules:
+        times = importtime(module)
+        own = sum(self_us for name, (self_us, _) in times.items()
+                  if name.split('.')[0] == 'jupyterdrive')
+        print('{:<36} total {:7.1f} ms, jupyterdrive modules {:6.1f} ms'.format(
+            module, times[module][1] / 1e3, own / 1e3))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or MODULES)
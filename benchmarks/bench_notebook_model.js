@@ -0,0 +1,130 @@
+/*
+ * Notebook (de)serialisation time on the main thread, for notebooks of
+ * 1, 10 and 50 MB (half multiline sources, half base64 image outputs).
+ *
+ * Compares the original notebook_model conversions (a JSON round trip to
+ * copy the notebook, then split('\n') and concatenation of every line)
+ * with the single-pass ones, and shows what remains on the main thread
+ * when the conversions run in the Web Worker: structured cloning of the
+ * notebook, estimated with v8.serialize/v8.deserialize.
+ *
+ *     node benchmarks/bench_notebook_model.js [size in MB ...]
+ */
+'use strict';
+
+var path = require('path');
+var v8 = require('v8');
+
+var notebook_model = (function() {
+    var factory;
+    global.define = function(deps, f) { factory = f; };
+    require(path.join(__dirname, '..', 'jupyterdrive', 'gdrive', 'notebook_model.js'));
+    delete global.define;
+    var exports = {};
+    factory(null, exports);
+    return exports;
+})();
+
+/* The conversions as they were before the single-pass ones. */
+var legacy = (function() {
+    var transform_notebook = function(notebook, transform_fn) {
+        notebook['cells'].forEach(function(cell) {
+            if (cell['source']) {
+                cell['source'] = transform_fn(cell['source']);
+            }
+            if (cell['outputs']) {
+                cell['outputs'].forEach(function(output) {
+                    if (output['data']) {
+                        output['data'] = transform_fn(output['data']);
+                    }
+                });
+            }
+        });
+    };
+    return {
+        load: function(contents) {
+            var notebook = JSON.parse(contents);
+            transform_notebook(notebook, function(multiline_string) {
+                return Array.isArray(multiline_string) ? multiline_string.join('') : multiline_string;
+            });
+            notebook.metadata = notebook.metadata || {};
+            return notebook;
+        },
+        dump: function(notebook) {
+            var notebook_copy = JSON.parse(JSON.stringify(notebook));
+            transform_notebook(notebook_copy, function(obj) {
+                if (typeof(obj) !== 'string') {
+                    return obj;
+                }
+                return obj.split('\n').map(function(line, idx, array) {
+                    return idx == array.length - 1 ? line : line + '\n';
+                });
+            });
+            return JSON.stringify(notebook_copy);
+        }
+    };
+})();
+
+var make_notebook = function(megabytes) {
+    var target = megabytes * 1024 * 1024;
+    var line = 'values = [x ** 2 for x in range(100) if x % 3 == 0]  # comment\n';
+    var image = new Array(64 * 1024 + 1).join('iVBORw0KGgoAAAANSUhEUgAA'.charAt(0));
+    var cells = [];
+    var size = 0;
+    while (size < target) {
+        var source = new Array(200 + 1).join(line);
+        cells.push({
+            'cell_type': 'code',
+            'source': source,
+            'outputs': [{
+                'output_type': 'display_data',
+                'data': {'image/png': image.slice(0, source.length), 'text/plain': '<Figure>'},
+                'metadata': {}
+            }],
+            'metadata': {}
+        });
+        size += 2 * source.length;
+    }
+    return {'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 0};
+};
+
+var time = function(fn, repeat) {
+    var times = [];
+    for (var i = 0; i < repeat; i++) {
+        var start = process.hrtime();
+        fn();
+        var elapsed = process.hrtime(start);
+        times.push(elapsed[0] * 1e3 + elapsed[1] / 1e6);
+    }
+    times.sort(function(a, b) { return a - b; });
+    return times[Math.floor(times.length / 2)];
+};
+
+var main = function(sizes) {
+    console.log('size   case                             median ms');
+    sizes.forEach(function(megabytes) {
+        var notebook = make_notebook(megabytes);
+        var contents = notebook_model.file_contents_from_notebook(notebook);
+        if (contents !== legacy.dump(notebook)) {
+            throw new Error('single-pass and legacy file contents differ');
+        }
+        var cloned = v8.serialize(notebook);
+        var repeat = megabytes >= 50 ? 3 : 7;
+        var cases = [
+            ['load, legacy', function() { legacy.load(contents); }],
+            ['load, single pass', function() { notebook_model.notebook_from_file_contents(contents); }],
+            ['load, worker (main thread part)', function() { v8.deserialize(cloned); }],
+            ['save, legacy', function() { legacy.dump(notebook); }],
+            ['save, single pass', function() { notebook_model.file_contents_from_notebook(notebook); }],
+            ['save, worker (main thread part)', function() { v8.serialize(notebook); }]
+        ];
+        cases.forEach(function(c) {
+            var label = (megabytes + ' MB').concat('       ').slice(0, 7);
+            console.log(label + (c[0] + '                                  ').slice(0, 33) +
+                        time(c[1], repeat).toFixed(1));
+        });
+    });
+};
+
+var args = process.argv.slice(2).map(Number);
+main(args.length ? args : [1, 10, 50]);
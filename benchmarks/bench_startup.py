@@ -0,0 +1,53 @@
+"""Startup time of MixedContentsManager with many mount points, eager vs lazy.
+
+Each mount point uses a stand-in contents manager whose construction takes
+a few milliseconds, as backends opening connections or reading credentials
+do.
+
+    python benchmarks/bench_startup.py [number of mounts]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+# run from a checkout, without installing the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from traitlets.config import Config
+
+from jupyterdrive.clientsidenbmanager import ClientSideContentsManager
+from jupyterdrive.mixednbmanager import MixedContentsManager
+
+
+class HeavyContentsManager(ClientSideContentsManager):
+
+    def __init__(self, **kwargs):
+        super(HeavyContentsManager, self).__init__(**kwargs)
+        time.sleep(0.005)
+
+
+def startup(scheme, lazy):
+    config = Config({'MixedContentsManager': {'filesystem_scheme': scheme,
+                                              'lazy_managers': lazy}})
+    start = time.time()
+    mixed = MixedContentsManager(config=config)
+    elapsed = time.time() - start
+    start = time.time()
+    mixed.file_exists('mount0/Untitled.ipynb')
+    first_call = time.time() - start
+    return elapsed, first_call
+
+
+def main(mounts=50):
+    heavy = '{}.HeavyContentsManager'.format(__name__)
+    scheme = [{'root': 'mount%d' % i, 'contents': heavy} for i in range(mounts)]
+    for lazy in (False, True):
+        elapsed, first_call = startup(scheme, lazy)
+        print('{:<6} {} mounts: startup {:7.1f} ms, first call {:6.1f} ms'.format(
+            'lazy' if lazy else 'eager', mounts, elapsed * 1e3, first_call * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
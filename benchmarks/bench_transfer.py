@@ -0,0 +1,47 @@
+"""Throughput of copying a large file across MixedContentsManager mount points.
+
+    python benchmarks/bench_transfer.py [size in MB]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# run from a checkout, without installing the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from traitlets.config import Config
+
+from jupyterdrive.mixednbmanager import MixedContentsManager
+
+LARGE_FILE_MANAGER = 'notebook.services.contents.largefilemanager.LargeFileManager'
+
+
+def main(size_mb=256):
+    tmp = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(tmp, 'dest'))
+        with open(os.path.join(tmp, 'blob.bin'), 'wb') as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        scheme = [{'root': 'one', 'contents': LARGE_FILE_MANAGER},
+                  {'root': 'two', 'contents': LARGE_FILE_MANAGER}]
+        config = Config({'FileContentsManager': {'root_dir': tmp},
+                         'MixedContentsManager': {'filesystem_scheme': scheme}})
+        mixed = MixedContentsManager(config=config)
+
+        start = time.time()
+        mixed.copy('one/blob.bin', 'two/dest')
+        elapsed = time.time() - start
+        print('copied {} MB across mount points in {:.2f}s ({:.1f} MB/s, {} MB chunks)'.format(
+            size_mb, elapsed, size_mb / elapsed, mixed.transfer_chunk_size // (1024 * 1024)))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
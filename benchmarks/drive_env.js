@@ -0,0 +1,416 @@
+/*
+ * Runs the Drive contents modules (jupyterdrive/gdrive/*.js) in Node against
+ * a fake Drive server (jupyterdrive/tests/fakedrive.py): a small AMD loader,
+ * stubs of the notebook modules they import, and a stand-in for the Google
+ * API client library that sends the same Drive v2 REST requests, batches
+ * included, with fetch.
+ *
+ *     var env = require('./drive_env').create_environment(base_url);
+ *     var drive_contents = env.require('./drive-contents');
+ *
+ * Needs Node 18 or later (fetch and Blob).  There is no IndexedDB in Node,
+ * so the content cache of drive-contents is disabled.
+ */
+'use strict';
+
+var fs = require('fs');
+var path = require('path');
+var vm = require('vm');
+
+var GDRIVE = path.join(__dirname, '..', 'jupyterdrive', 'gdrive');
+
+/* Base URL of the Google APIs, replaced by the fake server's in the URLs
+ * hardcoded by the modules (resumable uploads). */
+var GOOGLE_APIS = 'https://www.googleapis.com';
+
+var slice = Array.prototype.slice;
+
+/* jQuery, as much of it as the modules use. */
+var make_jquery = function() {
+    var element = {};
+    ['attr', 'addClass', 'css', 'prepend', 'append'].forEach(function(name) {
+        element[name] = function() { return element; };
+    });
+    var $ = function() { return element; };
+    $.proxy = function(fn, context) {
+        var bound = slice.call(arguments, 2);
+        return function() {
+            return fn.apply(context, bound.concat(slice.call(arguments)));
+        };
+    };
+    $.map = function(array, fn) {
+        var result = [];
+        array.forEach(function(value, i) {
+            var mapped = fn(value, i);
+            if (mapped !== null && mapped !== undefined) {
+                result = result.concat(mapped);
+            }
+        });
+        return result;
+    };
+    $.extend = function(target) {
+        slice.call(arguments, 1).forEach(function(source) {
+            for (var key in source || {}) {
+                target[key] = source[key];
+            }
+        });
+        return target;
+    };
+    $.Deferred = function() {
+        return {resolve: function(value) { return Promise.resolve(value); }};
+    };
+    $.getScript = function() { return Promise.resolve(); };
+    return $;
+};
+
+/* base/js/utils of the notebook. */
+var make_utils = function() {
+    return {
+        url_path_join: function() {
+            var url = '';
+            for (var i = 0; i < arguments.length; i++) {
+                if (arguments[i] === '') {
+                    continue;
+                }
+                if (url.length > 0 && url[url.length - 1] != '/') {
+                    url = url + '/' + arguments[i];
+                } else {
+                    url = url + arguments[i];
+                }
+            }
+            return url.replace(/\/\/+/, '/');
+        },
+        url_path_split: function(path) {
+            var idx = path.lastIndexOf('/');
+            if (idx === -1) {
+                return ['', path];
+            }
+            return [path.slice(0, idx), path.slice(idx + 1)];
+        },
+        promising_ajax: function(url, settings) {
+            return fetch(url, {headers: (settings || {}).headers}).then(function(response) {
+                return response.text().then(function(text) {
+                    if (!response.ok) {
+                        var error = new Error('Request failed with status ' + response.status);
+                        error.xhr = {status: response.status, responseText: text};
+                        throw error;
+                    }
+                    return text;
+                });
+            });
+        },
+        wrap_ajax_error: function(jqXHR, status, error) {
+            return new Error(String(error || status));
+        }
+    };
+};
+
+/* The result passed to the execute() callback of gapi.client, from an HTTP
+ * response. */
+var gapi_result = function(status, text) {
+    var result = {};
+    if (text) {
+        try {
+            result = JSON.parse(text);
+        } catch (e) {
+            result = {'body': text};
+        }
+    }
+    if (status >= 400 && result['error']) {
+        result['code'] = result['error']['code'];
+        result['message'] = result['error']['message'];
+    }
+    return result;
+};
+
+var query_string = function(params) {
+    var query = Object.keys(params).filter(function(key) {
+        return params[key] !== undefined && params[key] !== null;
+    }).map(function(key) {
+        return encodeURIComponent(key) + '=' + encodeURIComponent(params[key]);
+    }).join('&');
+    return query ? '?' + query : '';
+};
+
+/**
+ * Stand-in for the Google API client library (`gapi`) sending requests to
+ * `base_url`.
+ */
+var make_gapi = function(base_url) {
+    var token = {'access_token': 'fake-token'};
+
+    var Request = function(method, path, params, headers, body) {
+        this.method = method;
+        this.url = path + query_string(params || {});
+        this.headers = headers || {};
+        this.body = body;
+    };
+    Request.prototype.execute = function(callback) {
+        var headers = {'Authorization': 'Bearer ' + token['access_token']};
+        for (var name in this.headers) {
+            headers[name] = this.headers[name];
+        }
+        if (this.body !== undefined && !headers['Content-Type']) {
+            headers['Content-Type'] = 'application/json';
+        }
+        fetch(base_url + this.url, {method: this.method, headers: headers, body: this.body})
+        .then(function(response) {
+            return response.text().then(function(text) {
+                callback(gapi_result(response.status, text));
+            });
+        }, function() {
+            callback(false);
+        });
+    };
+
+    /* A method of the Drive API: `template` is the path, with path
+     * parameters in braces; the `resource` parameter is the body. */
+    var api = function(method, template) {
+        return function(params) {
+            var query = {};
+            var body;
+            for (var key in params || {}) {
+                if (key === 'resource') {
+                    body = JSON.stringify(params[key]);
+                } else if (template.indexOf('{' + key + '}') === -1) {
+                    query[key] = params[key];
+                }
+            }
+            var url = template.replace(/\{(\w+)\}/g, function(match, key) {
+                return encodeURIComponent(params[key]);
+            });
+            return new Request(method, url, query, {}, body);
+        };
+    };
+
+    var Batch = function() {
+        this._requests = [];
+    };
+    Batch.prototype.add = function(request, options) {
+        this._requests.push({id: (options || {})['id'] || String(this._requests.length), request: request});
+    };
+    Batch.prototype.then = function(resolve, reject) {
+        var boundary = 'batch_' + Math.random().toString(36).slice(2);
+        var body = this._requests.map(function(entry) {
+            var request = entry.request;
+            var part = '--' + boundary + '\r\n' +
+                'Content-Type: application/http\r\n' +
+                'Content-ID: <' + entry.id + '>\r\n\r\n' +
+                request.method + ' ' + request.url + ' HTTP/1.1\r\n';
+            if (request.body !== undefined) {
+                part += 'Content-Type: application/json\r\n\r\n' + request.body;
+            } else {
+                part += '\r\n';
+            }
+            return part + '\r\n';
+        }).join('') + '--' + boundary + '--';
+        return fetch(base_url + '/batch/drive/v2', {
+            method: 'POST',
+            headers: {
+                'Authorization': 'Bearer ' + token['access_token'],
+                'Content-Type': 'multipart/mixed; boundary=' + boundary
+            },
+            body: body
+        })
+        .then(function(response) {
+            return response.text().then(function(text) {
+                if (response.status !== 200) {
+                    throw {status: response.status, result: gapi_result(response.status, text)};
+                }
+                return {status: 200, result: parse_batch_response(response, text)};
+            });
+        }, function() {
+            throw {status: 0, result: false};
+        })
+        .then(resolve, reject);
+    };
+
+    var parse_batch_response = function(response, text) {
+        var boundary = /boundary=([^;]+)/.exec(response.headers.get('Content-Type'))[1];
+        var results = {};
+        text.split('--' + boundary).slice(1).forEach(function(segment) {
+            if (segment.slice(0, 2) === '--') {
+                return;
+            }
+            var outer = segment.replace(/^\r\n/, '');
+            var head_end = outer.indexOf('\r\n\r\n');
+            var id = /Content-ID: <response-([^>]*)>/i.exec(outer.slice(0, head_end))[1];
+            var http = outer.slice(head_end + 4);
+            var status = parseInt(http.split(' ')[1], 10);
+            var body = http.slice(http.indexOf('\r\n\r\n') + 4).replace(/\r\n$/, '');
+            results[id] = {status: status, result: gapi_result(status, body), body: body};
+        });
+        return results;
+    };
+
+    return {
+        load: function(libraries, callback) { callback(); },
+        auth: {
+            authorize: function(options, callback) {
+                setTimeout(function() { callback(token); }, 0);
+            },
+            getToken: function() { return token; }
+        },
+        client: {
+            load: function(name, version, callback) { callback(); },
+            request: function(args) {
+                return new Request(args['method'] || 'GET', args['path'], args['params'],
+                                   args['headers'], args['body']);
+            },
+            newBatch: function() { return new Batch(); },
+            drive: {
+                about: {get: api('GET', '/drive/v2/about')},
+                files: {
+                    list: api('GET', '/drive/v2/files'),
+                    get: api('GET', '/drive/v2/files/{fileId}'),
+                    insert: api('POST', '/drive/v2/files'),
+                    patch: api('PATCH', '/drive/v2/files/{fileId}'),
+                    delete: api('DELETE', '/drive/v2/files/{fileId}')
+                },
+                children: {list: api('GET', '/drive/v2/files/{folderId}/children')},
+                revisions: {
+                    list: api('GET', '/drive/v2/files/{fileId}/revisions'),
+                    get: api('GET', '/drive/v2/files/{fileId}/revisions/{revisionId}'),
+                    patch: api('PATCH', '/drive/v2/files/{fileId}/revisions/{revisionId}')
+                },
+                changes: {
+                    list: api('GET', '/drive/v2/changes'),
+                    getStartPageToken: api('GET', '/drive/v2/changes/startPageToken')
+                }
+            }
+        }
+    };
+};
+
+/* XMLHttpRequest over fetch, for resumable uploads and ranged downloads. */
+var make_xhr = function(base_url) {
+    var XHR = function() {
+        this.status = 0;
+        this.responseType = '';
+        this.response = null;
+        this.responseText = '';
+        this._headers = {};
+        this._response_headers = null;
+    };
+    XHR.prototype.open = function(method, url) {
+        this._method = method;
+        this._url = url.replace(GOOGLE_APIS, base_url);
+    };
+    XHR.prototype.setRequestHeader = function(name, value) {
+        this._headers[name] = value;
+    };
+    XHR.prototype.getResponseHeader = function(name) {
+        return this._response_headers && this._response_headers.get(name);
+    };
+    XHR.prototype.send = function(body) {
+        var that = this;
+        fetch(this._url, {method: this._method, headers: this._headers,
+                          body: body === null ? undefined : body})
+        .then(function(response) {
+            that.status = response.status;
+            that._response_headers = response.headers;
+            return that.responseType === 'arraybuffer' ? response.arrayBuffer() : response.text();
+        })
+        .then(function(body) {
+            that.response = body;
+            if (typeof body === 'string') {
+                that.responseText = body;
+            }
+            that.onload();
+        }, function() {
+            that.status = 0;
+            that.onerror();
+        });
+    };
+    return XHR;
+};
+
+/**
+ * Loads the AMD modules of jupyterdrive/gdrive, resolving the notebook
+ * modules with `stubs`.
+ * @return {Function} `load(name)`, returning the exports of a module.
+ */
+var make_loader = function(stubs) {
+    var modules = {};
+    var load = function(name) {
+        name = name.replace(/^\.\//, '');
+        if (modules[name]) {
+            return modules[name];
+        }
+        if (stubs[name]) {
+            return modules[name] = stubs[name];
+        }
+        var file = path.join(GDRIVE, name + '.js');
+        var deps, factory;
+        global.define = function(d, f) { deps = d; factory = f; };
+        try {
+            vm.runInThisContext(fs.readFileSync(file, 'utf8'), {filename: file});
+        } finally {
+            delete global.define;
+        }
+        var exports = modules[name] = {};
+        factory.apply(null, deps.map(function(dep) {
+            if (dep === 'require') {
+                return amd_require;
+            }
+            if (dep === 'exports') {
+                return exports;
+            }
+            return load(dep);
+        }));
+        return exports;
+    };
+    var amd_require = function(names, callback) {
+        var loaded = names.map(load);
+        setTimeout(function() { callback.apply(null, loaded); }, 0);
+    };
+    return load;
+};
+
+/**
+ * Sets up the globals the modules expect (window, gapi, XMLHttpRequest)
+ * for a fake Drive server at `base_url`.
+ * @param {string} base_url URL of the fake Drive server.
+ * @param {Object} extra_stubs Additional modules, by name (e.g. the
+ *     'services/contents' mounted by mixed-contents).
+ * @return {Object} `require(name)` loading a module, `config(gdrive)` making
+ *     the common config object passed to the contents, and `dialogs`, the
+ *     number of dialogs opened (and accepted).
+ */
+var create_environment = function(base_url, extra_stubs) {
+    var env = {dialogs: 0};
+    global.window = global;
+    // The content cache is disabled without IndexedDB: expected here.
+    var warn = console.warn;
+    console.warn = function(message, error) {
+        if (!(error && error.message === 'IndexedDB is not available')) {
+            warn.apply(console, arguments);
+        }
+    };
+    global.gapi = make_gapi(base_url);
+    global.XMLHttpRequest = make_xhr(base_url);
+    var stubs = {
+        'jquery': make_jquery(),
+        'base/js/namespace': {},
+        'base/js/utils': make_utils(),
+        'base/js/dialog': {modal: function(options) {
+            env.dialogs += 1;
+            setTimeout(function() { options['buttons']['ok']['click'](); }, 0);
+        }},
+        'es6-promise': {Promise: Promise}
+    };
+    for (var name in extra_stubs || {}) {
+        stubs[name] = extra_stubs[name];
+    }
+    env.require = make_loader(stubs);
+    env.config = function(data) {
+        return {loaded: Promise.resolve(), data: data || {}, update: function(update) {
+            for (var key in update) {
+                this.data[key] = update[key];
+            }
+        }};
+    };
+    return env;
+};
+
+exports.create_environment = create_environment;
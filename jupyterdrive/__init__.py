@@ -12,15 +12,9 @@ log = logging.getLogger(__name__)
 log.setLevel(20)
 
 
-if JUPYTER:
-    import notebook.nbextensions as nbe
-    from IPython.paths import locate_profile
-    from jupyter_core.paths import jupyter_config_dir
-    from traitlets.config import Config, JSONFileConfigLoader, ConfigFileNotFound
-else :
-    import IPython.html.nbextensions as nbe
-    from IPython.utils.path import locate_profile
-    from IPython.config import Config, JSONFileConfigLoader, ConfigFileNotFound
+# The install/activate machinery below imports the notebook extensions and
+# config loaders (and IPython) on first use only, so that loading a contents
+# manager from the package does not pay for them.
 
 if sys.version_info.major > 2:
     unicode = str
@@ -38,6 +32,10 @@ def install(profile='default', symlink=True, mixed=False, user=False,
         log.info('Will install mixed content manager')
     if prefix and verbose:
         log.info("I'll install in prefix:", prefix)
+    if JUPYTER:
+        import notebook.nbextensions as nbe
+    else:
+        import IPython.html.nbextensions as nbe
     nbe.install_nbextension(os.path.join(dname,'gdrive'),
                                 symlink=symlink,
                                    user=user,
@@ -46,6 +44,14 @@ def install(profile='default', symlink=True, mixed=False, user=False,
 
     activate(profile, mixed=mixed)
 
+def _config_loader():
+    """Config, JSONFileConfigLoader and ConfigFileNotFound, imported on demand"""
+    if JUPYTER:
+        from traitlets.config import Config, JSONFileConfigLoader, ConfigFileNotFound
+    else:
+        from IPython.config import Config, JSONFileConfigLoader, ConfigFileNotFound
+    return Config, JSONFileConfigLoader, ConfigFileNotFound
+
 class jconfig(object):
 
     def __init__(self, profile):
@@ -58,10 +64,13 @@ class jconfig(object):
         self.profile = profile
 
     def __enter__(self):
+        Config, JSONFileConfigLoader, ConfigFileNotFound = _config_loader()
         if JUPYTER:
+            from jupyter_core.paths import jupyter_config_dir
             self.pdir = jupyter_config_dir()
             self.cff_name = 'jupyter_notebook_config.json'
         else:
+            from IPython.utils.path import locate_profile
             self.pdir = locate_profile(self.profile)
             self.cff_name = 'ipython_notebook_config.json'
 
@@ -91,6 +100,7 @@ def activate(profile='default', mixed=False):
 
 def _activate(profile, mixed):
     dname = os.path.dirname(__file__)
+    JSONFileConfigLoader = _config_loader()[1]
 
     with jconfig(profile) as config:
         if 'NotebookApp' in config:
@@ -0,0 +1,427 @@
+"""A content-addressed, deduplicated checkpoint store."""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+import base64
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import zlib
+
+from tornado.web import HTTPError
+
+from .compat import JUPYTER, UTC
+
+if JUPYTER:
+    import nbformat
+    from notebook.services.contents.checkpoints import Checkpoints, GenericCheckpointsMixin
+    from traitlets.traitlets import Integer, Unicode
+else:
+    from IPython import nbformat
+    from IPython.html.services.contents.checkpoints import Checkpoints, GenericCheckpointsMixin
+    from IPython.utils.traitlets import Integer, Unicode
+
+try:
+    from urllib.parse import quote
+except ImportError:  # Python 2
+    from urllib import quote
+
+try:
+    _replace = os.replace
+except AttributeError:  # Python 2
+    _replace = os.rename
+
+_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# path components are percent-encoded in the store, where '%' is always
+# followed by two hex digits: manifests cannot clash with directories.
+MANIFEST_SUFFIX = '%ckpt.json'
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _default_store_dir():
+    if JUPYTER:
+        from jupyter_core.paths import jupyter_data_dir
+        return os.path.join(jupyter_data_dir(), 'checkpoint_store')
+    from IPython.utils.path import get_ipython_dir
+    return os.path.join(get_ipython_dir(), 'checkpoint_store')
+
+
+class ContentAddressedCheckpoints(GenericCheckpointsMixin, Checkpoints):
+    """Checkpoints stored as compressed blobs named by their SHA-256.
+
+    A notebook checkpoint is a manifest listing one blob per cell (without
+    its outputs) and one blob per output; a file checkpoint lists the blobs
+    of its `chunk_size` byte chunks.  A blob is written once, whichever
+    checkpoint of whichever file refers to it, so successive checkpoints of
+    a notebook only store the cells and outputs that changed.
+
+    The `max_checkpoints` most recent checkpoints of each path are kept.
+    Blobs that no manifest refers to any more are removed by
+    `collect_garbage`, which runs after every `gc_every` deletions.
+
+    Layout of `store_dir`::
+
+        blobs/<2 first hex digits>/<sha256>   zlib compressed blob
+        manifests/<path>%ckpt.json            checkpoints of one path
+
+    Renaming or deleting the checkpoints of a path also renames or deletes
+    those of the paths below it, so that they follow directories.
+    """
+
+    store_dir = Unicode('', config=True,
+    help="""
+    Directory of the store.  Defaults to `checkpoint_store` in the Jupyter
+    data directory.
+    """)
+
+    max_checkpoints = Integer(5, config=True,
+    help="""
+    Number of checkpoints kept per file, the oldest are deleted first.
+    """)
+
+    chunk_size = Integer(1024 * 1024, config=True,
+    help="""
+    Size in bytes of the blobs files other than notebooks are split into.
+    """)
+
+    compression_level = Integer(6, config=True,
+    help="""
+    zlib compression level of the blobs.
+    """)
+
+    gc_every = Integer(20, config=True,
+    help="""
+    Number of checkpoint deletions between two garbage collections of the
+    blobs.  0 to only collect when `collect_garbage` is called.
+    """)
+
+    def __init__(self, **kwargs):
+        super(ContentAddressedCheckpoints, self).__init__(**kwargs)
+        if not self.store_dir:
+            self.store_dir = _default_store_dir()
+        self._lock = threading.RLock()
+        self._deletions = 0
+
+    # storage
+
+    def _blob_path(self, digest):
+        return os.path.join(self.store_dir, 'blobs', digest[:2], digest)
+
+    def _manifest_dir(self, path):
+        """Directory of the manifests of the paths below path"""
+        parts = [p for p in path.strip('/').split('/') if p]
+        if not parts or any(p in ('.', '..') for p in parts):
+            raise HTTPError(400, 'Invalid checkpoint path: %r' % path)
+        return os.path.join(self.store_dir, 'manifests',
+                            *[quote(p.encode('utf-8'), safe='') for p in parts])
+
+    def _manifest_path(self, path):
+        return self._manifest_dir(path) + MANIFEST_SUFFIX
+
+    def _write_atomic(self, filename, data):
+        directory = os.path.dirname(filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp = '%s.%d.%d.tmp' % (filename, os.getpid(), threading.current_thread().ident)
+        with io.open(tmp, 'wb') as f:
+            f.write(data)
+        _replace(tmp, filename)
+
+    def _put_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        filename = self._blob_path(digest)
+        if not os.path.exists(filename):
+            self._write_atomic(filename, zlib.compress(data, self.compression_level))
+        return digest
+
+    def _get_blob(self, digest):
+        try:
+            with io.open(self._blob_path(digest), 'rb') as f:
+                return zlib.decompress(f.read())
+        except (IOError, OSError):
+            raise HTTPError(500, 'Checkpoint store is missing blob %s' % digest)
+
+    @staticmethod
+    def _read_file(filename):
+        with io.open(filename, 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def _read_manifest(self, path):
+        try:
+            return self._read_file(self._manifest_path(path))
+        except (IOError, OSError):
+            return {'path': path.strip('/'), 'checkpoints': []}
+
+    def _manifests(self, directory):
+        """The manifests in directory and below"""
+        for parent, _, names in os.walk(directory):
+            for name in names:
+                if name.endswith(MANIFEST_SUFFIX):
+                    yield self._read_file(os.path.join(parent, name))
+
+    def _write_manifest(self, path, manifest):
+        filename = self._manifest_path(path)
+        if manifest['checkpoints']:
+            self._write_atomic(filename, _canonical(manifest))
+        elif os.path.exists(filename):
+            os.remove(filename)
+
+    def _find(self, checkpoint_id, path):
+        for checkpoint in self._read_manifest(path)['checkpoints']:
+            if checkpoint['id'] == checkpoint_id:
+                return checkpoint
+        raise HTTPError(404, 'Checkpoint does not exist: %s@%s' % (path, checkpoint_id))
+
+    def _add(self, path, entry):
+        with self._lock:
+            manifest = self._read_manifest(path)
+            checkpoints = manifest['checkpoints']
+            last = max([int(c['id']) for c in checkpoints] or [0])
+            entry['id'] = str(last + 1)
+            entry['last_modified'] = datetime.datetime.now(UTC).strftime(_DATE_FORMAT)
+            checkpoints.append(entry)
+            pruned = len(checkpoints) - max(self.max_checkpoints, 1)
+            if pruned > 0:
+                del checkpoints[:pruned]
+            self._write_manifest(path, manifest)
+            if pruned > 0:
+                self._deleted(pruned)
+        return self._model(entry)
+
+    @staticmethod
+    def _model(entry):
+        return {
+            'id': entry['id'],
+            'last_modified': datetime.datetime.strptime(
+                entry['last_modified'], _DATE_FORMAT).replace(tzinfo=UTC),
+        }
+
+    def _deleted(self, count):
+        self._deletions += count
+        if self.gc_every and self._deletions >= self.gc_every:
+            self.collect_garbage()
+
+    # GenericCheckpointsMixin API
+
+    def create_notebook_checkpoint(self, nb, path):
+        cells = []
+        with self._lock:
+            for cell in nb.get('cells', []):
+                outputs = [self._put_blob(_canonical(output)) for output in cell.get('outputs', [])]
+                body = dict((k, v) for k, v in cell.items() if k != 'outputs')
+                cells.append([self._put_blob(_canonical(body)), outputs])
+            entry = {
+                'type': 'notebook',
+                'nbformat': nb.get('nbformat', 4),
+                'nbformat_minor': nb.get('nbformat_minor', 0),
+                'metadata': nb.get('metadata', {}),
+                'cells': cells,
+            }
+            return self._add(path, entry)
+
+    def create_file_checkpoint(self, content, format, path):
+        if format == 'base64':
+            data = base64.b64decode(content.encode('ascii'))
+        else:
+            data = content.encode('utf-8')
+        size = max(self.chunk_size, 1)
+        with self._lock:
+            chunks = [self._put_blob(data[start:start + size])
+                      for start in range(0, len(data), size)]
+            return self._add(path, {'type': 'file', 'format': format, 'chunks': chunks})
+
+    def get_notebook_checkpoint(self, checkpoint_id, path):
+        entry = self._find(checkpoint_id, path)
+        if entry['type'] != 'notebook':
+            raise HTTPError(400, '%s is not a notebook checkpoint' % checkpoint_id)
+        cells = []
+        for cell_digest, output_digests in entry['cells']:
+            cell = json.loads(self._get_blob(cell_digest).decode('utf-8'))
+            if cell.get('cell_type') == 'code':
+                cell['outputs'] = [json.loads(self._get_blob(d).decode('utf-8'))
+                                   for d in output_digests]
+            cells.append(cell)
+        nb = nbformat.from_dict({
+            'nbformat': entry['nbformat'],
+            'nbformat_minor': entry['nbformat_minor'],
+            'metadata': entry['metadata'],
+            'cells': cells,
+        })
+        return {'type': 'notebook', 'content': nb}
+
+    def get_file_checkpoint(self, checkpoint_id, path):
+        entry = self._find(checkpoint_id, path)
+        if entry['type'] != 'file':
+            raise HTTPError(400, '%s is not a file checkpoint' % checkpoint_id)
+        data = b''.join(self._get_blob(digest) for digest in entry['chunks'])
+        if entry['format'] == 'base64':
+            content = base64.b64encode(data).decode('ascii')
+        else:
+            content = data.decode('utf-8')
+        return {'type': 'file', 'format': entry['format'], 'content': content}
+
+    # Checkpoints API
+
+    def list_checkpoints(self, path):
+        return [self._model(entry) for entry in self._read_manifest(path)['checkpoints']]
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        with self._lock:
+            manifest = self._read_manifest(path)
+            kept = [c for c in manifest['checkpoints'] if c['id'] != checkpoint_id]
+            if len(kept) == len(manifest['checkpoints']):
+                raise HTTPError(404, 'Checkpoint does not exist: %s@%s' % (path, checkpoint_id))
+            manifest['checkpoints'] = kept
+            self._write_manifest(path, manifest)
+            self._deleted(1)
+
+    def rename_checkpoint(self, checkpoint_id, old_path, new_path):
+        with self._lock:
+            entry = self._find(checkpoint_id, old_path)
+            old = self._read_manifest(old_path)
+            old['checkpoints'] = [c for c in old['checkpoints'] if c['id'] != checkpoint_id]
+            new = self._read_manifest(new_path)
+            new['checkpoints'] = [c for c in new['checkpoints'] if c['id'] != checkpoint_id]
+            new['checkpoints'].append(entry)
+            new['checkpoints'].sort(key=lambda c: int(c['id']))
+            self._write_manifest(new_path, new)
+            self._write_manifest(old_path, old)
+
+    def rename_all_checkpoints(self, old_path, new_path):
+        """Move the checkpoints of old_path and of the paths below it"""
+        with self._lock:
+            old_dir, new_dir = self._manifest_dir(old_path), self._manifest_dir(new_path)
+            old_manifest = old_dir + MANIFEST_SUFFIX
+            if not (os.path.exists(old_manifest) or os.path.isdir(old_dir)):
+                return
+            self.delete_all_checkpoints(new_path)
+            parent = os.path.dirname(new_dir)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            if os.path.exists(old_manifest):
+                manifest = self._read_manifest(old_path)
+                manifest['path'] = new_path.strip('/')
+                self._write_manifest(new_path, manifest)
+                os.remove(old_manifest)
+            if os.path.isdir(old_dir):
+                _replace(old_dir, new_dir)
+                prefix = old_path.strip('/') + '/'
+                for directory, _, names in os.walk(new_dir):
+                    for name in names:
+                        if not name.endswith(MANIFEST_SUFFIX):
+                            continue
+                        filename = os.path.join(directory, name)
+                        manifest = self._read_file(filename)
+                        manifest['path'] = new_path.strip('/') + '/' + manifest['path'][len(prefix):]
+                        self._write_atomic(filename, _canonical(manifest))
+
+    def delete_all_checkpoints(self, path):
+        """Delete the checkpoints of path and of the paths below it"""
+        with self._lock:
+            directory = self._manifest_dir(path)
+            count = len(self._read_manifest(path)['checkpoints'])
+            self._write_manifest(path, {'checkpoints': []})
+            for manifest in self._manifests(directory):
+                count += len(manifest['checkpoints'])
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+            if count:
+                self._deleted(count)
+
+    # maintenance
+
+    def collect_garbage(self):
+        """Remove the blobs no checkpoint refers to.
+
+        Returns the number of blobs removed and the bytes freed.
+        """
+        with self._lock:
+            self._deletions = 0
+            referenced = set()
+            for manifest in self._manifests(os.path.join(self.store_dir, 'manifests')):
+                for entry in manifest['checkpoints']:
+                    if entry['type'] == 'notebook':
+                        for cell_digest, output_digests in entry['cells']:
+                            referenced.add(cell_digest)
+                            referenced.update(output_digests)
+                    else:
+                        referenced.update(entry['chunks'])
+            removed = freed = 0
+            blobs = os.path.join(self.store_dir, 'blobs')
+            for prefix in os.listdir(blobs) if os.path.isdir(blobs) else []:
+                directory = os.path.join(blobs, prefix)
+                for digest in os.listdir(directory):
+                    if digest in referenced:
+                        continue
+                    filename = os.path.join(directory, digest)
+                    freed += os.path.getsize(filename)
+                    os.remove(filename)
+                    removed += 1
+        if removed:
+            self.log.info('Checkpoint store: removed %d unreferenced blobs (%d bytes)',
+                          removed, freed)
+        return removed, freed
+
+    def disk_usage(self):
+        """Number of blobs and bytes they use on disk"""
+        count = size = 0
+        blobs = os.path.join(self.store_dir, 'blobs')
+        for prefix in os.listdir(blobs) if os.path.isdir(blobs) else []:
+            directory = os.path.join(blobs, prefix)
+            for digest in os.listdir(directory):
+                count += 1
+                size += os.path.getsize(os.path.join(directory, digest))
+        return count, size
+
+
+class MountCheckpoints(GenericCheckpointsMixin, Checkpoints):
+    """The checkpoints of one mount point, in a store shared by several.
+
+    Set as the `checkpoints` of a contents manager mounted at `root` by
+    `MixedContentsManager` when `shared_checkpoints` is set; paths are
+    prefixed with `root` in the store.
+    """
+
+    def __init__(self, store, root, **kwargs):
+        super(MountCheckpoints, self).__init__(**kwargs)
+        self.store = store
+        self.root = root.strip('/')
+
+    def _path(self, path):
+        return '/'.join(p for p in (self.root, path.strip('/')) if p)
+
+    def create_notebook_checkpoint(self, nb, path):
+        return self.store.create_notebook_checkpoint(nb, self._path(path))
+
+    def create_file_checkpoint(self, content, format, path):
+        return self.store.create_file_checkpoint(content, format, self._path(path))
+
+    def get_notebook_checkpoint(self, checkpoint_id, path):
+        return self.store.get_notebook_checkpoint(checkpoint_id, self._path(path))
+
+    def get_file_checkpoint(self, checkpoint_id, path):
+        return self.store.get_file_checkpoint(checkpoint_id, self._path(path))
+
+    def list_checkpoints(self, path):
+        return self.store.list_checkpoints(self._path(path))
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        return self.store.delete_checkpoint(checkpoint_id, self._path(path))
+
+    def rename_checkpoint(self, checkpoint_id, old_path, new_path):
+        return self.store.rename_checkpoint(checkpoint_id, self._path(old_path),
+                                            self._path(new_path))
+
+    def rename_all_checkpoints(self, old_path, new_path):
+        return self.store.rename_all_checkpoints(self._path(old_path), self._path(new_path))
+
+    def delete_all_checkpoints(self, path):
+        return self.store.delete_all_checkpoints(self._path(path))
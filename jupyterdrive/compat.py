@@ -1,5 +1,6 @@
 from __future__ import print_function, absolute_import
 
+import datetime
 import sys
 
 
@@ -20,6 +21,12 @@ if MAYBE_IPYTHON and not DEFINITIVELY_JUPYTER:
     if IPython.version_info >= (4, 0):
         DEFINITIVELY_JUPYTER = True
 
+try:
+    string_types = (basestring,)
+except NameError:
+    # Python 3
+    string_types = (str,)
+
 JUPYTER = False
 
 if DEFINITIVELY_JUPYTER:
@@ -28,20 +35,25 @@ else:
     # none of above in sys.module,
     # we might be at install time.
     # guess for the best.
+    # if jupyter is installed, assume jupyter. Only look the package up:
+    # importing it would cost most of the import time of jupyterdrive.
     try:
-        # if jupyter is installed, assume jupyter
-        import notebook.nbextensions
-        # silence pyflakes
-        notebook.nbextensions
-        JUPYTER = True
+        from importlib.util import find_spec
+        JUPYTER = find_spec('notebook') is not None
     except ImportError:
-        pass
-
-
-if JUPYTER:
-    import notebook.nbextensions as nbe
-else:
-    import IPython.html.nbextensions as nbe
-
-# silence pyflakes
-nbe
+        # Python 2
+        import imp
+        try:
+            imp.find_module('notebook')
+            JUPYTER = True
+        except ImportError:
+            pass
+
+# timezone of the dates of the contents models; dateutil is not a dependency.
+try:
+    UTC = datetime.timezone.utc
+except AttributeError:  # Python 2
+    if JUPYTER:
+        from notebook._tz import UTC
+    else:
+        from IPython.utils.tz import UTC
@@ -0,0 +1,674 @@
+"""A server side contents manager for Google Drive."""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+import base64
+import datetime
+import functools
+import json
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from tornado.web import HTTPError
+
+from .compat import JUPYTER, UTC
+from .proxynbmanager import ContentsBackend, ProxyContentsManager
+
+if JUPYTER:
+    import nbformat
+    from traitlets.traitlets import Any, Integer, Float, Unicode
+else:
+    from IPython import nbformat
+    from IPython.utils.traitlets import Any, Integer, Float, Unicode
+
+try:
+    import http.client as httplib
+    from urllib.parse import urlencode, urlsplit
+except ImportError:  # Python 2
+    import httplib
+    from urllib import urlencode
+    from urlparse import urlsplit
+
+_clock = getattr(time, 'monotonic', time.time)
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+NOTEBOOK_MIME_TYPE = 'application/ipynb'
+
+FILE_FIELDS = ('id,title,mimeType,parents(id),createdDate,modifiedDate,editable,'
+               'headRevisionId,fileSize')
+LIST_PAGE_SIZE = 1000
+
+# Methods sent again when a reused connection fails after the request was
+# sent, as the server may have received it already.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+def _parent(path):
+    return path.rsplit('/', 1)[0] if '/' in path else ''
+
+
+def _name(path):
+    return path.rsplit('/', 1)[-1]
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=UTC)
+
+
+def _quote(value):
+    """Quote a string for the `q` parameter of files.list"""
+    return "'%s'" % value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class ConnectionPool(object):
+    """Keep-alive HTTP(S) connections to one host, reused across threads.
+
+    At most `maxsize` idle connections are kept; a request takes the most
+    recently used one (or opens a new one) and gives it back once the
+    response has been read.  A request on a reused connection that the
+    server closed in the meantime is retried on a new connection, if it
+    could not be sent or its method is idempotent: otherwise, the server may
+    have carried it out before closing the connection.
+    """
+
+    def __init__(self, scheme, host, port=None, maxsize=10, timeout=60):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.requests = 0
+        self.connections_opened = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """Request and connection counters, and number of idle connections"""
+        return {
+            'requests': self.requests,
+            'connections_opened': self.connections_opened,
+            'idle': len(self._idle),
+        }
+
+    def _new_connection(self):
+        cls = httplib.HTTPSConnection if self.scheme == 'https' else httplib.HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _take(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def _give_back(self, conn):
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for conn in idle:
+            conn.close()
+
+    def request(self, method, url, body=None, headers=None):
+        """Send a request, return (status, headers dict, body bytes)"""
+        with self._lock:
+            self.requests += 1
+        conn, reused = self._take()
+        while True:
+            sent = False
+            try:
+                conn.request(method, url, body, headers or {})
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+            except (httplib.HTTPException, socket.error):
+                conn.close()
+                if not reused or (sent and method not in IDEMPOTENT_METHODS):
+                    raise
+                # the server closed an idle connection, try a fresh one.
+                conn, reused = self._new_connection(), False
+                continue
+            break
+        response_headers = dict((k.lower(), v) for k, v in response.getheaders())
+        if response.will_close:
+            conn.close()
+        else:
+            self._give_back(conn)
+        return response.status, response_headers, data
+
+
+_pools_lock = threading.Lock()
+_shared_pools = {}
+
+
+def _get_shared_pool(url, maxsize):
+    """The connection pool to the host of `url`, shared by all Drive backends.
+
+    Its size is set by the first backend that needs it.
+    """
+    split = urlsplit(url)
+    key = (split.scheme, split.hostname, split.port)
+    with _pools_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = _shared_pools[key] = ConnectionPool(split.scheme, split.hostname,
+                                                       split.port, maxsize)
+        return pool
+
+
+def refresh_access_token(token_url, refresh_token, client_id, client_secret):
+    """Get a new OAuth 2.0 access token with a refresh token"""
+    split = urlsplit(token_url)
+    body = urlencode({
+        'grant_type': 'refresh_token',
+        'refresh_token': refresh_token,
+        'client_id': client_id,
+        'client_secret': client_secret,
+    }).encode('utf-8')
+    status, _, data = _get_shared_pool(token_url, 1).request(
+        'POST', split.path, body, {'Content-Type': 'application/x-www-form-urlencoded'})
+    try:
+        response = json.loads(data.decode('utf-8'))
+    except ValueError:
+        response = {}
+    if status != 200 or 'access_token' not in response:
+        raise HTTPError(401, 'Google Drive: cannot refresh the access token: %s'
+                        % response.get('error', status))
+    return response['access_token']
+
+
+class DriveCache(object):
+    """Files resources of a Drive account, by path.
+
+    Entries are kept for `ttl` seconds, at most `maxsize` of them, evicting
+    the least recently used ones.  One cache is shared by all the backends
+    connected to the same account, so path resolutions and metadata fetched
+    for one user's session serve the others.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def get(self, path):
+        now = _clock()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                del self._entries[path]
+                self._entries[path] = entry
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, path, resource):
+        with self._lock:
+            self._entries.pop(path, None)
+            self._entries[path] = (_clock() + self.ttl, resource)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path):
+        """Drop the entry of path and of everything below it"""
+        prefix = path + '/'
+        with self._lock:
+            for key in list(self._entries):
+                if key == path or key.startswith(prefix):
+                    del self._entries[key]
+
+
+_caches_lock = threading.Lock()
+_shared_caches = {}
+
+
+def _get_shared_cache(key, ttl, maxsize):
+    with _caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = _shared_caches[key] = DriveCache(ttl, maxsize)
+        return cache
+
+
+class DriveBackend(ContentsBackend):
+    """`ContentsBackend` storing contents in Google Drive, with the v2 REST API.
+
+    Checkpoints are pinned revisions of the files.  `refresh`, if given, is
+    called without arguments to get a new access token when the API rejects
+    the current one (or there is none yet); the request is then sent again
+    once.
+    """
+
+    def __init__(self, access_token, api_url='https://www.googleapis.com',
+                 pool_size=10, cache_ttl=30.0, cache_maxsize=10000, refresh=None):
+        self.access_token = access_token
+        self.refresh = refresh
+        self._token_lock = threading.Lock()
+        self.api_url = api_url.rstrip('/')
+        self.pool = _get_shared_pool(self.api_url, pool_size)
+        self._cache_ttl = cache_ttl
+        self._cache_maxsize = cache_maxsize
+        self._cache = None
+        self._cache_lock = threading.Lock()
+
+    # HTTP
+
+    def _request(self, method, path, params=None, body=None, headers=None):
+        """Send a request to the Drive API, return (status, headers, body)"""
+        url = urlsplit(path if '://' in path else self.api_url + path)
+        target = url.path + ('?' + url.query if url.query else '')
+        if params:
+            target += ('&' if url.query else '?') + urlencode(params)
+        headers = dict(headers or {})
+        token = self.access_token
+        if not token and self.refresh is not None:
+            token = self._refresh_access_token(token)
+        headers['Authorization'] = 'Bearer ' + token
+        status, response_headers, data = self.pool.request(method, target, body, headers)
+        if status == 401 and self.refresh is not None:
+            headers['Authorization'] = 'Bearer ' + self._refresh_access_token(token)
+            status, response_headers, data = self.pool.request(method, target, body, headers)
+        if status >= 400:
+            try:
+                message = json.loads(data.decode('utf-8'))['error']['message']
+            except (ValueError, KeyError, TypeError):
+                message = data.decode('utf-8', 'replace')
+            raise HTTPError(status, 'Google Drive: %s' % message)
+        return status, response_headers, data
+
+    def _refresh_access_token(self, expired):
+        """Replace the access token `expired`, unless another thread did"""
+        with self._token_lock:
+            if self.access_token == expired:
+                self.access_token = self.refresh()
+            return self.access_token
+
+    def _json(self, method, path, params=None, resource=None):
+        body = headers = None
+        if resource is not None:
+            body = json.dumps(resource).encode('utf-8')
+            headers = {'Content-Type': 'application/json'}
+        _, _, data = self._request(method, path, params, body, headers)
+        return json.loads(data.decode('utf-8')) if data else None
+
+    def _upload(self, metadata, data, mime_type, file_id=None):
+        """Upload (or replace) the contents of a file in one multipart request"""
+        boundary = uuid.uuid4().hex
+        body = b''.join([
+            ('--%s\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n' % boundary).encode('utf-8'),
+            json.dumps(metadata).encode('utf-8'),
+            ('\r\n--%s\r\nContent-Type: %s\r\n\r\n' % (boundary, mime_type)).encode('utf-8'),
+            data,
+            ('\r\n--%s--' % boundary).encode('utf-8'),
+        ])
+        path = '/upload/drive/v2/files' + ('/' + file_id if file_id else '')
+        _, _, response = self._request(
+            'PUT' if file_id else 'POST', path,
+            {'uploadType': 'multipart', 'fields': FILE_FIELDS}, body,
+            {'Content-Type': 'multipart/related; boundary=%s' % boundary})
+        return json.loads(response.decode('utf-8'))
+
+    # path resolution
+
+    @property
+    def cache(self):
+        """The cache of the account, looked up on first use"""
+        if self._cache is None:
+            with self._cache_lock:
+                if self._cache is None:
+                    about = self._json('GET', '/drive/v2/about', {'fields': 'rootFolderId'})
+                    root = self._json('GET', '/drive/v2/files/' + about['rootFolderId'],
+                                      {'fields': FILE_FIELDS})
+                    cache = _get_shared_cache((self.api_url, about['rootFolderId']),
+                                              self._cache_ttl, self._cache_maxsize)
+                    cache.put('', root)
+                    self._cache = cache
+        return self._cache
+
+    def _resolve(self, path):
+        """The files resource at path, raising a 404 if there is none"""
+        resource = self.cache.get(path)
+        if resource is not None:
+            return resource
+        if path == '':
+            resource = self._json('GET', '/drive/v2/files/root', {'fields': FILE_FIELDS})
+            self.cache.put('', resource)
+            return resource
+        parent = self._resolve(_parent(path))
+        if parent['mimeType'] != FOLDER_MIME_TYPE:
+            raise HTTPError(404, 'No such file or directory: %s' % path)
+        found = self._json('GET', '/drive/v2/files', {
+            'q': '%s in parents and title = %s and trashed = false' % (
+                _quote(parent['id']), _quote(_name(path))),
+            'fields': 'items(%s)' % FILE_FIELDS,
+            'maxResults': 1,
+        })['items']
+        if not found:
+            raise HTTPError(404, 'No such file or directory: %s' % path)
+        self.cache.put(path, found[0])
+        return found[0]
+
+    def _refresh(self, path):
+        """The files resource at path, fetched again if it was cached"""
+        resource = self._resolve(path)
+        try:
+            resource = self._json('GET', '/drive/v2/files/' + resource['id'],
+                                  {'fields': FILE_FIELDS})
+        except HTTPError as e:
+            if e.status_code == 404:
+                self.cache.invalidate(path)
+            raise
+        self.cache.put(path, resource)
+        return resource
+
+    def _list(self, folder_id):
+        items = []
+        params = {
+            'q': '%s in parents and trashed = false' % _quote(folder_id),
+            'fields': 'nextPageToken,items(%s)' % FILE_FIELDS,
+            'maxResults': LIST_PAGE_SIZE,
+        }
+        while True:
+            page = self._json('GET', '/drive/v2/files', params)
+            items.extend(page.get('items', []))
+            if not page.get('nextPageToken'):
+                return items
+            params['pageToken'] = page['nextPageToken']
+
+    # models
+
+    def _model(self, path, resource):
+        title, mime_type = resource['title'], resource['mimeType']
+        if mime_type == FOLDER_MIME_TYPE:
+            kind = 'directory'
+        elif mime_type == NOTEBOOK_MIME_TYPE or title.endswith('.ipynb'):
+            kind = 'notebook'
+        else:
+            kind = 'file'
+        return {
+            'name': title if path else '',
+            'path': path,
+            'type': kind,
+            'created': _parse_date(resource.get('createdDate')),
+            'last_modified': _parse_date(resource.get('modifiedDate')),
+            'writable': resource.get('editable', True),
+            'mimetype': mime_type if kind == 'file' else None,
+            'content': None,
+            'format': None,
+        }
+
+    def _download(self, resource, revision=None):
+        url = '/drive/v2/files/' + resource['id']
+        if revision is not None:
+            url += '/revisions/' + revision
+        _, _, data = self._request('GET', url, {'alt': 'media'})
+        return data
+
+    # ContentsBackend API
+
+    def get(self, path, content=True, type=None, format=None):
+        resource = self._refresh(path) if content else self._resolve(path)
+        model = self._model(path, resource)
+        if type is not None and type != model['type'] and not (
+                type == 'file' and model['type'] == 'notebook'):
+            raise HTTPError(400, '%s is not a %s' % (path, type))
+        if type == 'file':
+            model['type'] = 'file'
+            model['mimetype'] = resource['mimeType']
+        if not content:
+            return model
+
+        if model['type'] == 'directory':
+            children = []
+            for child in self._list(resource['id']):
+                child_path = '/'.join(p for p in (path, child['title']) if p)
+                self.cache.put(child_path, child)
+                children.append(self._model(child_path, child))
+            model['content'] = children
+            model['format'] = 'json'
+        elif model['type'] == 'notebook':
+            data = self._download(resource)
+            model['content'] = nbformat.reads(data.decode('utf-8'), as_version=4)
+            model['format'] = 'json'
+        else:
+            data = self._download(resource)
+            if format != 'base64':
+                try:
+                    model['content'] = data.decode('utf-8')
+                    model['format'] = 'text'
+                except UnicodeDecodeError:
+                    if format == 'text':
+                        raise HTTPError(400, '%s is not UTF-8 encoded' % path, reason='bad format')
+            if model['content'] is None:
+                model['content'] = base64.b64encode(data).decode('ascii')
+                model['format'] = 'base64'
+                if model['mimetype'] in (None, 'text/plain'):
+                    model['mimetype'] = 'application/octet-stream'
+        return model
+
+    def save(self, model, path):
+        if 'type' not in model:
+            raise HTTPError(400, 'No file type provided')
+        kind = model['type']
+        if kind == 'directory':
+            try:
+                self._resolve(path)
+            except HTTPError as e:
+                if e.status_code != 404:
+                    raise
+            else:
+                return self.get(path, content=False)
+            parent = self._resolve(_parent(path))
+            resource = self._json('POST', '/drive/v2/files', {'fields': FILE_FIELDS}, {
+                'title': _name(path),
+                'mimeType': FOLDER_MIME_TYPE,
+                'parents': [{'id': parent['id']}],
+            })
+            self.cache.put(path, resource)
+            return self._model(path, resource)
+
+        if 'content' not in model:
+            raise HTTPError(400, 'No file content provided')
+        if kind == 'notebook':
+            data = nbformat.writes(nbformat.from_dict(model['content']), version=4).encode('utf-8')
+            mime_type = NOTEBOOK_MIME_TYPE
+        elif model.get('format') == 'base64':
+            data = base64.b64decode(model['content'].encode('ascii'))
+            mime_type = model.get('mimetype') or 'application/octet-stream'
+        else:
+            data = model['content'].encode('utf-8')
+            mime_type = model.get('mimetype') or 'text/plain'
+
+        try:
+            existing = self._resolve(path)
+        except HTTPError as e:
+            if e.status_code != 404:
+                raise
+            parent = self._resolve(_parent(path))
+            metadata = {'title': _name(path), 'mimeType': mime_type,
+                        'parents': [{'id': parent['id']}]}
+            resource = self._upload(metadata, data, mime_type)
+        else:
+            resource = self._upload({}, data, existing['mimeType'], existing['id'])
+        self.cache.put(path, resource)
+        return self._model(path, resource)
+
+    def delete_file(self, path):
+        if path == '':
+            raise HTTPError(400, 'Cannot delete the root of the Drive')
+        resource = self._resolve(path)
+        # to the Drive trash, like the notebook's delete_to_trash.
+        self._json('PATCH', '/drive/v2/files/' + resource['id'], {'fields': 'id'},
+                   {'labels': {'trashed': True}})
+        self.cache.invalidate(path)
+
+    def rename_file(self, old_path, new_path):
+        if old_path == new_path:
+            return
+        resource = self._resolve(old_path)
+        if self._exists(new_path) is not None:
+            raise HTTPError(409, 'File already exists: %s' % new_path)
+        patch = {'title': _name(new_path)}
+        if _parent(old_path) != _parent(new_path):
+            parent = self._resolve(_parent(new_path))
+            patch['parents'] = [{'id': parent['id']}]
+        resource = self._json('PATCH', '/drive/v2/files/' + resource['id'],
+                              {'fields': FILE_FIELDS}, patch)
+        self.cache.invalidate(old_path)
+        self.cache.put(new_path, resource)
+
+    def _exists(self, path):
+        try:
+            return self._resolve(path)
+        except HTTPError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    def file_exists(self, path):
+        resource = self._exists(path)
+        return resource is not None and resource['mimeType'] != FOLDER_MIME_TYPE
+
+    def dir_exists(self, path):
+        resource = self._exists(path)
+        return resource is not None and resource['mimeType'] == FOLDER_MIME_TYPE
+
+    # checkpoints, as pinned revisions
+
+    def _checkpoint_model(self, revision):
+        return {'id': revision['id'], 'last_modified': _parse_date(revision.get('modifiedDate'))}
+
+    def create_checkpoint(self, path):
+        resource = self._refresh(path)
+        revision = self._json(
+            'PATCH', '/drive/v2/files/%s/revisions/%s' % (resource['id'], resource['headRevisionId']),
+            {'fields': 'id,modifiedDate'}, {'pinned': True})
+        return self._checkpoint_model(revision)
+
+    def list_checkpoints(self, path):
+        resource = self._resolve(path)
+        revisions = self._json('GET', '/drive/v2/files/%s/revisions' % resource['id'],
+                               {'fields': 'items(id,modifiedDate,pinned)'})
+        return [self._checkpoint_model(r) for r in revisions.get('items', []) if r.get('pinned')]
+
+    def restore_checkpoint(self, checkpoint_id, path):
+        resource = self._resolve(path)
+        data = self._download(resource, checkpoint_id)
+        resource = self._upload({}, data, resource['mimeType'], resource['id'])
+        self.cache.put(path, resource)
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        resource = self._resolve(path)
+        self._json('PATCH', '/drive/v2/files/%s/revisions/%s' % (resource['id'], checkpoint_id),
+                   {'fields': 'id'}, {'pinned': False})
+
+
+class DriveContentsManager(ProxyContentsManager):
+    """Contents manager for Google Drive, running on the server.
+
+    Unlike `ClientSideContentsManager`, contents go through the server,
+    which talks to the Drive v2 REST API with `DriveBackend`: connections
+    are kept alive and pooled per API host, and the path to id resolutions
+    and metadata are cached per Drive account and shared by all the
+    managers connected to it.  Mount it with `MixedContentsManager`::
+
+        {'root': 'gdrive', 'contents': 'jupyterdrive.drivenbmanager.DriveContentsManager'}
+    """
+
+    access_token = Unicode('', config=True,
+    help="""
+    OAuth 2.0 access token of the Drive account, with a Drive scope.  It
+    expires after an hour, unless `refresh_token` or `token_provider` is
+    set to get new ones.
+    """)
+
+    refresh_token = Unicode('', config=True,
+    help="""
+    OAuth 2.0 refresh token of the Drive account, exchanged at `token_url`
+    for a new access token, with `client_id` and `client_secret`, whenever
+    Drive rejects the access token.
+    """)
+
+    client_id = Unicode('', config=True,
+    help="""
+    OAuth 2.0 client id the refresh token was issued to.
+    """)
+
+    client_secret = Unicode('', config=True,
+    help="""
+    OAuth 2.0 client secret the refresh token was issued to.
+    """)
+
+    token_url = Unicode('https://accounts.google.com/o/oauth2/token', config=True,
+    help="""
+    URL of the OAuth 2.0 token endpoint, where the refresh token is exchanged.
+    """)
+
+    token_provider = Any(None, config=True,
+    help="""
+    Callable without arguments returning a new access token, called instead
+    of using `refresh_token` whenever Drive rejects the access token.
+    """)
+
+    api_url = Unicode('https://www.googleapis.com', config=True,
+    help="""
+    Base URL of the Google APIs (eg: of a local stand-in server for tests).
+    """)
+
+    pool_size = Integer(10, config=True,
+    help="""
+    Maximum number of idle keep-alive connections kept per API host.  Only
+    the value of the first manager connecting to a host is used.
+    """)
+
+    cache_ttl = Float(30.0, config=True,
+    help="""
+    Time in seconds for which path resolutions and metadata are cached.
+    """)
+
+    cache_maxsize = Integer(10000, config=True,
+    help="""
+    Maximum number of paths cached per Drive account.
+    """)
+
+    def _create_backend(self):
+        refresh = self.token_provider
+        if refresh is None and self.refresh_token:
+            refresh = functools.partial(refresh_access_token, self.token_url, self.refresh_token,
+                                        self.client_id, self.client_secret)
+        return DriveBackend(self.access_token, self.api_url, self.pool_size,
+                            self.cache_ttl, self.cache_maxsize, refresh)
+
+    def get(self, path, content=True, type=None, format=None):
+        model = super(DriveContentsManager, self).get(path, content, type, format)
+        if content and model['type'] == 'notebook':
+            self.mark_trusted_cells(model['content'], path)
+            self.validate_notebook_model(model)
+        return model
+
+    def save(self, model, path):
+        path = path.strip('/')
+        self.run_pre_save_hook(model=model, path=path)
+        if model.get('type') == 'notebook' and 'content' in model:
+            nb = nbformat.from_dict(model['content'])
+            self.check_and_sign(nb, path)
+            model = dict(model, content=nb)
+        return super(DriveContentsManager, self).save(model, path)
@@ -0,0 +1,77 @@
+/**
+ * Prefix of the names of the IndexedDB databases of the cache, which are
+ * followed by the account.
+ * @type {string}
+ */
+export declare var CONTENT_CACHE_DB_NAME: string;
+/**
+ * Maximum total size of the cached contents, in characters.
+ * @type {number}
+ */
+export declare var CONTENT_CACHE_MAX_SIZE: number;
+export declare class ContentCache {
+    private _name;
+    private _max_size;
+    private _db_prm;
+    private _account;
+    private _account_prm;
+    private _resolve_account;
+    /**
+     * @param {string?} name Prefix of the names of the IndexedDB databases.
+     * @param {number?} max_size Maximum total size of the cached contents,
+     *     in characters.
+     */
+    constructor(name?: string, max_size?: number);
+    /**
+     * Sets the Google account of the user, whose database is used from now
+     * on.  The database of the previous account, in this or a previous
+     * session, is deleted.
+     * @param {string} account Identifier of the account, or null if the
+     *     user is not signed in, which disables the cache.
+     * @return {Promise} fullfilled once the database of the previous
+     *     account is deleted.
+     */
+    set_account(account: string): Promise<any>;
+    /**
+     * Deletes the cached contents of the account of the user, who signed
+     * out, and disables the cache until `set_account` is called again.
+     * @return {Promise} fullfilled once the database is deleted.
+     */
+    sign_out(): Promise<any>;
+    /**
+     * Opens the database of the account on first use.
+     * @return {Promise} fullfilled with the IDBDatabase, or null if it
+     *     cannot be opened or the account is not known.
+     */
+    private _db();
+    /**
+     * Looks up the contents of a revision of a file, and marks them as used.
+     * @param {string} file_id The id of the file.
+     * @param {string} revision The id of the revision, usually the
+     *     `headRevisionId` of the files resource.
+     * @return {Promise} fullfilled with the contents, or undefined if they
+     *     are not cached.
+     */
+    get(file_id: string, revision: string): Promise<string>;
+    /**
+     * Stores the contents of a revision of a file, replacing the cached
+     * contents of other revisions of the file, and evicts the least recently
+     * used entries until the cache fits its maximum size.
+     * @param {string} file_id The id of the file.
+     * @param {string} revision The id of the revision of these contents.
+     * @param {string} contents The contents of the file, as downloaded.
+     * @return {Promise} fullfilled when the contents are stored.
+     */
+    put(file_id: string, revision: string, contents: string): Promise<any>;
+    /**
+     * Removes the cached contents of a file.
+     * @param {string} file_id The id of the file.
+     * @return {Promise} fullfilled when the contents are removed.
+     */
+    forget(file_id: string): Promise<any>;
+    /**
+     * Removes all the cached contents.
+     * @return {Promise} fullfilled when the cache is empty.
+     */
+    clear(): Promise<any>;
+}
@@ -16,6 +16,8 @@ export declare class GoogleDriveContents implements IContents {
     private _base_url;
     private _config;
     private _last_observed_revision;
+    private _last_observed_md5;
+    private _content_cache;
     /**
      *
      * A contentmanager handles passing file operations
@@ -37,37 +39,79 @@ export declare class GoogleDriveContents implements IContents {
      * information is used for two purposes.  First, it is used to determine
      * if another user has changed a file, in order to warn a user that they
      * may be overwriting another user's work.  Second, it is used to
-     * checkpoint after saving.
+     * checkpoint after saving.  The md5Checksum of the contents is cached as
+     * well, to detect saves of unchanged contents.
      *
      * @param {resource} resource_prm a Google Drive file resource.
      */
     private _observe_file_resource(resource);
+    /**
+     * Keeps the contents cache on the Google account of the user, which may
+     * change with each authorization, and empties it when the user signs out.
+     *
+     * @param {boolean} signed_in Whether the user is signed in.
+     */
+    private _on_auth_change(signed_in);
+    /**
+     * Caches the contents just uploaded for a file, so that opening it again
+     * does not download them while its head revision is the uploaded one.
+     * Base64 contents are not cached, as they are downloaded decoded.
+     *
+     * @param {Object} resource The files resource returned by the upload.
+     * @param {Object} model The IPython model object that was saved
+     * @param {string} contents The uploaded contents.
+     */
+    private _cache_contents(resource, model, contents);
+    /**
+     * Whether Drive still has `contents` for the file of `resource`, as they
+     * were last saved or loaded.  The contents are only hashed when their
+     * size matches the file's, as hashing a large notebook takes a while on
+     * the main thread.  Base64 contents are uploaded decoded, so they never
+     * match the md5Checksum and are not hashed.
+     *
+     * @param {Object} resource The Drive resource representing the file
+     * @param {Object} model The IPython model object to be saved
+     * @param {string} contents The contents to upload.
+     */
+    private _is_unchanged(resource, model, contents);
     /**
      * Saves a version of an existing file on drive
      * @param {Object} resource The Drive resource representing the file
      * @param {Object} model The IPython model object to be saved
+     * @param {Object?} opt_params Parameters of `driveutils.upload_to_drive`
      * @return {Promise} A promise fullfilled with the resource of the saved file.
      */
-    private _save_existing(resource, model);
+    private _save_existing(resource, model, opt_params?);
     /**
      * Uploads a model to drive
      * @param {string} folder_id The id of the folder to create the file in
      * @param {Object} model The IPython model object to be saved
+     * @param {Object?} opt_params Parameters of `driveutils.upload_to_drive`
      * @return {Promise} A promise fullfilled with the resource of the saved file.
      */
-    private _upload_new(folder_id, model);
+    private _upload_new(folder_id, model, opt_params?);
     /**
      * Notebook Functions
      */
-    get(path: Path, options: any): Promise<{
-        type: string;
-        name: any;
-        path: iface.Path;
-        created: any;
-        last_modified: any;
-        content: any;
-        writable: any;
-    }>;
+    /**
+     * Get a file or notebook.  Besides the options of the contents API,
+     * `options` may have:
+     *     format: 'binary' to get the content of a file as an ArrayBuffer,
+     *         or 'base64' to get it in base64, encoded from its bytes.
+     *     head, tail: a positive number of bytes to read at the start, or
+     *         at the end, of a text file.  The model then has a `range`
+     *         {start, end, size}: the offsets of the text in the file and
+     *         the size of the file.
+     *     on_chunk: function(chunk, loaded, size) called with the text (or,
+     *         for binary formats, the bytes) of each chunk of a large file
+     *         as it is downloaded.
+     */
+    get(path: Path, options: any): any;
+    /**
+     * Reads a file as bytes, or part of a text file, for `get`.  These reads
+     * do not go through the content cache, which holds whole texts.
+     */
+    private _get_bytes(path, resource, options);
     /**
      * Creates a new untitled file or directory in the specified directory path.
      *
@@ -83,6 +127,9 @@ export declare class GoogleDriveContents implements IContents {
      * Given a path and a model, save the document.
      * If the resource has been modifeied on Drive in the
      * meantime, prompt user for overwrite.
+     *
+     * options.progress, if given, is called with the bytes sent and the
+     * total size during the upload of large files.
      **/
     save(path: Path, model: any, options?: any): any;
     copy(path: Path, model: any): Promise<any>;
@@ -108,9 +155,14 @@ export declare class GoogleDriveContents implements IContents {
      *     path: the path
      * @method list_notebooks
      * @param {String} path The path to list notebooks in
-     * @param {Object} options Object with the following keys
-     *     success: success callback
-     *     error: error callback
+     * @param {Object} options Object with the following optional keys
+     *     on_page: called with each page of the listing, as
+     *         `{content: [...]}`, as soon as it arrives.  The pages are then
+     *         not kept, and the returned listing is empty.
+     *     order_by: sort order applied by Drive, e.g. 'folder,title'
+     *     limit: maximum number of items to list
+     * When the Drive index is enabled (see `drive-index`), listings without
+     * order_by are answered from it.
      */
     list_contents(path: Path, options: any): Promise<any>;
 }
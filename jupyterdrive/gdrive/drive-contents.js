@@ -1,5 +1,5 @@
 // AUTOMATICALY GENERATED FILE, see cooresponding .ts file
-define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './gapiutils', './driveutils', './notebook_model'], function (require, exports, $, utils, dialog, gapiutils, driveutils, notebook_model) {
+define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './gapiutils', './driveutils', './notebook_model', './md5', './content-cache', './drive-index'], function (require, exports, $, utils, dialog, gapiutils, driveutils, notebook_model, md5, content_cache, drive_index) {
     // Copyright (c) IPython Development Team.
     // Distributed under the terms of the Modified BSD License.
     //
@@ -56,6 +56,35 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
         };
         return [metadata, content];
     };
+    /**
+     * Like `contents_model_to_metadata_and_bytes`, but serialises large
+     * notebooks in a Web Worker (see `notebook_model`).
+     */
+    var contents_model_to_metadata_and_bytes_async = function (model) {
+        if (model['type'] !== 'notebook' || typeof (model.content) === 'string') {
+            return new Promise(function (resolve, reject) {
+                resolve(contents_model_to_metadata_and_bytes(model));
+            });
+        }
+        return notebook_model.file_contents_from_notebook_async(model.content)
+            .then(function (content) {
+            var metadata = {
+                'title': model['name'],
+                'mimeType': driveutils.NOTEBOOK_MIMETYPE
+            };
+            return [metadata, content];
+        });
+    };
+    /**
+     * Number of items requested per call to drive.files.list, the maximum
+     * allowed by Drive.
+     */
+    var LIST_PAGE_SIZE = 1000;
+    /**
+     * Fields of drive.files.list responses used for listings, see
+     * `files_resource_to_contents_model`.
+     */
+    var LIST_FIELDS = 'nextPageToken,items(id,title,mimeType,createdDate,modifiedDate,editable)';
     /**
      * Converts a Google Drive files resource, (see https://developers.google.com/drive/v2/reference/files)
      * to an IPEP 27 contents model (see https://github.com/ipython/ipython/wiki/IPEP-27:-Contents-Service)
@@ -133,10 +162,24 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
              * when checking if a file has been modified by another user.
              */
             this._last_observed_revision = {};
+            /**
+             * Stores the md5Checksum of the contents from the last save or load,
+             * to skip saves that would not change the file.
+             */
+            this._last_observed_md5 = {};
+            /**
+             * Contents of the files loaded or saved, by id and revision, so that
+             * unchanged files are not downloaded again.
+             */
+            this._content_cache = new content_cache.ContentCache();
+            gapiutils.on_auth_change(function (signed_in) { return _this._on_auth_change(signed_in); });
             var that = this;
             this._config.loaded.then(function (data) {
                 gapiutils.config(_this._config);
                 gapiutils.gapi_ready.then(driveutils.set_user_info);
+                if ((_this._config.data['gdrive'] || {})['SYNC_INDEX']) {
+                    gapiutils.gapi_ready.then(function () { return drive_index.index.start(); });
+                }
             });
         }
         /**
@@ -148,93 +191,260 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
          * information is used for two purposes.  First, it is used to determine
          * if another user has changed a file, in order to warn a user that they
          * may be overwriting another user's work.  Second, it is used to
-         * checkpoint after saving.
+         * checkpoint after saving.  The md5Checksum of the contents is cached as
+         * well, to detect saves of unchanged contents.
          *
          * @param {resource} resource_prm a Google Drive file resource.
          */
         GoogleDriveContents.prototype._observe_file_resource = function (resource) {
             this._last_observed_revision[resource['id']] = resource['headRevisionId'];
+            this._last_observed_md5[resource['id']] = resource['md5Checksum'];
+        };
+        /**
+         * Keeps the contents cache on the Google account of the user, which may
+         * change with each authorization, and empties it when the user signs out.
+         *
+         * @param {boolean} signed_in Whether the user is signed in.
+         */
+        GoogleDriveContents.prototype._on_auth_change = function (signed_in) {
+            var cache = this._content_cache;
+            if (!signed_in) {
+                cache.sign_out();
+                return;
+            }
+            driveutils.get_user_id().then(function (account) {
+                return cache.set_account(account);
+            }, function (error) {
+                console.warn('[drive-contents.js] Cannot identify the Google account', error);
+                return cache.sign_out();
+            });
+        };
+        /**
+         * Caches the contents just uploaded for a file, so that opening it again
+         * does not download them while its head revision is the uploaded one.
+         * Base64 contents are not cached, as they are downloaded decoded.
+         *
+         * @param {Object} resource The files resource returned by the upload.
+         * @param {Object} model The IPython model object that was saved
+         * @param {string} contents The uploaded contents.
+         */
+        GoogleDriveContents.prototype._cache_contents = function (resource, model, contents) {
+            if (model['format'] !== 'base64') {
+                this._content_cache.put(resource['id'], resource['headRevisionId'], contents);
+            }
+        };
+        /**
+         * Whether Drive still has `contents` for the file of `resource`, as they
+         * were last saved or loaded.  The contents are only hashed when their
+         * size matches the file's, as hashing a large notebook takes a while on
+         * the main thread.  Base64 contents are uploaded decoded, so they never
+         * match the md5Checksum and are not hashed.
+         *
+         * @param {Object} resource The Drive resource representing the file
+         * @param {Object} model The IPython model object to be saved
+         * @param {string} contents The contents to upload.
+         */
+        GoogleDriveContents.prototype._is_unchanged = function (resource, model, contents) {
+            var observed = this._last_observed_md5[resource['id']];
+            var size = Number(resource['fileSize']);
+            // UTF-8 takes 1 to 3 bytes per character (4 per surrogate pair).
+            if (model['format'] === 'base64' || !observed ||
+                observed !== resource['md5Checksum'] ||
+                contents.length > size || contents.length * 3 < size) {
+                return false;
+            }
+            var bytes = md5.utf8_bytes(contents);
+            return bytes.length === size && md5.md5_bytes(bytes) === observed;
         };
         /**
          * Saves a version of an existing file on drive
          * @param {Object} resource The Drive resource representing the file
          * @param {Object} model The IPython model object to be saved
+         * @param {Object?} opt_params Parameters of `driveutils.upload_to_drive`
          * @return {Promise} A promise fullfilled with the resource of the saved file.
          */
-        GoogleDriveContents.prototype._save_existing = function (resource, model) {
+        GoogleDriveContents.prototype._save_existing = function (resource, model, opt_params) {
             var that = this;
             if (typeof (model) == 'string') {
                 var e = new Error("[drive-contents.ts] `_save_existing`'s model is a string");
                 console.error(e);
                 throw e;
             }
-            var converted = contents_model_to_metadata_and_bytes(model);
-            var contents = converted[1];
-            var save = function () {
-                return driveutils.upload_to_drive(contents, undefined, resource['id']);
-            };
-            if (resource['headRevisionId'] !=
-                that._last_observed_revision[resource['id']]) {
-                // The revision id of the files resource does not match the
-                // cached revision id for this file.  This implies that the
-                // file has been modified by another user/tab during this
-                // session.  Before saving, the user must be warned that they
-                // may be overwriting the work of another user.
-                return new Promise(function (resolve, reject) {
-                    var options = {
-                        title: 'File modified by other user',
-                        body: ('Another user has modified this file.  Click'
-                            + ' ok to overwrite this file with your'
-                            + ' content.'),
-                        buttons: {
-                            'ok': { click: function () { resolve(save()); },
-                            },
-                            'cancel': { click: function () { reject(new Error('save cancelled')); } }
-                        }
-                    };
-                    dialog.modal(options);
-                });
-            }
-            return save();
+            return contents_model_to_metadata_and_bytes_async(model)
+                .then(function (converted) {
+                var contents = converted[1];
+                // Autosave fires even when nothing changed: if Drive still has the
+                // contents last saved or loaded, and they are the ones to save,
+                // there is nothing to upload.
+                if (that._is_unchanged(resource, model, contents)) {
+                    return Promise.resolve(resource);
+                }
+                var save = function () {
+                    return driveutils.upload_to_drive(contents, undefined, resource['id'], opt_params)
+                        .then(function (saved) {
+                        drive_index.index.update(saved);
+                        that._cache_contents(saved, model, contents);
+                        return saved;
+                    });
+                };
+                if (resource['headRevisionId'] !=
+                    that._last_observed_revision[resource['id']]) {
+                    // The revision id of the files resource does not match the
+                    // cached revision id for this file.  This implies that the
+                    // file has been modified by another user/tab during this
+                    // session.  Before saving, the user must be warned that they
+                    // may be overwriting the work of another user.
+                    return new Promise(function (resolve, reject) {
+                        var options = {
+                            title: 'File modified by other user',
+                            body: ('Another user has modified this file.  Click'
+                                + ' ok to overwrite this file with your'
+                                + ' content.'),
+                            buttons: {
+                                'ok': { click: function () { resolve(save()); },
+                                },
+                                'cancel': { click: function () { reject(new Error('save cancelled')); } }
+                            }
+                        };
+                        dialog.modal(options);
+                    });
+                }
+                return save();
+            });
         };
         /**
          * Uploads a model to drive
          * @param {string} folder_id The id of the folder to create the file in
          * @param {Object} model The IPython model object to be saved
+         * @param {Object?} opt_params Parameters of `driveutils.upload_to_drive`
          * @return {Promise} A promise fullfilled with the resource of the saved file.
          */
-        GoogleDriveContents.prototype._upload_new = function (folder_id, model) {
+        GoogleDriveContents.prototype._upload_new = function (folder_id, model, opt_params) {
             var that = this;
             if (typeof (model) == 'string') {
                 var e = new Error("[drive-contents.ts] `_save_existing`'s model is a string");
                 console.error(e);
                 throw e;
             }
-            var converted = contents_model_to_metadata_and_bytes(model);
-            var metadata = converted[0];
-            var contents = converted[1];
-            metadata['parents'] = [{ 'id': folder_id }];
-            if (model['type'] === 'directory') {
-                return gapiutils.execute(gapi.client.drive.files.insert({ 'resource': metadata }));
-            }
-            else {
-                return driveutils.upload_to_drive(contents, metadata);
-            }
+            return contents_model_to_metadata_and_bytes_async(model)
+                .then(function (converted) {
+                var metadata = converted[0];
+                var contents = converted[1];
+                metadata['parents'] = [{ 'id': folder_id }];
+                var upload;
+                var type = driveutils.FileType.FILE;
+                if (model['type'] === 'directory') {
+                    upload = gapiutils.execute_batched(gapi.client.drive.files.insert({ 'resource': metadata }));
+                    type = driveutils.FileType.FOLDER;
+                }
+                else {
+                    upload = driveutils.upload_to_drive(contents, metadata, undefined, opt_params);
+                }
+                return upload.then(function (resource) {
+                    driveutils.resource_id_cache.store(folder_id, resource['title'], type, resource);
+                    drive_index.index.update(resource);
+                    if (type === driveutils.FileType.FILE) {
+                        that._cache_contents(resource, model, contents);
+                    }
+                    return resource;
+                });
+            });
         };
         /**
          * Notebook Functions
          */
+        /**
+         * Get a file or notebook.  Besides the options of the contents API,
+         * `options` may have:
+         *     format: 'binary' to get the content of a file as an ArrayBuffer,
+         *         or 'base64' to get it in base64, encoded from its bytes.
+         *     head, tail: a positive number of bytes to read at the start, or
+         *         at the end, of a text file.  The model then has a `range`
+         *         {start, end, size}: the offsets of the text in the file and
+         *         the size of the file.
+         *     on_chunk: function(chunk, loaded, size) called with the text (or,
+         *         for binary formats, the bytes) of each chunk of a large file
+         *         as it is downloaded.
+         */
         GoogleDriveContents.prototype.get = function (path, options) {
             var that = this;
+            options = options || {};
             var metadata_prm = gapiutils.gapi_ready.then($.proxy(driveutils.get_resource_for_path, this, path, driveutils.FileType.FILE));
+            var format = options['format'];
+            if (format === 'binary' || format === 'base64' ||
+                options['head'] !== undefined || options['tail'] !== undefined) {
+                return metadata_prm.then(function (resource) {
+                    return that._get_bytes(path, resource, options);
+                });
+            }
             var contents_prm = metadata_prm.then(function (resource) {
                 that._observe_file_resource(resource);
-                return driveutils.get_contents(resource, false);
+                var revision = resource['headRevisionId'];
+                return that._content_cache.get(resource['id'], revision)
+                    .then(function (cached) {
+                    if (cached !== undefined) {
+                        return cached;
+                    }
+                    var streaming = typeof TextDecoder !== 'undefined' &&
+                        Number(resource['fileSize']) >= driveutils.STREAMING_DOWNLOAD_THRESHOLD;
+                    var download = streaming ?
+                        driveutils.get_contents_text(resource, options['on_chunk']) :
+                        driveutils.get_contents(resource, false);
+                    return download
+                        .then(function (contents) {
+                        that._content_cache.put(resource['id'], revision, contents);
+                        return contents;
+                    });
+                });
             });
             return Promise.all([metadata_prm, contents_prm]).then(function (values) {
                 var metadata = values[0];
                 var contents = values[1];
-                var model = files_resource_to_contents_model(path, metadata, contents);
+                var model = files_resource_to_contents_model(path, metadata);
+                if (model.type !== 'notebook') {
+                    model.content = contents;
+                    return model;
+                }
+                return notebook_model.notebook_from_file_contents_async(contents)
+                    .then(function (notebook) {
+                    model.content = notebook;
+                    return model;
+                });
+            });
+        };
+        /**
+         * Reads a file as bytes, or part of a text file, for `get`.  These reads
+         * do not go through the content cache, which holds whole texts.
+         */
+        GoogleDriveContents.prototype._get_bytes = function (path, resource, options) {
+            var model = files_resource_to_contents_model(path, resource);
+            model['mimetype'] = resource['mimeType'];
+            var head = options['head'];
+            var tail = options['tail'];
+            if (head !== undefined || tail !== undefined) {
+                var range_prm = head !== undefined ?
+                    driveutils.get_text_range(resource, 0, head - 1) :
+                    driveutils.get_text_range(resource, -tail);
+                return range_prm.then(function (range) {
+                    model.content = range.text;
+                    model['format'] = 'text';
+                    model['range'] = { start: range.start, end: range.end, size: range.size };
+                    return model;
+                });
+            }
+            var on_chunk = options['on_chunk'];
+            var on_bytes = on_chunk && function (data, offset, size) {
+                on_chunk(data, offset + data.byteLength, size);
+            };
+            return driveutils.get_contents_binary(resource, on_bytes)
+                .then(function (buffer) {
+                if (options['format'] === 'binary') {
+                    model.content = buffer;
+                }
+                else {
+                    model.content = driveutils.bytes_to_base64(buffer);
+                }
+                model['format'] = options['format'];
                 return model;
             });
         };
@@ -300,12 +510,18 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
             });
         };
         GoogleDriveContents.prototype.delete = function (path) {
+            var that = this;
             return gapiutils.gapi_ready
                 .then(function () {
-                return driveutils.get_id_for_path(path, driveutils.FileType.FILE);
-            })
-                .then(function (file_id) {
-                return gapiutils.execute(gapi.client.drive.files.delete({ 'fileId': file_id }));
+                return driveutils.with_id_for_path(path, driveutils.FileType.FILE, function (file_id) {
+                    return gapiutils.execute_batched(gapi.client.drive.files.delete({ 'fileId': file_id }))
+                        .then(function (result) {
+                        driveutils.resource_id_cache.forget(file_id);
+                        drive_index.index.remove(file_id);
+                        that._content_cache.forget(file_id);
+                        return result;
+                    });
+                });
             });
         };
         GoogleDriveContents.prototype.rename = function (path, new_path) {
@@ -336,17 +552,18 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
             }
             return gapiutils.gapi_ready
                 .then(function () {
-                return driveutils.get_id_for_path(path);
-            })
-                .then(function (file_id) {
-                var body = { 'title': new_name };
-                var request = gapi.client.drive.files.patch({
-                    'fileId': file_id,
-                    'resource': body
+                return driveutils.with_id_for_path(path, undefined, function (file_id) {
+                    var body = { 'title': new_name };
+                    var request = gapi.client.drive.files.patch({
+                        'fileId': file_id,
+                        'resource': body
+                    });
+                    return gapiutils.execute_batched(request);
                 });
-                return gapiutils.execute(request);
             })
                 .then(function (resource) {
+                driveutils.resource_id_cache.forget(resource['id']);
+                drive_index.index.update(resource);
                 that._observe_file_resource(resource);
                 return files_resource_to_contents_model(new_path, resource);
             });
@@ -355,9 +572,13 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
          * Given a path and a model, save the document.
          * If the resource has been modifeied on Drive in the
          * meantime, prompt user for overwrite.
+         *
+         * options.progress, if given, is called with the bytes sent and the
+         * total size during the upload of large files.
          **/
         GoogleDriveContents.prototype.save = function (path, model, options) {
             var that = this;
+            var params = { 'progress': (options || {})['progress'] };
             var path_and_filename = utils.url_path_split(path);
             var path = path_and_filename[0];
             var filename = path_and_filename[1];
@@ -365,7 +586,7 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
                 .then(function (folder_resource) {
                 return driveutils.get_resource_for_relative_path(filename, driveutils.FileType.FILE, false, folder_resource['id'])
                     .then(function (file_resource) {
-                    return that._save_existing(file_resource, model);
+                    return that._save_existing(file_resource, model, params);
                 }, function (error) {
                     // If the file does not exist (but the directory does) then a
                     // new file must be uploaded.
@@ -373,7 +594,7 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
                         return Promise.reject(error);
                     }
                     model['name'] = filename;
-                    return that._upload_new(folder_resource['id'], model);
+                    return that._upload_new(folder_resource['id'], model, params);
                 });
             })
                 .then(function (file_resource) {
@@ -392,19 +613,20 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
         GoogleDriveContents.prototype.create_checkpoint = function (path, options) {
             var that = this;
             return gapiutils.gapi_ready
-                .then($.proxy(driveutils.get_id_for_path, this, path, driveutils.FileType.FILE))
-                .then(function (file_id) {
-                var revision_id = that._last_observed_revision[file_id];
-                if (!revision_id) {
-                    return Promise.reject(new Error('File must be saved before checkpointing'));
-                }
-                var body = { 'pinned': true };
-                var request = gapi.client.drive.revisions.patch({
-                    'fileId': file_id,
-                    'revisionId': revision_id,
-                    'resource': body
+                .then(function () {
+                return driveutils.with_id_for_path(path, driveutils.FileType.FILE, function (file_id) {
+                    var revision_id = that._last_observed_revision[file_id];
+                    if (!revision_id) {
+                        return Promise.reject(new Error('File must be saved before checkpointing'));
+                    }
+                    var body = { 'pinned': true };
+                    var request = gapi.client.drive.revisions.patch({
+                        'fileId': file_id,
+                        'revisionId': revision_id,
+                        'resource': body
+                    });
+                    return gapiutils.execute_batched(request);
                 });
-                return gapiutils.execute(request);
             })
                 .then(function (item) {
                 return {
@@ -415,31 +637,30 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
             });
         };
         GoogleDriveContents.prototype.restore_checkpoint = function (path, checkpoint_id, options) {
-            var file_id_prm = gapiutils.gapi_ready
-                .then($.proxy(driveutils.get_id_for_path, this, path, driveutils.FileType.FILE));
-            var contents_prm = file_id_prm.then(function (file_id) {
-                var request = gapi.client.drive.revisions.get({
-                    'fileId': file_id,
-                    'revisionId': checkpoint_id
+            return gapiutils.gapi_ready
+                .then(function () {
+                return driveutils.with_id_for_path(path, driveutils.FileType.FILE, function (file_id) {
+                    var request = gapi.client.drive.revisions.get({
+                        'fileId': file_id,
+                        'revisionId': checkpoint_id
+                    });
+                    return gapiutils.execute_batched(request)
+                        .then(function (response) {
+                        return gapiutils.download(response['downloadUrl']);
+                    })
+                        .then(function (contents) {
+                        return driveutils.upload_to_drive(contents, undefined, file_id);
+                    });
                 });
-                return gapiutils.execute(request);
-            })
-                .then(function (response) {
-                return gapiutils.download(response['downloadUrl']);
-            });
-            return Promise.all([file_id_prm, contents_prm])
-                .then(function (values) {
-                var file_id = values[0];
-                var contents = values[1];
-                return driveutils.upload_to_drive(contents, undefined, file_id);
             });
         };
         GoogleDriveContents.prototype.list_checkpoints = function (path, options) {
             return gapiutils.gapi_ready
-                .then($.proxy(driveutils.get_id_for_path, this, path, driveutils.FileType.FILE))
-                .then(function (file_id) {
-                var request = gapi.client.drive.revisions.list({ 'fileId': file_id });
-                return gapiutils.execute(request);
+                .then(function () {
+                return driveutils.with_id_for_path(path, driveutils.FileType.FILE, function (file_id) {
+                    var request = gapi.client.drive.revisions.list({ 'fileId': file_id });
+                    return gapiutils.execute_batched(request);
+                });
             })
                 .then(function (response) {
                 return response['items']
@@ -469,51 +690,87 @@ define(["require", "exports", 'jquery', 'base/js/utils', 'base/js/dialog', './ga
          *     path: the path
          * @method list_notebooks
          * @param {String} path The path to list notebooks in
-         * @param {Object} options Object with the following keys
-         *     success: success callback
-         *     error: error callback
+         * @param {Object} options Object with the following optional keys
+         *     on_page: called with each page of the listing, as
+         *         `{content: [...]}`, as soon as it arrives.  The pages are then
+         *         not kept, and the returned listing is empty.
+         *     order_by: sort order applied by Drive, e.g. 'folder,title'
+         *     limit: maximum number of items to list
+         * When the Drive index is enabled (see `drive-index`), listings without
+         * order_by are answered from it.
          */
         GoogleDriveContents.prototype.list_contents = function (path, options) {
             var that = this;
+            var params = options || {};
+            var on_page = params['on_page'];
+            var limit = params['limit'];
             return gapiutils.gapi_ready
                 .then($.proxy(driveutils.get_id_for_path, this, path, driveutils.FileType.FOLDER))
                 .then(function (folder_id) {
-                // Gets contents of the folder 1000 items at a time.  Google Drive
-                // returns at most 1000 items in each call to drive.files.list.
-                // Therefore we need to make multiple calls, using the following
-                // recursive method.
+                if (drive_index.index.is_ready() && !params['order_by']) {
+                    return drive_index.index.fresh().then(function () {
+                        var items = drive_index.index.children(folder_id);
+                        if (limit) {
+                            items = items.slice(0, limit);
+                        }
+                        var page = $.map(items, function (resource) {
+                            var fullpath = utils.url_path_join(path, resource['title']);
+                            return files_resource_to_contents_model(fullpath, resource);
+                        });
+                        if (on_page) {
+                            on_page({ content: page });
+                            return [];
+                        }
+                        return page;
+                    });
+                }
+                // Gets contents of the folder LIST_PAGE_SIZE items at a time.
+                // Google Drive returns at most 1000 items in each call to
+                // drive.files.list.  Therefore we need to make multiple calls,
+                // using the following recursive method.
                 // Returns all items starting from the specified page token
                 // (or from the start if no page token is specified), and
                 // combines these with the items given.
-                var get_items = function (items, page_token) {
+                var get_items = function (items, count, page_token) {
                     var query = ('\'' + folder_id + '\' in parents'
                         + ' and trashed = false');
-                    var params = {
-                        'maxResults': 1000,
-                        'q': query
+                    var request_params = {
+                        'maxResults': limit ? Math.min(limit - count, LIST_PAGE_SIZE) : LIST_PAGE_SIZE,
+                        'q': query,
+                        'fields': LIST_FIELDS
                     };
+                    if (params['order_by']) {
+                        request_params['orderBy'] = params['order_by'];
+                    }
                     if (page_token) {
-                        params['pageToken'] = page_token;
+                        request_params['pageToken'] = page_token;
                     }
                     ;
-                    var request = gapi.client.drive.files.list(params);
-                    return gapiutils.execute(request)
+                    var request = gapi.client.drive.files.list(request_params);
+                    return gapiutils.execute_batched(request, gapiutils.Priority.BACKGROUND)
                         .then(function (response) {
-                        var combined_items = items.concat(response['items']);
+                        var page = $.map(response['items'] || [], function (resource) {
+                            var fullpath = utils.url_path_join(path, resource['title']);
+                            return files_resource_to_contents_model(fullpath, resource);
+                        });
+                        var combined_items = items;
+                        if (on_page) {
+                            on_page({ content: page });
+                        }
+                        else {
+                            combined_items = items.concat(page);
+                        }
+                        count += page.length;
                         var next_page_token = response['nextPageToken'];
-                        if (next_page_token) {
-                            return get_items(combined_items, next_page_token);
+                        if (next_page_token && !(limit && count >= limit)) {
+                            return get_items(combined_items, count, next_page_token);
                         }
                         return combined_items;
                     });
                 };
-                return get_items([]);
+                return get_items([], 0);
             })
-                .then(function (items) {
-                var list = $.map(items, function (resource) {
-                    var fullpath = utils.url_path_join(path, resource['title']);
-                    return files_resource_to_contents_model(fullpath, resource);
-                });
+                .then(function (list) {
                 return { content: list };
             });
         };
@@ -0,0 +1,93 @@
+/**
+ * Time between two polls of the changes feed, in milliseconds.
+ * @type {number}
+ */
+export declare var SYNC_POLL_INTERVAL: number;
+/**
+ * Age of the index, in milliseconds, above which listings first poll the
+ * changes feed.
+ * @type {number}
+ */
+export declare var SYNC_MAX_AGE: number;
+export declare class DriveIndex {
+    private _files;
+    private _children;
+    private _root_id;
+    private _page_token;
+    private _build_prm;
+    private _ready;
+    private _synced;
+    private _sync_prm;
+    private _poll_timeout;
+    constructor();
+    /**
+     * Builds the index, then polls the changes feed every `poll_interval`.
+     * Does nothing if the index is already started.
+     * @param {number} poll_interval Time between two polls, in milliseconds.
+     * @return {Promise} fullfilled when the index is built.
+     */
+    start(poll_interval?: number): Promise<any>;
+    /**
+     * Stops polling and empties the index.
+     */
+    stop(): void;
+    /**
+     * Whether the index is built, and can answer lookups.
+     */
+    is_ready(): boolean;
+    /**
+     * Adds or updates a files resource, removing it if it is trashed.  Also
+     * used to record the changes made by this client without waiting for
+     * the next poll.
+     * @param {Object} resource A files resource, with at least FILE_FIELDS.
+     */
+    update(resource: any): void;
+    /**
+     * Removes a file or folder.  The children of a folder are kept, but are
+     * no longer reachable from the root.
+     * @param {string} id The id of the file or folder.
+     */
+    remove(id: string): void;
+    /**
+     * The files resources of the children of a folder.
+     * @param {string} folder_id The id of the folder, or 'root'.
+     * @return {Array} the resources, with FILE_FIELDS only.
+     */
+    children(folder_id: string): any[];
+    /**
+     * Finds the children of a folder with a given title.  When there are
+     * none, the changes feed is polled first, in case they were created
+     * since the last poll.
+     * @param {string} folder_id The id of the folder, or 'root'.
+     * @param {string} title The title to look for.
+     * @param {string?} mime_type If given, the mime type to look for.
+     * @return {Promise} fullfilled with the resources found.
+     */
+    find(folder_id: string, title: string, mime_type?: string): Promise<any[]>;
+    /**
+     * Polls the changes feed if the index is older than `max_age`.
+     * @param {number} max_age Maximum age of the index, in milliseconds.
+     * @return {Promise} fullfilled when the index is that recent.
+     */
+    fresh(max_age?: number): Promise<any>;
+    /**
+     * Applies the changes made since the last poll.  Concurrent calls share
+     * the same poll.
+     * @return {Promise} fullfilled when the changes are applied.
+     */
+    sync(): Promise<any>;
+    /**
+     * Adds all the files that are not trashed, a page at a time.
+     */
+    private _list_files(page_token?);
+    /**
+     * Applies the changes from the current page token, a page at a time.
+     */
+    private _apply_changes();
+    private _schedule_poll(poll_interval);
+}
+/**
+ * The index used by `driveutils` and `GoogleDriveContents`, started by the
+ * latter when the `SYNC_INDEX` option is set.
+ */
+export declare var index: DriveIndex;
@@ -0,0 +1,296 @@
+// AUTOMATICALY GENERATED FILE, see cooresponding .ts file
+// Copyright (c) IPython Development Team.
+// Distributed under the terms of the Modified BSD License.
+define(["require", "exports", './gapiutils'], function (require, exports, gapiutils) {
+    "use strict";
+    /**
+     * Local index of the metadata of the user's Drive files, kept current with
+     * the Drive changes feed, so that path lookups, folder listings and new
+     * file names are answered without querying Drive.
+     *
+     * The index is built once by listing all the files that are not trashed,
+     * then updated with the changes since the start page token taken before
+     * that listing: every SYNC_POLL_INTERVAL, and before answering a lookup
+     * that finds nothing, so that files created by other clients since the
+     * last poll are not missed.  Only changes cross the network after the
+     * build.
+     *
+     * The index is optional, and enabled by the `SYNC_INDEX` option of the
+     * `gdrive` config section.  Since the build lists every file the app can
+     * see, it suits drives of moderate size.
+     */
+    /**
+     * Time between two polls of the changes feed, in milliseconds.
+     * @type {number}
+     */
+    exports.SYNC_POLL_INTERVAL = 30000; // 30 s
+    /**
+     * Age of the index, in milliseconds, above which listings first poll the
+     * changes feed.
+     * @type {number}
+     */
+    exports.SYNC_MAX_AGE = 5000; // 5 s
+    /* Number of items requested per call to drive.files.list and
+     * drive.changes.list. */
+    var PAGE_SIZE = 1000;
+    /* Fields of the files resources kept in the index. */
+    var FILE_FIELDS = 'id,title,mimeType,createdDate,modifiedDate,editable,parents(id),labels(trashed)';
+    var DriveIndex = (function () {
+        function DriveIndex() {
+            this._files = {};
+            this._children = {};
+            this._root_id = null;
+            this._page_token = null;
+            this._build_prm = null;
+            this._ready = false;
+            this._synced = 0;
+            this._sync_prm = null;
+            this._poll_timeout = null;
+        }
+        /**
+         * Builds the index, then polls the changes feed every `poll_interval`.
+         * Does nothing if the index is already started.
+         * @param {number} poll_interval Time between two polls, in milliseconds.
+         * @return {Promise} fullfilled when the index is built.
+         */
+        DriveIndex.prototype.start = function (poll_interval) {
+            if (poll_interval === void 0) { poll_interval = exports.SYNC_POLL_INTERVAL; }
+            var that = this;
+            if (this._build_prm !== null) {
+                return this._build_prm;
+            }
+            // The start page token is taken before the listing, so that changes
+            // made during the listing are applied afterwards.
+            var token_request = gapi.client.drive.changes.getStartPageToken();
+            var about_request = gapi.client.drive.about.get({ 'fields': 'rootFolderId' });
+            this._build_prm = gapiutils.execute_all([token_request, about_request], gapiutils.Priority.BACKGROUND)
+                .then(function (responses) {
+                that._page_token = responses[0]['startPageToken'];
+                that._root_id = responses[1]['rootFolderId'];
+                return that._list_files();
+            })
+                .then(function () {
+                that._ready = true;
+                that._synced = Date.now();
+                that._schedule_poll(poll_interval);
+            })
+                .catch(function (error) {
+                console.warn('[drive-index.js] Could not build the Drive index', error);
+                that.stop();
+            });
+            return this._build_prm;
+        };
+        /**
+         * Stops polling and empties the index.
+         */
+        DriveIndex.prototype.stop = function () {
+            clearTimeout(this._poll_timeout);
+            this._files = {};
+            this._children = {};
+            this._build_prm = null;
+            this._ready = false;
+            this._poll_timeout = null;
+        };
+        /**
+         * Whether the index is built, and can answer lookups.
+         */
+        DriveIndex.prototype.is_ready = function () {
+            return this._ready;
+        };
+        /**
+         * Adds or updates a files resource, removing it if it is trashed.  Also
+         * used to record the changes made by this client without waiting for
+         * the next poll.
+         * @param {Object} resource A files resource, with at least FILE_FIELDS.
+         */
+        DriveIndex.prototype.update = function (resource) {
+            if (this._build_prm === null) {
+                return;
+            }
+            var id = resource['id'];
+            this.remove(id);
+            if ((resource['labels'] || {})['trashed']) {
+                return;
+            }
+            var parents = (resource['parents'] || []).map(function (parent) {
+                return { 'id': parent['id'] };
+            });
+            this._files[id] = {
+                'id': id,
+                'title': resource['title'],
+                'mimeType': resource['mimeType'],
+                'createdDate': resource['createdDate'],
+                'modifiedDate': resource['modifiedDate'],
+                'editable': resource['editable'],
+                'parents': parents
+            };
+            for (var i = 0; i < parents.length; i++) {
+                var children = this._children[parents[i]['id']];
+                if (children === undefined) {
+                    children = this._children[parents[i]['id']] = {};
+                }
+                children[id] = true;
+            }
+        };
+        /**
+         * Removes a file or folder.  The children of a folder are kept, but are
+         * no longer reachable from the root.
+         * @param {string} id The id of the file or folder.
+         */
+        DriveIndex.prototype.remove = function (id) {
+            var resource = this._files[id];
+            if (resource === undefined) {
+                return;
+            }
+            for (var i = 0; i < resource['parents'].length; i++) {
+                var children = this._children[resource['parents'][i]['id']];
+                if (children !== undefined) {
+                    delete children[id];
+                }
+            }
+            delete this._files[id];
+        };
+        /**
+         * The files resources of the children of a folder.
+         * @param {string} folder_id The id of the folder, or 'root'.
+         * @return {Array} the resources, with FILE_FIELDS only.
+         */
+        DriveIndex.prototype.children = function (folder_id) {
+            var files = this._files;
+            var id = folder_id === 'root' ? this._root_id : folder_id;
+            return Object.keys(this._children[id] || {}).map(function (child_id) {
+                return files[child_id];
+            });
+        };
+        /**
+         * Finds the children of a folder with a given title.  When there are
+         * none, the changes feed is polled first, in case they were created
+         * since the last poll.
+         * @param {string} folder_id The id of the folder, or 'root'.
+         * @param {string} title The title to look for.
+         * @param {string?} mime_type If given, the mime type to look for.
+         * @return {Promise} fullfilled with the resources found.
+         */
+        DriveIndex.prototype.find = function (folder_id, title, mime_type) {
+            var that = this;
+            var match = function () {
+                return that.children(folder_id).filter(function (resource) {
+                    return resource['title'] == title &&
+                        (mime_type === undefined || resource['mimeType'] == mime_type);
+                });
+            };
+            var found = match();
+            if (found.length > 0) {
+                return Promise.resolve(found);
+            }
+            return this.sync().then(match);
+        };
+        /**
+         * Polls the changes feed if the index is older than `max_age`.
+         * @param {number} max_age Maximum age of the index, in milliseconds.
+         * @return {Promise} fullfilled when the index is that recent.
+         */
+        DriveIndex.prototype.fresh = function (max_age) {
+            if (max_age === void 0) { max_age = exports.SYNC_MAX_AGE; }
+            if (Date.now() - this._synced <= max_age) {
+                return Promise.resolve();
+            }
+            return this.sync();
+        };
+        /**
+         * Applies the changes made since the last poll.  Concurrent calls share
+         * the same poll.
+         * @return {Promise} fullfilled when the changes are applied.
+         */
+        DriveIndex.prototype.sync = function () {
+            var that = this;
+            if (this._sync_prm === null) {
+                this._sync_prm = this._apply_changes()
+                    .then(function () {
+                    that._sync_prm = null;
+                    that._synced = Date.now();
+                }, function (error) {
+                    that._sync_prm = null;
+                    throw error;
+                });
+            }
+            return this._sync_prm;
+        };
+        /**
+         * Adds all the files that are not trashed, a page at a time.
+         */
+        DriveIndex.prototype._list_files = function (page_token) {
+            var that = this;
+            var params = {
+                'q': 'trashed = false',
+                'maxResults': PAGE_SIZE,
+                'fields': 'nextPageToken,items(' + FILE_FIELDS + ')'
+            };
+            if (page_token) {
+                params['pageToken'] = page_token;
+            }
+            var request = gapi.client.drive.files.list(params);
+            return gapiutils.execute_batched(request, gapiutils.Priority.BACKGROUND)
+                .then(function (response) {
+                (response['items'] || []).forEach(function (resource) {
+                    that.update(resource);
+                });
+                if (response['nextPageToken']) {
+                    return that._list_files(response['nextPageToken']);
+                }
+            });
+        };
+        /**
+         * Applies the changes from the current page token, a page at a time.
+         */
+        DriveIndex.prototype._apply_changes = function () {
+            var that = this;
+            var request = gapi.client.drive.changes.list({
+                'pageToken': this._page_token,
+                'includeDeleted': true,
+                'maxResults': PAGE_SIZE,
+                'fields': 'nextPageToken,newStartPageToken,items(fileId,deleted,file(' + FILE_FIELDS + '))'
+            });
+            return gapiutils.execute_batched(request, gapiutils.Priority.BACKGROUND)
+                .then(function (response) {
+                if (that._build_prm === null) {
+                    // Stopped meanwhile.
+                    return;
+                }
+                (response['items'] || []).forEach(function (change) {
+                    if (change['deleted'] || !change['file']) {
+                        that.remove(change['fileId']);
+                    }
+                    else {
+                        that.update(change['file']);
+                    }
+                });
+                if (response['nextPageToken']) {
+                    that._page_token = response['nextPageToken'];
+                    return that._apply_changes();
+                }
+                that._page_token = response['newStartPageToken'];
+            });
+        };
+        DriveIndex.prototype._schedule_poll = function (poll_interval) {
+            var that = this;
+            this._poll_timeout = setTimeout(function () {
+                that.sync().catch(function (error) {
+                    console.warn('[drive-index.js] Could not poll the Drive changes', error);
+                }).then(function () {
+                    if (that._ready) {
+                        that._schedule_poll(poll_interval);
+                    }
+                });
+            }, poll_interval);
+        };
+        return DriveIndex;
+    }());
+    exports.DriveIndex = DriveIndex;
+    /**
+     * The index used by `driveutils` and `GoogleDriveContents`, started by the
+     * latter when the `SYNC_INDEX` option is set.
+     */
+    exports.index = new DriveIndex();
+});
+//# sourceMappingURL=drive-index.js.map
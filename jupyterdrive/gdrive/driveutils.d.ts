@@ -6,6 +6,48 @@ export declare enum FileType {
     FILE = 1,
     FOLDER = 2,
 }
+/**
+ * Time in milliseconds during which a path resolution is reused without
+ * asking Drive again.
+ */
+export declare var RESOURCE_ID_CACHE_TTL: number;
+/**
+ * Cache of the ids found when resolving paths, stored as a tree: entries
+ * are keyed by the id of their parent folder, then by title, so that the
+ * folders of a path are looked up one level at a time like Drive does.
+ *
+ * Only ids are cached; resources (and their revision ids) are always
+ * fetched from Drive.
+ */
+export declare class ResourceIdCache {
+    private _ttl;
+    private _children;
+    private _parents;
+    constructor(ttl: number);
+    /**
+     * Returns the id of the file/folder `title` in the folder `folder_id`,
+     * or undefined if it is not cached, has expired, or is not a folder
+     * although `type` is FileType.FOLDER.
+     */
+    lookup(folder_id: string, title: string, type?: FileType): string;
+    /**
+     * Records that `resource` is called `title` in the folder `folder_id`.
+     */
+    store(folder_id: string, title: string, type: FileType, resource: any): void;
+    /**
+     * Drops the entry of a file/folder, and everything cached below it.
+     */
+    forget(id: string): void;
+    clear(): void;
+}
+/**
+ * The cache used by `get_resource_for_path` and `get_id_for_path`.
+ */
+export declare var resource_id_cache: ResourceIdCache;
+/**
+ * Whether an error means that a file/folder does not exist (anymore).
+ */
+export declare var is_not_found: (error: any) => boolean;
 /**
  * Obtains the Google Drive Files resource for a file or folder relative
  * to the a given folder.  The path should be a file or a subfolder, and
@@ -37,7 +79,7 @@ export declare var split_path: (path: iface.Path) => iface.Path[];
  * @return {Promise} fullfilled with file/folder id (string) on success
  *     or Error object on error.
  */
-export declare var get_resource_for_path: (path: iface.Path, type?: any) => any;
+export declare var get_resource_for_path: (path: iface.Path, type?: any) => Promise<any>;
 /**
  * Gets the Google Drive file/folder ID for a file or folder.  The path is
  * always treated as an absolute path, no matter whether it contains leading
@@ -50,6 +92,17 @@ export declare var get_resource_for_path: (path: iface.Path, type?: any) => any;
  *     or Error object on error.
  */
 export declare var get_id_for_path: (path: any, type?: any) => any;
+/**
+ * Calls `action` with the Google Drive file/folder ID for a path, and
+ * resolves the path again without the cache if `action` fails because the
+ * cached ID no longer exists.
+ *
+ * @param {String} path The path
+ * @param {FileType} type The type (file or folder)
+ * @param {Function} action Called with the ID, returns a Promise.
+ * @return {Promise} fullfilled with the result of `action`.
+ */
+export declare var with_id_for_path: (path: any, type: any, action: (id: string) => any) => Promise<any>;
 /**
  * Obtains the filename that should be used for a new file in a given
  * folder.  This is the next file in the series Untitled0, Untitled1, ... in
@@ -65,9 +118,23 @@ export declare var get_id_for_path: (path: any, type?: any) => any;
  *     'Untitled.ipynb' is used as a fallback.
  */
 export declare var get_new_filename: (opt_folderId: any, ext: any, base_name: any) => any;
+/**
+ * Contents of at least this many characters are uploaded with a resumable
+ * upload, in chunks, instead of a single multipart request.
+ */
+export declare var RESUMABLE_UPLOAD_THRESHOLD: number;
+/**
+ * Size in bytes of the chunks of resumable uploads.  Must be a multiple of
+ * 256 KB.
+ */
+export declare var RESUMABLE_CHUNK_SIZE: number;
+export declare var RESUMABLE_UPLOAD_INITIAL_DELAY: number;
+export declare var RESUMABLE_UPLOAD_MAX_TRIES: number;
+export declare var RESUMABLE_UPLOAD_EXPONENTIAL_BACKOFF_FACTOR: number;
 /**
  * Uploads a notebook to Drive, either creating a new one or saving an
- * existing one.
+ * existing one.  Contents larger than RESUMABLE_UPLOAD_THRESHOLD are sent
+ * with a resumable upload.
  *
  * @method upload_to_drive
  * @param {string} data The file contents as a string
@@ -75,6 +142,10 @@ export declare var get_new_filename: (opt_folderId: any, ext: any, base_name: an
  * @param {string=} opt_fileId file Id.  If false, a new file is created.
  * @param {Object?} opt_params a dictionary containing the following keys
  *     pinned: whether this save should be pinned
+ *     resumable_threshold: overrides RESUMABLE_UPLOAD_THRESHOLD
+ *     chunk_size: overrides RESUMABLE_CHUNK_SIZE
+ *     progress: function(loaded, total) called as the chunks of a
+ *         resumable upload are acknowledged
  * @return {Promise} A promise resolved with the Google Drive Files
  *     resource for the uploaded file, or rejected with an Error object.
  */
@@ -92,7 +163,82 @@ export declare var GET_CONTENTS_EXPONENTIAL_BACKOFF_FACTOR: number;
  *     Should be set when already_picked is true.
  * @return {Promise} A promise fullfilled by file contents.
  */
-export declare var get_contents: (resource: any, already_picked: boolean, opt_num_tries?: any) => any;
+export declare var get_contents: (resource: any, already_picked: boolean, opt_num_tries?: any) => Promise<any>;
+/**
+ * Size in bytes of the ranges requested by `download_chunks`.
+ */
+export declare var DOWNLOAD_CHUNK_SIZE: number;
+/**
+ * Files of at least this many bytes are opened with `get_contents_text`
+ * rather than `get_contents`.
+ */
+export declare var STREAMING_DOWNLOAD_THRESHOLD: number;
+/**
+ * Number of chunks downloaded at once by `download_chunks`.
+ */
+export declare var DOWNLOAD_CONCURRENCY: number;
+/**
+ * Downloads bytes `start` to `end` of a file in chunks of
+ * DOWNLOAD_CHUNK_SIZE bytes, passing each chunk to `on_chunk`, in order, as
+ * soon as it arrives.  Once the size of the file is known, up to
+ * DOWNLOAD_CONCURRENCY chunks are downloaded at once.
+ *
+ * @param {Object} resource The files resource of the file, with a
+ *     downloadUrl.
+ * @param {Function} on_chunk function(data:ArrayBuffer, offset:number,
+ *     size:number), where size is the size of the file (NaN if unknown).
+ * @param {number} [start=0] Offset of the first byte.
+ * @param {number} [end] Offset of the last byte (included), defaults to the
+ *     end of the file.
+ * @return {Promise} resolved with the size of the file once all the chunks
+ *     have been passed to `on_chunk`.
+ */
+export declare var download_chunks: (resource: any, on_chunk: (data: ArrayBuffer, offset: number, size: number) => any, start?: number, end?: number) => Promise<number>;
+/**
+ * Gets the contents of a file as bytes.  Files of more than
+ * DOWNLOAD_CHUNK_SIZE bytes are downloaded in chunks, copied into a single
+ * buffer allocated once the size of the file is known.
+ * @param {Object} resource The files resource of the file.
+ * @param {Function} [on_chunk] Called with each chunk as it arrives, as
+ *     `on_chunk` of `download_chunks`.
+ * @return {Promise} resolved with an ArrayBuffer.
+ */
+export declare var get_contents_binary: (resource: any, on_chunk?: any) => Promise<ArrayBuffer>;
+/**
+ * Gets the contents of a text file, downloaded in chunks that are decoded
+ * as they arrive.
+ * @param {Object} resource The files resource of the file.
+ * @param {Function} [on_text] function(text:string, loaded:number,
+ *     size:number) called with the text of each chunk, the number of bytes
+ *     downloaded so far and the size of the file.
+ * @return {Promise} resolved with the text of the file.
+ */
+export declare var get_contents_text: (resource: any, on_text?: any) => Promise<string>;
+/**
+ * Reads part of a text file, e.g. its head or tail for a preview, with a
+ * single Range request.  The bytes of UTF-8 sequences cut at the edges of
+ * the range are left out.
+ * @param {Object} resource The files resource of the file.
+ * @param {number} start Offset of the first byte or, if negative, number of
+ *     bytes to read at the end of the file.
+ * @param {number} [end] Offset of the last byte (included), defaults to the
+ *     end of the file.
+ * @return {Promise} resolved with {text, start, end, size}: the text, the
+ *     offsets in the file of its first byte and of the byte after its last
+ *     one, and the size of the file.
+ */
+export declare var get_text_range: (resource: any, start: number, end?: number) => Promise<any>;
+/**
+ * Encodes bytes in base64, a slice at a time, so that the whole contents
+ * are never held as a binary string.
+ */
+export declare var bytes_to_base64: (buffer: ArrayBuffer) => string;
+/**
+ * Fetch the permission id of the user, which identifies their Google
+ * account.
+ * @return {Promise} fullfilled with the permission id.
+ */
+export declare var get_user_id: () => Promise<string>;
 /**
  * Fetch user avatar url and put it in the header
  * optionally take a selector into which to insert the img tag
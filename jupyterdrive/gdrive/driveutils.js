@@ -1,7 +1,7 @@
 // AUTOMATICALY GENERATED FILE, see cooresponding .ts file
 // Copyright (c) IPython Development Team.
 // Distributed under the terms of the Modified BSD License.
-define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], function (require, exports, $, gapiutils, pickerutils) {
+define(["require", "exports", 'jquery', './gapiutils', './pickerutils', './drive-index'], function (require, exports, $, gapiutils, pickerutils, drive_index) {
     "use strict";
     exports.FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder';
     exports.NOTEBOOK_MIMETYPE = 'application/ipynb';
@@ -11,6 +11,102 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
         FileType[FileType["FOLDER"] = 2] = "FOLDER";
     })(exports.FileType || (exports.FileType = {}));
     var FileType = exports.FileType;
+    /**
+     * Time in milliseconds during which a path resolution is reused without
+     * asking Drive again.
+     */
+    exports.RESOURCE_ID_CACHE_TTL = 60000; // 60 s
+    /**
+     * Cache of the ids found when resolving paths, stored as a tree: entries
+     * are keyed by the id of their parent folder, then by title, so that the
+     * folders of a path are looked up one level at a time like Drive does.
+     *
+     * Only ids are cached; resources (and their revision ids) are always
+     * fetched from Drive.
+     */
+    var ResourceIdCache = (function () {
+        function ResourceIdCache(ttl) {
+            this._ttl = ttl;
+            this.clear();
+        }
+        /**
+         * Returns the id of the file/folder `title` in the folder `folder_id`,
+         * or undefined if it is not cached, has expired, or is not a folder
+         * although `type` is FileType.FOLDER.
+         */
+        ResourceIdCache.prototype.lookup = function (folder_id, title, type) {
+            var entries = this._children[folder_id];
+            var entry = entries && entries[title];
+            if (!entry) {
+                return undefined;
+            }
+            if (entry.expires < Date.now()) {
+                this.forget(entry.id);
+                return undefined;
+            }
+            if (type == FileType.FOLDER && !entry.is_folder) {
+                return undefined;
+            }
+            return entry.id;
+        };
+        /**
+         * Records that `resource` is called `title` in the folder `folder_id`.
+         */
+        ResourceIdCache.prototype.store = function (folder_id, title, type, resource) {
+            var id = resource['id'];
+            var previous = this._children[folder_id] && this._children[folder_id][title];
+            if (previous && previous.id != id) {
+                this.forget(previous.id);
+            }
+            if (!this._children[folder_id]) {
+                this._children[folder_id] = {};
+            }
+            this._children[folder_id][title] = {
+                id: id,
+                is_folder: type == FileType.FOLDER || resource['mimeType'] == exports.FOLDER_MIME_TYPE,
+                expires: Date.now() + this._ttl
+            };
+            this._parents[id] = [folder_id, title];
+        };
+        /**
+         * Drops the entry of a file/folder, and everything cached below it.
+         */
+        ResourceIdCache.prototype.forget = function (id) {
+            var parent = this._parents[id];
+            if (parent) {
+                delete this._parents[id];
+                var entries = this._children[parent[0]];
+                if (entries && entries[parent[1]] && entries[parent[1]].id == id) {
+                    delete entries[parent[1]];
+                }
+            }
+            var children = this._children[id];
+            delete this._children[id];
+            for (var title in children) {
+                this.forget(children[title].id);
+            }
+        };
+        ResourceIdCache.prototype.clear = function () {
+            this._children = {};
+            this._parents = {};
+        };
+        return ResourceIdCache;
+    }());
+    exports.ResourceIdCache = ResourceIdCache;
+    /**
+     * The cache used by `get_resource_for_path` and `get_id_for_path`.
+     */
+    exports.resource_id_cache = new ResourceIdCache(exports.RESOURCE_ID_CACHE_TTL);
+    /**
+     * Whether an error means that a file/folder does not exist (anymore).
+     */
+    exports.is_not_found = function (error) {
+        if (error && error.name == 'NotFoundError') {
+            return true;
+        }
+        var gapi_error = error && error['gapi_error'];
+        return Boolean(gapi_error && gapi_error['error'] && gapi_error['error']['code'] == 404);
+    };
     /**
      * Obtains the Google Drive Files resource for a file or folder relative
      * to the a given folder.  The path should be a file or a subfolder, and
@@ -27,19 +123,47 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
      *     file/folder, or rejected with an Error object.
      */
     exports.get_resource_for_relative_path = function (path_component, type, opt_child_resource, folder_id) {
-        var query = 'title = \'' + path_component + '\' and trashed = false ';
-        if (type == FileType.FOLDER) {
-            query += ' and mimeType = \'' + exports.FOLDER_MIME_TYPE + '\'';
-        }
-        var request = null;
-        if (opt_child_resource) {
-            request = gapi.client.drive.children.list({ 'q': query, 'folderId': folder_id });
+        var query_drive = function () {
+            var query = 'title = \'' + path_component + '\' and trashed = false ';
+            if (type == FileType.FOLDER) {
+                query += ' and mimeType = \'' + exports.FOLDER_MIME_TYPE + '\'';
+            }
+            var request = null;
+            if (opt_child_resource) {
+                request = gapi.client.drive.children.list({ 'q': query, 'folderId': folder_id });
+            }
+            else {
+                query += ' and \'' + folder_id + '\' in parents';
+                request = gapi.client.drive.files.list({ 'q': query });
+            }
+            return gapiutils.execute_batched(request);
+        };
+        var response_prm;
+        if (drive_index.index.is_ready()) {
+            var mime_type = type == FileType.FOLDER ? exports.FOLDER_MIME_TYPE : undefined;
+            response_prm = drive_index.index.find(folder_id, path_component, mime_type)
+                .then(function (items) {
+                if (items.length != 1 || opt_child_resource) {
+                    return { 'items': items };
+                }
+                // The index only has a few fields of the resource.
+                var id = items[0]['id'];
+                return gapiutils.execute_batched(gapi.client.drive.files.get({ 'fileId': id }))
+                    .then(function (resource) {
+                    return { 'items': [resource] };
+                }, function (error) {
+                    if (!exports.is_not_found(error)) {
+                        throw error;
+                    }
+                    drive_index.index.remove(id);
+                    return query_drive();
+                });
+            }, query_drive);
         }
         else {
-            query += ' and \'' + folder_id + '\' in parents';
-            request = gapi.client.drive.files.list({ 'q': query });
+            response_prm = query_drive();
         }
-        return gapiutils.execute(request)
+        return response_prm
             .then(function (response) {
             var files = response['items'];
             if (!files || files.length == 0) {
@@ -52,6 +176,7 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
                 error.name = 'BadNameError';
                 throw error;
             }
+            exports.resource_id_cache.store(folder_id, path_component, type, files[0]);
             return files[0];
         });
     };
@@ -61,6 +186,71 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
     exports.split_path = function (path) {
         return path.split('/').filter(function (s, i, a) { return (Boolean(s)); });
     };
+    /**
+     * Resolves the components of a path from the root folder, one level at a
+     * time.  When `used` is given, ids of `resource_id_cache` are used instead
+     * of asking Drive, and the cached ids used are pushed to it.
+     *
+     * @param {Path[]} components The path components
+     * @param {FileType} type The type (file or folder) of the last component
+     * @param {boolean} id_only Whether only the id of the last component is
+     *     needed, in which case a cached id is returned as `{id: id}`.
+     * @param {String[]} used Cached ids used, or null to not use the cache.
+     * @return {Promise} fullfilled with the files resource of the last
+     *     component.
+     */
+    var resolve_components = function (components, type, id_only, used) {
+        var result = Promise.resolve({ id: 'root' });
+        for (var i = 0; i < components.length; i++) {
+            var component = components[i];
+            var t = (i == components.length - 1) ? type : FileType.FOLDER;
+            var child_resource = i < components.length - 1;
+            // IIFE or, component`, `t`, `child_resources` get shared in
+            // between Promises
+            result = (function (component, t, child_resource, result) {
+                return result.then(function (data) {
+                    var id = used ? exports.resource_id_cache.lookup(data['id'], component, t) : undefined;
+                    if (id === undefined) {
+                        return exports.get_resource_for_relative_path(component, t, child_resource, data['id']);
+                    }
+                    used.push(id);
+                    if (child_resource || id_only) {
+                        return { id: id };
+                    }
+                    return gapiutils.execute_batched(gapi.client.drive.files.get({ 'fileId': id }))
+                        .then(function (resource) {
+                        // The file may have been renamed or trashed by another
+                        // client since it was cached.
+                        if (resource['title'] != component || (resource['labels'] || {})['trashed']) {
+                            var error = new Error('The specified file/folder did not exist: ' + component);
+                            error.name = 'NotFoundError';
+                            throw error;
+                        }
+                        return resource;
+                    });
+                });
+            })(component, t, child_resource, result);
+        }
+        ;
+        return result;
+    };
+    /**
+     * Resolves a path with `resolve_components` and calls `action` with the
+     * resource found.  If that fails because a cached id no longer exists on
+     * Drive, the cached ids are dropped and the path is resolved again.
+     */
+    var resolve_path = function (path, type, id_only, action) {
+        var components = exports.split_path(path);
+        var used = [];
+        return resolve_components(components, type, id_only, used).then(action)
+            .catch(function (error) {
+            if (used.length == 0 || !exports.is_not_found(error)) {
+                throw error;
+            }
+            used.forEach(function (id) { return exports.resource_id_cache.forget(id); });
+            return resolve_components(components, type, id_only, null).then(action);
+        });
+    };
     /**
      * Gets the Google Drive Files resource corresponding to a path.  The path
      * is always treated as an absolute path, no matter whether it contains
@@ -75,28 +265,14 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
     exports.get_resource_for_path = function (path, type) {
         var components = exports.split_path(path);
         if (components.length == 0) {
-            return gapiutils.execute(gapi.client.drive.about.get())
+            return gapiutils.execute_batched(gapi.client.drive.about.get())
                 .then(function (resource) {
                 var id = resource['rootFolderId'];
                 var request = gapi.client.drive.files.get({ 'fileId': id });
-                return gapiutils.execute(request);
+                return gapiutils.execute_batched(request);
             });
         }
-        var result = Promise.resolve({ id: 'root' });
-        for (var i = 0; i < components.length; i++) {
-            var component = components[i];
-            var t = (i == components.length - 1) ? type : FileType.FOLDER;
-            var child_resource = i < components.length - 1;
-            // IIFE or, component`, `t`, `child_resources` get shared in
-            // between Promises
-            result = (function (component, t, child_resource, result) {
-                return result.then(function (data) {
-                    return exports.get_resource_for_relative_path(component, t, child_resource, data['id']);
-                });
-            })(component, t, child_resource, result);
-        }
-        ;
-        return result;
+        return resolve_path(path, type, false, function (resource) { return resource; });
     };
     /**
      * Gets the Google Drive file/folder ID for a file or folder.  The path is
@@ -114,8 +290,24 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
         if (components.length == 0) {
             return $.Deferred().resolve('root');
         }
-        return exports.get_resource_for_path(path, type)
-            .then(function (resource) { return resource['id']; });
+        return resolve_path(path, type, true, function (resource) { return resource['id']; });
+    };
+    /**
+     * Calls `action` with the Google Drive file/folder ID for a path, and
+     * resolves the path again without the cache if `action` fails because the
+     * cached ID no longer exists.
+     *
+     * @param {String} path The path
+     * @param {FileType} type The type (file or folder)
+     * @param {Function} action Called with the ID, returns a Promise.
+     * @return {Promise} fullfilled with the result of `action`.
+     */
+    exports.with_id_for_path = function (path, type, action) {
+        var components = exports.split_path(path);
+        if (components.length == 0) {
+            return Promise.resolve(action('root'));
+        }
+        return resolve_path(path, type, true, function (resource) { return action(resource['id']); });
     };
     /**
      * Obtains the filename that should be used for a new file in a given
@@ -134,16 +326,28 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
     exports.get_new_filename = function (opt_folderId, ext, base_name) {
         /** @type {string} */
         var folderId = opt_folderId || 'root';
-        var query = 'title contains \'' + base_name + '\'' +
-            ' and \'' + folderId + '\' in parents' +
-            ' and trashed = false';
-        var request = gapi.client.drive.files.list({
-            'maxResults': 1000,
-            'folderId': folderId,
-            'q': query
-        });
         var fallbackFilename = base_name + ext;
-        return gapiutils.execute(request)
+        var response_prm;
+        if (drive_index.index.is_ready()) {
+            response_prm = drive_index.index.fresh().then(function () {
+                var items = drive_index.index.children(folderId).filter(function (resource) {
+                    return resource['title'].indexOf(base_name) != -1;
+                });
+                return { 'items': items };
+            });
+        }
+        else {
+            var query = 'title contains \'' + base_name + '\'' +
+                ' and \'' + folderId + '\' in parents' +
+                ' and trashed = false';
+            var request = gapi.client.drive.files.list({
+                'maxResults': 1000,
+                'folderId': folderId,
+                'q': query
+            });
+            response_prm = gapiutils.execute_batched(request);
+        }
+        return response_prm
             .then(function (response) {
             // Use 'Untitled.ipynb' as a fallback in case of error
             var files = response['items'] || [];
@@ -167,9 +371,150 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
         })
             .catch(function (error) { return Promise.resolve(fallbackFilename); });
     };
+    /**
+     * Contents of at least this many characters are uploaded with a resumable
+     * upload, in chunks, instead of a single multipart request.
+     */
+    exports.RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024; // 5 MB
+    /**
+     * Size in bytes of the chunks of resumable uploads.  Must be a multiple of
+     * 256 KB.
+     */
+    exports.RESUMABLE_CHUNK_SIZE = 1024 * 1024; // 1 MB
+    exports.RESUMABLE_UPLOAD_INITIAL_DELAY = 500; // 500 ms
+    exports.RESUMABLE_UPLOAD_MAX_TRIES = 5;
+    exports.RESUMABLE_UPLOAD_EXPONENTIAL_BACKOFF_FACTOR = 2.0;
+    /**
+     * Wraps a failed XMLHttpRequest as an Error, like gapiutils.execute does
+     * for Google API errors.
+     */
+    var xhr_error = function (xhr) {
+        var result = null;
+        try {
+            result = JSON.parse(xhr.responseText);
+        }
+        catch (e) { }
+        if (result && result['error']) {
+            var error = new Error(result['error']['message']);
+            error['gapi_error'] = result;
+            return error;
+        }
+        var error = new Error('Upload failed with status ' + xhr.status);
+        error.name = 'UploadError';
+        return error;
+    };
+    /**
+     * Converts file contents to the Blob of bytes to upload.
+     */
+    var contents_blob = function (data, mime) {
+        if (mime === 'application/octet-stream') {
+            var binary = atob(data);
+            var bytes = new Uint8Array(binary.length);
+            for (var i = 0; i < binary.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            return new Blob([bytes], { type: mime });
+        }
+        return new Blob([data], { type: mime || '' });
+    };
+    /**
+     * Uploads file contents with a Drive resumable upload: a session is opened
+     * with the metadata, then the contents are sent in chunks.  After a network
+     * or server error, Drive is asked how many bytes it has received, and the
+     * upload goes on from there.  Errors, and chunks that Drive does not
+     * acknowledge, count as failed tries until the upload makes progress again.
+     *
+     * Parameters are as for `upload_to_drive`.
+     */
+    var upload_resumable = function (data, metadata, opt_fileId, params) {
+        var blob = contents_blob(data, metadata && metadata.mimeType);
+        var total = blob.size;
+        var chunk_size = params['chunk_size'] || exports.RESUMABLE_CHUNK_SIZE;
+        var progress = params['progress'] || function (loaded, total) { };
+        var url = 'https://www.googleapis.com/upload/drive/v2/files';
+        var method = 'POST';
+        if (opt_fileId) {
+            url += '/' + opt_fileId;
+            method = 'PUT';
+        }
+        url += '?uploadType=resumable';
+        if (params['pinned']) {
+            url += '&pinned=true';
+        }
+        var headers = {
+            'Content-Type': 'application/json; charset=UTF-8',
+            'X-Upload-Content-Length': String(total)
+        };
+        if (blob.type) {
+            headers['X-Upload-Content-Type'] = blob.type;
+        }
+        return gapiutils.send_xhr(method, url, headers, metadata ? JSON.stringify(metadata) : undefined)
+            .then(function (xhr) {
+            if (xhr.status != 200) {
+                throw xhr_error(xhr);
+            }
+            var session_url = xhr.getResponseHeader('Location');
+            var tries_left = exports.RESUMABLE_UPLOAD_MAX_TRIES;
+            // Bytes acknowledged by Drive so far.
+            var acknowledged = 0;
+            // Server errors are handled below by asking Drive what it received,
+            // rather than by sending the same request again.
+            var session_options = { retry_server_errors: false };
+            var send_chunk = function (offset) {
+                progress(offset, total);
+                var end = Math.min(offset + chunk_size, total);
+                var range = 'bytes ' + offset + '-' + (end - 1) + '/' + total;
+                return gapiutils.send_xhr('PUT', session_url, { 'Content-Range': range }, blob.slice(offset, end), session_options)
+                    .then(function (xhr) { return handle_response(xhr, true); });
+            };
+            var query_status = function () {
+                return gapiutils.send_xhr('PUT', session_url, { 'Content-Range': 'bytes */' + total }, undefined, session_options)
+                    .then(function (xhr) { return handle_response(xhr, false); });
+            };
+            var retry_later = function (send) {
+                var delay = exports.RESUMABLE_UPLOAD_INITIAL_DELAY *
+                    Math.pow(exports.RESUMABLE_UPLOAD_EXPONENTIAL_BACKOFF_FACTOR, exports.RESUMABLE_UPLOAD_MAX_TRIES - tries_left);
+                tries_left -= 1;
+                return new Promise(function (resolve, reject) {
+                    window.setTimeout(resolve, delay);
+                })
+                    .then(send);
+            };
+            var handle_response = function (xhr, sent_chunk) {
+                if (xhr.status == 200 || xhr.status == 201) {
+                    progress(total, total);
+                    return JSON.parse(xhr.responseText);
+                }
+                if (xhr.status == 308) {
+                    // Resume Incomplete: the Range header holds the bytes
+                    // received so far, if any.
+                    var range = xhr.getResponseHeader('Range');
+                    var received = range ? parseInt(range.split('-')[1], 10) + 1 : 0;
+                    if (received > acknowledged) {
+                        acknowledged = received;
+                        tries_left = exports.RESUMABLE_UPLOAD_MAX_TRIES;
+                    }
+                    else if (sent_chunk) {
+                        // The chunk was not taken: a failed try.
+                        if (tries_left <= 0) {
+                            throw xhr_error(xhr);
+                        }
+                        return retry_later(function () { return send_chunk(received); });
+                    }
+                    return send_chunk(received);
+                }
+                if ((xhr.status == 0 || xhr.status >= 500) && tries_left > 0) {
+                    return retry_later(query_status);
+                }
+                throw xhr_error(xhr);
+            };
+            return send_chunk(0);
+        });
+    };
     /**
      * Uploads a notebook to Drive, either creating a new one or saving an
-     * existing one.
+     * existing one.  Contents larger than RESUMABLE_UPLOAD_THRESHOLD are sent
+     * with a resumable upload.
      *
      * @method upload_to_drive
      * @param {string} data The file contents as a string
@@ -177,11 +522,18 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
      * @param {string=} opt_fileId file Id.  If false, a new file is created.
      * @param {Object?} opt_params a dictionary containing the following keys
      *     pinned: whether this save should be pinned
+     *     resumable_threshold: overrides RESUMABLE_UPLOAD_THRESHOLD
+     *     chunk_size: overrides RESUMABLE_CHUNK_SIZE
+     *     progress: function(loaded, total) called as the chunks of a
+     *         resumable upload are acknowledged
      * @return {Promise} A promise resolved with the Google Drive Files
      *     resource for the uploaded file, or rejected with an Error object.
      */
     exports.upload_to_drive = function (data, metadata, opt_fileId, opt_params) {
         var params = opt_params || {};
+        if (data.length >= (params['resumable_threshold'] || exports.RESUMABLE_UPLOAD_THRESHOLD)) {
+            return upload_resumable(data, metadata, opt_fileId, params);
+        }
         var delimiter = '\r\n--' + exports.MULTIPART_BOUNDARY + '\r\n';
         var close_delim = '\r\n--' + exports.MULTIPART_BOUNDARY + '--';
         var body = delimiter +
@@ -226,25 +578,20 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
     exports.GET_CONTENTS_MAX_TRIES = 5;
     exports.GET_CONTENTS_EXPONENTIAL_BACKOFF_FACTOR = 2.0;
     /**
-     * Attempt to get the contents of a file with the given id.  This may
-     * involve requesting the user to open the file in a FilePicker.
-     * @param {Object} resource The files resource of the file.
-     * @param {Boolean} already_picked Set to true if this file has already
-     *     been selected by the FilePicker
-     * @param {Number?} opt_num_tries The number tries left to open this file.
-     *     Should be set when already_picked is true.
-     * @return {Promise} A promise fullfilled by file contents.
+     * Resolves with a files resource with a downloadUrl for the file of
+     * `resource`.  This may involve requesting the user to open the file in a
+     * FilePicker.  Parameters are as for `get_contents`.
      */
-    exports.get_contents = function (resource, already_picked, opt_num_tries) {
+    var get_downloadable_resource = function (resource, already_picked, opt_num_tries) {
         if (resource['downloadUrl']) {
-            return gapiutils.download(resource['downloadUrl']);
+            return Promise.resolve(resource);
         }
         else if (already_picked) {
             if (opt_num_tries == 0) {
                 return Promise.reject(new Error('Max retries of file load reached'));
             }
             var request = gapi.client.drive.files.get({ 'fileId': resource['id'] });
-            var reply = gapiutils.execute(request);
+            var reply = gapiutils.execute_batched(request);
             var delay = exports.GET_CONTENTS_INITIAL_DELAY *
                 Math.pow(exports.GET_CONTENTS_EXPONENTIAL_BACKOFF_FACTOR, exports.GET_CONTENTS_MAX_TRIES - opt_num_tries);
             var delayed_reply = new Promise(function (resolve, reject) {
@@ -253,7 +600,7 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
                 }, delay);
             });
             return delayed_reply.then(function (new_resource) {
-                return exports.get_contents(new_resource, true, opt_num_tries - 1);
+                return get_downloadable_resource(new_resource, true, opt_num_tries - 1);
             });
         }
         else {
@@ -264,10 +611,248 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
             // app.
             return pickerutils.pick_file(resource.parents[0]['id'], resource['title'])
                 .then(function () {
-                return exports.get_contents(resource, true, exports.GET_CONTENTS_MAX_TRIES);
+                return get_downloadable_resource(resource, true, exports.GET_CONTENTS_MAX_TRIES);
             });
         }
     };
+    /**
+     * Attempt to get the contents of a file with the given id.  This may
+     * involve requesting the user to open the file in a FilePicker.
+     * @param {Object} resource The files resource of the file.
+     * @param {Boolean} already_picked Set to true if this file has already
+     *     been selected by the FilePicker
+     * @param {Number?} opt_num_tries The number tries left to open this file.
+     *     Should be set when already_picked is true.
+     * @return {Promise} A promise fullfilled by file contents.
+     */
+    exports.get_contents = function (resource, already_picked, opt_num_tries) {
+        return get_downloadable_resource(resource, already_picked, opt_num_tries)
+            .then(function (resource) {
+            return gapiutils.download(resource['downloadUrl']);
+        });
+    };
+    /**
+     * Size in bytes of the ranges requested by `download_chunks`.
+     */
+    exports.DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024; // 4 MB
+    /**
+     * Files of at least this many bytes are opened with `get_contents_text`
+     * rather than `get_contents`.
+     */
+    exports.STREAMING_DOWNLOAD_THRESHOLD = 8 * 1024 * 1024; // 8 MB
+    /**
+     * Number of chunks downloaded at once by `download_chunks`.
+     */
+    exports.DOWNLOAD_CONCURRENCY = 3;
+    /**
+     * Downloads bytes `start` to `end` of a file in chunks of
+     * DOWNLOAD_CHUNK_SIZE bytes, passing each chunk to `on_chunk`, in order, as
+     * soon as it arrives.  Once the size of the file is known, up to
+     * DOWNLOAD_CONCURRENCY chunks are downloaded at once.
+     *
+     * @param {Object} resource The files resource of the file, with a
+     *     downloadUrl.
+     * @param {Function} on_chunk function(data:ArrayBuffer, offset:number,
+     *     size:number), where size is the size of the file (NaN if unknown).
+     * @param {number} [start=0] Offset of the first byte.
+     * @param {number} [end] Offset of the last byte (included), defaults to the
+     *     end of the file.
+     * @return {Promise} resolved with the size of the file once all the chunks
+     *     have been passed to `on_chunk`.
+     */
+    exports.download_chunks = function (resource, on_chunk, start, end) {
+        if (start === void 0) { start = 0; }
+        var chunk_size = exports.DOWNLOAD_CHUNK_SIZE;
+        var request_chunk = function (offset) {
+            var last = offset + chunk_size - 1;
+            if (end !== undefined) {
+                last = Math.min(last, end);
+            }
+            return gapiutils.download_range(resource['downloadUrl'], offset, last);
+        };
+        var size = null;
+        var stop;
+        var next_offset;
+        // Chunks requested and not yet passed to on_chunk, in order.
+        var pending = [];
+        var receive = function (range) {
+            var length = range.data.byteLength;
+            if (size === null) {
+                size = range.size !== null ? range.size : Number(resource['fileSize']);
+                stop = end === undefined ? size : Math.min(end + 1, size);
+                next_offset = range.start + length;
+            }
+            if (isNaN(stop)) {
+                // Without the size, a full chunk may not be the last one.
+                if (length == chunk_size) {
+                    pending.push(request_chunk(range.start + length));
+                }
+            }
+            else {
+                while (pending.length < exports.DOWNLOAD_CONCURRENCY && next_offset < stop) {
+                    pending.push(request_chunk(next_offset));
+                    next_offset += chunk_size;
+                }
+            }
+            on_chunk(range.data, range.start, size);
+            var next = pending.shift();
+            return next ? next.then(receive) : size;
+        };
+        return request_chunk(start).then(receive);
+    };
+    /**
+     * Concatenates ArrayBuffers.
+     */
+    var concat_buffers = function (buffers) {
+        if (buffers.length == 1) {
+            return buffers[0];
+        }
+        var length = buffers.reduce(function (total, buffer) { return total + buffer.byteLength; }, 0);
+        var bytes = new Uint8Array(length);
+        var offset = 0;
+        buffers.forEach(function (buffer) {
+            bytes.set(new Uint8Array(buffer), offset);
+            offset += buffer.byteLength;
+        });
+        return bytes.buffer;
+    };
+    /**
+     * Gets the contents of a file as bytes.  Files of more than
+     * DOWNLOAD_CHUNK_SIZE bytes are downloaded in chunks, copied into a single
+     * buffer allocated once the size of the file is known.
+     * @param {Object} resource The files resource of the file.
+     * @param {Function} [on_chunk] Called with each chunk as it arrives, as
+     *     `on_chunk` of `download_chunks`.
+     * @return {Promise} resolved with an ArrayBuffer.
+     */
+    exports.get_contents_binary = function (resource, on_chunk) {
+        return get_downloadable_resource(resource, false).then(function (resource) {
+            var bytes = null;
+            var parts = [];
+            return exports.download_chunks(resource, function (data, offset, size) {
+                if (on_chunk) {
+                    on_chunk(data, offset, size);
+                }
+                if (bytes === null && (isNaN(size) || (offset == 0 && data.byteLength == size))) {
+                    parts.push(data);
+                    return;
+                }
+                bytes = bytes || new Uint8Array(size);
+                bytes.set(new Uint8Array(data), offset);
+            }).then(function () {
+                return bytes ? bytes.buffer : concat_buffers(parts);
+            });
+        });
+    };
+    /**
+     * Gets the contents of a text file, downloaded in chunks that are decoded
+     * as they arrive.
+     * @param {Object} resource The files resource of the file.
+     * @param {Function} [on_text] function(text:string, loaded:number,
+     *     size:number) called with the text of each chunk, the number of bytes
+     *     downloaded so far and the size of the file.
+     * @return {Promise} resolved with the text of the file.
+     */
+    exports.get_contents_text = function (resource, on_text) {
+        return get_downloadable_resource(resource, false).then(function (resource) {
+            var decoder = new TextDecoder('utf-8');
+            var parts = [];
+            return exports.download_chunks(resource, function (data, offset, size) {
+                // Sequences cut at the end of a chunk are kept by the decoder
+                // until the next one.
+                var text = decoder.decode(new Uint8Array(data), { stream: true });
+                parts.push(text);
+                if (on_text) {
+                    on_text(text, offset + data.byteLength, size);
+                }
+            }).then(function () {
+                parts.push(decoder.decode());
+                return parts.join('');
+            });
+        });
+    };
+    /**
+     * Length of `bytes` without a UTF-8 sequence cut at the end.
+     */
+    var utf8_complete_length = function (bytes) {
+        var n = bytes.length;
+        for (var i = n - 1; i >= Math.max(0, n - 4); i--) {
+            var b = bytes[i];
+            if ((b & 0xC0) != 0x80) {
+                var length = b >= 0xF0 ? 4 : b >= 0xE0 ? 3 : b >= 0xC0 ? 2 : 1;
+                return i + length <= n ? n : i;
+            }
+        }
+        return n;
+    };
+    /**
+     * Number of continuation bytes at the start of `bytes`, the end of a UTF-8
+     * sequence cut at the start.
+     */
+    var utf8_continuation_length = function (bytes) {
+        var i = 0;
+        while (i < Math.min(3, bytes.length) && (bytes[i] & 0xC0) == 0x80) {
+            i++;
+        }
+        return i;
+    };
+    /**
+     * Reads part of a text file, e.g. its head or tail for a preview, with a
+     * single Range request.  The bytes of UTF-8 sequences cut at the edges of
+     * the range are left out.
+     * @param {Object} resource The files resource of the file.
+     * @param {number} start Offset of the first byte or, if negative, number of
+     *     bytes to read at the end of the file.
+     * @param {number} [end] Offset of the last byte (included), defaults to the
+     *     end of the file.
+     * @return {Promise} resolved with {text, start, end, size}: the text, the
+     *     offsets in the file of its first byte and of the byte after its last
+     *     one, and the size of the file.
+     */
+    exports.get_text_range = function (resource, start, end) {
+        return get_downloadable_resource(resource, false).then(function (resource) {
+            return gapiutils.download_range(resource['downloadUrl'], start, end)
+                .then(function (range) {
+                var size = range.size !== null ? range.size : Number(resource['fileSize']);
+                var bytes = new Uint8Array(range.data);
+                var offset = range.start !== null ? range.start : size - bytes.length;
+                var first = offset > 0 ? utf8_continuation_length(bytes) : 0;
+                var last = offset + bytes.length < size ? utf8_complete_length(bytes) : bytes.length;
+                last = Math.max(first, last);
+                return {
+                    text: new TextDecoder('utf-8').decode(bytes.subarray(first, last)),
+                    start: offset + first,
+                    end: offset + last,
+                    size: size
+                };
+            });
+        });
+    };
+    /**
+     * Encodes bytes in base64, a slice at a time, so that the whole contents
+     * are never held as a binary string.
+     */
+    exports.bytes_to_base64 = function (buffer) {
+        var bytes = new Uint8Array(buffer);
+        var parts = [];
+        // A multiple of 3, so that slices are encoded without padding.
+        var step = 3 * 4096;
+        for (var i = 0; i < bytes.length; i += step) {
+            parts.push(btoa(String.fromCharCode.apply(null, bytes.subarray(i, i + step))));
+        }
+        return parts.join('');
+    };
+    /**
+     * Fetch the permission id of the user, which identifies their Google
+     * account.
+     * @return {Promise} fullfilled with the permission id.
+     */
+    exports.get_user_id = function () {
+        var request = gapi.client.drive.about.get({ 'fields': 'user/permissionId' });
+        return gapiutils.execute_batched(request).then(function (result) {
+            return result['user']['permissionId'];
+        });
+    };
     /**
      * Fetch user avatar url and put it in the header
      * optionally take a selector into which to insert the img tag
@@ -278,7 +863,7 @@ define(["require", "exports", 'jquery', './gapiutils', './pickerutils'], functio
     exports.set_user_info = function (selector) {
         selector = selector || '#header-container';
         var request = gapi.client.drive.about.get();
-        return gapiutils.execute(request).then(function (result) {
+        return gapiutils.execute_batched(request).then(function (result) {
             var user = result.user;
             var image = $('<img/>').attr('src', result.user.picture.url)
                 .addClass('pull-right')
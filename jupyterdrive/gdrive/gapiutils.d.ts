@@ -7,12 +7,71 @@ export declare var APP_ID: string;
  * Helper functions
  */
 /**
- * Perform an authenticated download.
+ * Perform an authenticated download.  Like other requests, it is sent
+ * again after a backoff when Drive answers with a rate limit or server
+ * error.
  * @param {string} url The download URL.
  * @return {Promise} resolved with the contents of the file, or rejected
  *     with an Error.
  */
 export declare var download: (url: string) => Promise<any>;
+/**
+ * Part of a file, as downloaded by `download_range`.
+ */
+export interface ByteRange {
+    data: ArrayBuffer;
+    start: number;
+    size: number;
+}
+/**
+ * Perform an authenticated download of part of a file with an HTTP Range
+ * request.  The body is received as an ArrayBuffer, without the conversion
+ * to a string done by `download`.
+ * @param {string} url The download URL.
+ * @param {number} start Offset of the first byte or, if negative, number of
+ *     bytes to read at the end of the file.
+ * @param {number} [end] Offset of the last byte (included), defaults to the
+ *     end of the file.
+ * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
+ * @return {Promise} resolved with a ByteRange, empty if start is past the
+ *     end of the file, or rejected with an Error.
+ */
+export declare var download_range: (url: string, start: number, end?: number, priority?: Priority) => Promise<ByteRange>;
+/**
+ * Request scheduling
+ *
+ * Requests to Google APIs, downloads and the requests of `send_xhr`
+ * included, go through a scheduler that limits their rate (token bucket)
+ * and how many are in flight, runs interactive requests before background
+ * ones, and sends requests again, after a jittered exponential backoff, when
+ * Drive answers with a rate limit or server error.
+ */
+/**
+ * Priority of a request: waiting requests of a lower value are sent first.
+ */
+export declare enum Priority {
+    INTERACTIVE = 0,
+    BACKGROUND = 1,
+}
+/**
+ * Sustained number of requests sent per second (Drive's default quota is
+ * 1000 requests per 100 seconds per user).
+ * @type {number}
+ */
+export declare var REQUESTS_PER_SECOND: number;
+/**
+ * Number of requests that can be sent at once after an idle period.
+ * @type {number}
+ */
+export declare var REQUEST_BURST: number;
+/**
+ * Maximum number of requests in flight.
+ * @type {number}
+ */
+export declare var MAX_CONCURRENT_REQUESTS: number;
+export declare var RETRY_INITIAL_DELAY: number;
+export declare var RETRY_MAX_DELAY: number;
+export declare var RETRY_MAX_TRIES: number;
 /**
  * Executes a Google API request.  This wraps the request.execute() method,
  * by returning a Promise, which may be resolved or rejected.  The raw
@@ -29,10 +88,86 @@ export declare var download: (url: string) => Promise<any>;
  *     client API.
  * @param {boolean} [attemptReauth=true] Boolean indicating whether
  *     re-authorization should be attempted if a 401 status is returned.
+ * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
  * @return {Promise} Fullfilled with the result on success, or the
  *     result wrapped as an Error on error.
  */
-export declare var execute: (request: any, attemptReauth?: boolean) => any;
+export declare var execute: (request: any, attemptReauth?: boolean, priority?: Priority) => Promise<any>;
+/**
+ * Sends an authenticated request with XMLHttpRequest, which unlike
+ * gapi.client gives access to the headers of the response.  As in
+ * `execute`, the request is scheduled, sent again after a backoff when
+ * Drive answers with a rate limit or server error, and sent again once
+ * after re-authorizing if it fails with a 401 status.
+ *
+ * @param {Object?} opt_options a dictionary containing the following keys
+ *     priority: scheduling Priority, defaults to Priority.INTERACTIVE
+ *     response_type: the responseType of the XMLHttpRequest
+ *     retry_server_errors: false to only send the request again after a
+ *         rate limit error, for requests that handle server errors
+ *         themselves
+ *     reauthorize: false not to re-authorize after a 401 status
+ * @return {Promise} fullfilled with the XMLHttpRequest once it is done,
+ *     whatever its status.  The status is 0 after a network error.
+ */
+export declare var send_xhr: (method: string, url: string, headers: any, body?: any, opt_options?: any) => Promise<XMLHttpRequest>;
+/**
+ * Batching
+ *
+ * Drive metadata requests issued within a short window are sent together
+ * in a single HTTP batch request.  Uploads and downloads cannot be batched
+ * and go through `execute` and `download`.
+ */
+/**
+ * Time in milliseconds during which requests passed to `execute_batched`
+ * are collected before being sent.
+ * @type {number}
+ */
+export declare var BATCH_WINDOW: number;
+/**
+ * Maximum number of requests in a batch (a limit of the Drive API).
+ * @type {number}
+ */
+export declare var MAX_BATCH_SIZE: number;
+/**
+ * Number of requests sent by `execute_batched` and `execute_all`, and
+ * number of HTTP round trips used to send them.  The difference is the
+ * number of round trips saved by batching.
+ */
+export declare var batch_stats: {
+    requests: number;
+    round_trips: number;
+};
+/**
+ * Executes a Google API request as part of a batch: requests passed to
+ * this function within `BATCH_WINDOW` milliseconds are sent together.
+ * Errors and re-authorization are handled as in `execute`.
+ *
+ * @param {Object} request The request, generated by the Google JavaScript
+ *     client API.  It must not be a media upload.
+ * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
+ * @return {Promise} Fullfilled with the result on success, or the
+ *     result wrapped as an Error on error.
+ */
+export declare var execute_batched: (request: any, priority?: Priority) => Promise<any>;
+/**
+ * Executes independent Google API requests together, without waiting for
+ * the batch window.
+ *
+ * @param {Array} requests The requests, generated by the Google JavaScript
+ *     client API.  They must not be media uploads.
+ * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
+ * @return {Promise} Fullfilled with the list of results when they all
+ *     succeed, or rejected with the first error.
+ */
+export declare var execute_all: (requests: any[], priority?: Priority) => Promise<any[]>;
+/**
+ * Registers a callback, called with true after each successful
+ * authorization, which may be for another Google account than the previous
+ * one, and with false when authorizing without a popup fails because the
+ * user signed out of Google.
+ */
+export declare var on_auth_change: (callback: (signed_in: boolean) => void) => void;
 /**
  * calling config with conf, results in the promise _conf_prm being resolved with conf.
  * This then triggers the rest of the gapi loading
@@ -12,6 +12,7 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
         APP_ID: '763546234320',
         FILE_SCOPE: true,
         METADATA_SCOPE: true,
+        SYNC_INDEX: false,
     };
     /**
      * Google API App ID
@@ -41,16 +42,89 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
      * Helper functions
      */
     /**
-     * Perform an authenticated download.
+     * Perform an authenticated download.  Like other requests, it is sent
+     * again after a backoff when Drive answers with a rate limit or server
+     * error.
      * @param {string} url The download URL.
      * @return {Promise} resolved with the contents of the file, or rejected
      *     with an Error.
      */
     exports.download = function (url) {
-        // Sends request to load file to drive.
-        var token = gapi.auth.getToken().access_token;
-        var settings = { headers: { 'Authorization': 'Bearer ' + token } };
-        return utils.promising_ajax(url, settings);
+        var send = function () {
+            // Sends request to load file to drive.
+            var token = gapi.auth.getToken().access_token;
+            var settings = { headers: { 'Authorization': 'Bearer ' + token } };
+            return utils.promising_ajax(url, settings).then(function (contents) {
+                return { contents: contents };
+            }, function (error) {
+                return { error: error };
+            });
+        };
+        var retryable = function (result) {
+            var xhr = result.error && result.error['xhr'];
+            return !!xhr && is_xhr_retryable(xhr);
+        };
+        return send_with_retries(send, retryable, Priority.INTERACTIVE, 1).then(function (result) {
+            if (result.error) {
+                throw result.error;
+            }
+            return result.contents;
+        });
+    };
+    /**
+     * Perform an authenticated download of part of a file with an HTTP Range
+     * request.  The body is received as an ArrayBuffer, without the conversion
+     * to a string done by `download`.
+     * @param {string} url The download URL.
+     * @param {number} start Offset of the first byte or, if negative, number of
+     *     bytes to read at the end of the file.
+     * @param {number} [end] Offset of the last byte (included), defaults to the
+     *     end of the file.
+     * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
+     * @return {Promise} resolved with a ByteRange, empty if start is past the
+     *     end of the file, or rejected with an Error.
+     */
+    exports.download_range = function (url, start, end, priority) {
+        if (priority === void 0) { priority = Priority.INTERACTIVE; }
+        var range = start < 0 ? 'bytes=-' + (-start)
+            : 'bytes=' + start + '-' + (end === undefined ? '' : end);
+        return exports.send_xhr('GET', url, { 'Range': range }, undefined, { priority: priority, response_type: 'arraybuffer' })
+            .then(function (xhr) {
+            return byte_range(xhr, start, end);
+        });
+    };
+    /**
+     * Reads the ByteRange from the response to a Range request.  A server may
+     * ignore the Range header and send the whole file (status 200), which is
+     * then sliced.
+     */
+    var byte_range = function (xhr, start, end) {
+        // The header may not be exposed to cross-origin requests.
+        var content_range = xhr.getResponseHeader('Content-Range') || '';
+        var match = /^bytes (?:(\d+)-\d+|\*)\/(\d+)$/.exec(content_range);
+        var size = match ? Number(match[2]) : null;
+        if (xhr.status == 206) {
+            var offset = match && match[1] !== undefined ? Number(match[1]) : null;
+            if (offset === null && start >= 0) {
+                offset = start;
+            }
+            return { data: xhr.response, start: offset, size: size };
+        }
+        if (xhr.status == 416) {
+            return { data: new ArrayBuffer(0), start: size, size: size };
+        }
+        if (xhr.status == 200) {
+            var whole = xhr.response;
+            size = whole.byteLength;
+            var first = start < 0 ? Math.max(size + start, 0) : Math.min(start, size);
+            var last = end === undefined ? size : Math.max(first, Math.min(end + 1, size));
+            var data = (first == 0 && last == size) ? whole : whole.slice(first, last);
+            return { data: data, start: first, size: size };
+        }
+        var error = new Error('Download failed with status ' + xhr.status);
+        error.name = 'DownloadError';
+        error['xhr'] = xhr;
+        throw error;
     };
     /**
      * Wrap a Google API result as an Promise, which is immediate resolved
@@ -77,6 +151,177 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
             return Promise.resolve(result);
         }
     };
+    /**
+     * Request scheduling
+     *
+     * Requests to Google APIs, downloads and the requests of `send_xhr`
+     * included, go through a scheduler that limits their rate (token bucket)
+     * and how many are in flight, runs interactive requests before background
+     * ones, and sends requests again, after a jittered exponential backoff, when
+     * Drive answers with a rate limit or server error.
+     */
+    /**
+     * Priority of a request: waiting requests of a lower value are sent first.
+     */
+    (function (Priority) {
+        Priority[Priority["INTERACTIVE"] = 0] = "INTERACTIVE";
+        Priority[Priority["BACKGROUND"] = 1] = "BACKGROUND";
+    })(exports.Priority || (exports.Priority = {}));
+    var Priority = exports.Priority;
+    /**
+     * Sustained number of requests sent per second (Drive's default quota is
+     * 1000 requests per 100 seconds per user).
+     * @type {number}
+     */
+    exports.REQUESTS_PER_SECOND = 10;
+    /**
+     * Number of requests that can be sent at once after an idle period.
+     * @type {number}
+     */
+    exports.REQUEST_BURST = 20;
+    /**
+     * Maximum number of requests in flight.
+     * @type {number}
+     */
+    exports.MAX_CONCURRENT_REQUESTS = 6;
+    exports.RETRY_INITIAL_DELAY = 500; // 500 ms
+    exports.RETRY_MAX_DELAY = 32000; // 32 s
+    exports.RETRY_MAX_TRIES = 6;
+    /* Tokens of the rate limit bucket, as of _tokens_time. */
+    var _tokens = exports.REQUEST_BURST;
+    var _tokens_time = Date.now();
+    /* Number of requests in flight. */
+    var _running = 0;
+    /* Requests waiting to be sent, one queue per priority. */
+    var _waiting = [[], []];
+    /* setTimeout handle of the next attempt to send waiting requests. */
+    var _wakeup_timeout = null;
+    /**
+     * Takes `cost` tokens from the rate limit bucket.
+     * @return {number} 0 if the tokens were taken, or the time in milliseconds
+     *     until the bucket has enough tokens.
+     */
+    var take_tokens = function (cost) {
+        var now = Date.now();
+        _tokens = Math.min(exports.REQUEST_BURST, _tokens + (now - _tokens_time) * exports.REQUESTS_PER_SECOND / 1000);
+        _tokens_time = now;
+        cost = Math.min(cost, exports.REQUEST_BURST);
+        if (_tokens >= cost) {
+            _tokens -= cost;
+            return 0;
+        }
+        return Math.ceil((cost - _tokens) * 1000 / exports.REQUESTS_PER_SECOND);
+    };
+    /**
+     * Sends waiting requests, by priority, as long as the concurrency and rate
+     * limits allow.
+     */
+    var run_waiting = function () {
+        while (_running < exports.MAX_CONCURRENT_REQUESTS) {
+            var queue = _waiting.filter(function (q) { return q.length > 0; })[0];
+            if (!queue) {
+                return;
+            }
+            var wait = take_tokens(queue[0].cost);
+            if (wait > 0) {
+                if (_wakeup_timeout === null) {
+                    _wakeup_timeout = setTimeout(function () {
+                        _wakeup_timeout = null;
+                        run_waiting();
+                    }, wait);
+                }
+                return;
+            }
+            var task = queue.shift();
+            _running += 1;
+            var done = function () {
+                _running -= 1;
+                run_waiting();
+            };
+            task.run().then(done, done);
+        }
+    };
+    /**
+     * Runs `send` when the scheduler allows it.
+     * @param {Function} send Sends a request, returns a Promise.
+     * @param {Priority} priority Priority of the request
+     * @param {number} cost Number of API calls made by `send`.
+     * @return {Promise} the Promise returned by `send`.
+     */
+    var schedule = function (send, priority, cost) {
+        return new Promise(function (resolve, reject) {
+            _waiting[priority].push({ cost: cost, run: function () {
+                    var sent = new Promise(function (resolve, reject) { resolve(send()); });
+                    resolve(sent);
+                    return sent;
+                } });
+            run_waiting();
+        });
+    };
+    /**
+     * Whether a Google API result is a rate limit or server error, after which
+     * the request should be sent again later.
+     * @param {Object} result The result of a Google API call.
+     * @param {number} opt_status The HTTP status, if known.
+     */
+    var is_retryable = function (result, opt_status) {
+        var error = result && result['error'];
+        var code = opt_status || (error && error['code']);
+        if (code == 429 || code >= 500) {
+            return true;
+        }
+        if (code == 403 && error) {
+            return (error['errors'] || []).some(function (e) {
+                return e['reason'] == 'userRateLimitExceeded' || e['reason'] == 'rateLimitExceeded';
+            });
+        }
+        return false;
+    };
+    /**
+     * Whether a request sent with XMLHttpRequest (or jQuery) failed with a rate
+     * limit or server error.
+     */
+    var is_xhr_retryable = function (xhr) {
+        var result = null;
+        if (!xhr.responseType || xhr.responseType === 'text') {
+            try {
+                result = JSON.parse(xhr.responseText);
+            }
+            catch (e) { }
+        }
+        return is_retryable(result, xhr.status);
+    };
+    /**
+     * Time to wait before the retry number `attempt` (counting from 0): an
+     * exponential backoff, with half of it random so that clients do not retry
+     * in lockstep.
+     */
+    var backoff_delay = function (attempt) {
+        var delay = Math.min(exports.RETRY_MAX_DELAY, exports.RETRY_INITIAL_DELAY * Math.pow(2, attempt));
+        return delay / 2 + Math.random() * delay / 2;
+    };
+    var sleep = function (delay) {
+        return new Promise(function (resolve, reject) {
+            setTimeout(resolve, delay);
+        });
+    };
+    /**
+     * Schedules `send`, and schedules it again after a backoff while its result
+     * is retryable, up to RETRY_MAX_TRIES times.
+     * @param {Function} send Sends a request, returns a Promise of its result.
+     * @param {Function} retryable Whether a result should be retried.
+     */
+    var send_with_retries = function (send, retryable, priority, cost, attempt) {
+        if (attempt === void 0) { attempt = 0; }
+        return schedule(send, priority, cost).then(function (result) {
+            if (attempt + 1 >= exports.RETRY_MAX_TRIES || !retryable(result)) {
+                return result;
+            }
+            return sleep(backoff_delay(attempt)).then(function () {
+                return send_with_retries(send, retryable, priority, cost, attempt + 1);
+            });
+        });
+    };
     /**
      * Executes a Google API request.  This wraps the request.execute() method,
      * by returning a Promise, which may be resolved or rejected.  The raw
@@ -93,31 +338,246 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
      *     client API.
      * @param {boolean} [attemptReauth=true] Boolean indicating whether
      *     re-authorization should be attempted if a 401 status is returned.
+     * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
      * @return {Promise} Fullfilled with the result on success, or the
      *     result wrapped as an Error on error.
      */
-    exports.execute = function (request, attemptReauth) {
+    exports.execute = function (request, attemptReauth, priority) {
         if (attemptReauth === void 0) { attemptReauth = true; }
-        return new Promise(function (resolve, reject) {
-            request.execute(function (result) {
-                /* Special case: although the user authorizes jupyter-drive on first
-                 * load, the authorization has a timeout. (Google seem to use 3600
-                 * seconds == 1 hour as default.) After this time, even
-                 * authenticated requests will fail. If we have failed with a 401,
-                 * attempt to execute again after authorizing once more.
-                 */
-                if (attemptReauth && (result.statusCode === 401)) {
-                    console.warn("[gapiutils.js] Got 401 status. Will re-authorize.");
-                    resolve(_conf_prm.then(function (config) {
-                        return authorize(false, config);
-                    }).then(exports.execute(request, false)));
+        if (priority === void 0) { priority = Priority.INTERACTIVE; }
+        var send = function () {
+            return new Promise(function (resolve, reject) {
+                request.execute(resolve);
+            });
+        };
+        return send_with_retries(send, is_retryable, priority, 1)
+            .then(function (result) {
+            /* Special case: although the user authorizes jupyter-drive on first
+             * load, the authorization has a timeout. (Google seem to use 3600
+             * seconds == 1 hour as default.) After this time, even
+             * authenticated requests will fail. If we have failed with a 401,
+             * attempt to execute again after authorizing once more.
+             */
+            if (attemptReauth && result && (result.statusCode === 401)) {
+                console.warn("[gapiutils.js] Got 401 status. Will re-authorize.");
+                return _conf_prm.then(function (config) {
+                    return authorize(false, config);
+                }).then(function () {
+                    return exports.execute(request, false, priority);
+                });
+            }
+            else {
+                return wrap_result(result);
+            }
+        });
+    };
+    /**
+     * Sends an authenticated request with XMLHttpRequest, which unlike
+     * gapi.client gives access to the headers of the response.  As in
+     * `execute`, the request is scheduled, sent again after a backoff when
+     * Drive answers with a rate limit or server error, and sent again once
+     * after re-authorizing if it fails with a 401 status.
+     *
+     * @param {Object?} opt_options a dictionary containing the following keys
+     *     priority: scheduling Priority, defaults to Priority.INTERACTIVE
+     *     response_type: the responseType of the XMLHttpRequest
+     *     retry_server_errors: false to only send the request again after a
+     *         rate limit error, for requests that handle server errors
+     *         themselves
+     *     reauthorize: false not to re-authorize after a 401 status
+     * @return {Promise} fullfilled with the XMLHttpRequest once it is done,
+     *     whatever its status.  The status is 0 after a network error.
+     */
+    exports.send_xhr = function (method, url, headers, body, opt_options) {
+        var options = opt_options || {};
+        var priority = options['priority'] === undefined ? Priority.INTERACTIVE : options['priority'];
+        var send = function () {
+            return new Promise(function (resolve, reject) {
+                var xhr = new XMLHttpRequest();
+                xhr.open(method, url);
+                if (options['response_type']) {
+                    xhr.responseType = options['response_type'];
+                }
+                xhr.setRequestHeader('Authorization', 'Bearer ' + gapi.auth.getToken().access_token);
+                for (var name in headers) {
+                    xhr.setRequestHeader(name, headers[name]);
+                }
+                xhr.onload = xhr.onerror = xhr.ontimeout = function () { resolve(xhr); };
+                xhr.send(body === undefined ? null : body);
+            });
+        };
+        var retryable = function (xhr) {
+            if (xhr.status >= 500 && options['retry_server_errors'] === false) {
+                return false;
+            }
+            return is_xhr_retryable(xhr);
+        };
+        return send_with_retries(send, retryable, priority, 1)
+            .then(function (xhr) {
+            if (options['reauthorize'] !== false && xhr.status == 401) {
+                console.warn("[gapiutils.js] Got 401 status. Will re-authorize.");
+                return _conf_prm.then(function (config) {
+                    return authorize(false, config);
+                }).then(function () {
+                    return exports.send_xhr(method, url, headers, body, $.extend({}, options, { reauthorize: false }));
+                });
+            }
+            return xhr;
+        });
+    };
+    /**
+     * Batching
+     *
+     * Drive metadata requests issued within a short window are sent together
+     * in a single HTTP batch request.  Uploads and downloads cannot be batched
+     * and go through `execute` and `download`.
+     */
+    /**
+     * Time in milliseconds during which requests passed to `execute_batched`
+     * are collected before being sent.
+     * @type {number}
+     */
+    exports.BATCH_WINDOW = 10;
+    /**
+     * Maximum number of requests in a batch (a limit of the Drive API).
+     * @type {number}
+     */
+    exports.MAX_BATCH_SIZE = 100;
+    /**
+     * Number of requests sent by `execute_batched` and `execute_all`, and
+     * number of HTTP round trips used to send them.  The difference is the
+     * number of round trips saved by batching.
+     */
+    exports.batch_stats = { requests: 0, round_trips: 0 };
+    /* Requests waiting for the current batch window to end. */
+    var _batch_queue = [];
+    /* setTimeout handle of the end of the current batch window. */
+    var _batch_timeout = null;
+    /**
+     * Sends requests as one batch, and resolves each entry with its result.
+     * Requests failing with a 401 status are sent again on their own after
+     * re-authorizing once, like `execute` does, and so are requests failing
+     * with a rate limit or server error, after a backoff.
+     * @param {Array} entries Objects with the `request`, its `priority` and
+     *     its `resolve` function.
+     */
+    var send_batch = function (entries) {
+        exports.batch_stats.requests += entries.length;
+        exports.batch_stats.round_trips += 1;
+        if (entries.length == 1) {
+            entries[0].resolve(exports.execute(entries[0].request, true, entries[0].priority));
+            return;
+        }
+        var priority = Math.min.apply(null, entries.map(function (entry) { return entry.priority; }));
+        var reauthorized = null;
+        var reauthorize_and_retry = function (entry) {
+            if (reauthorized === null) {
+                console.warn("[gapiutils.js] Got 401 status in batch. Will re-authorize.");
+                reauthorized = _conf_prm.then(function (config) {
+                    return authorize(false, config);
+                });
+            }
+            exports.batch_stats.round_trips += 1;
+            return reauthorized.then(function () {
+                return exports.execute(entry.request, false, entry.priority);
+            });
+        };
+        var retry_later = function (entry) {
+            exports.batch_stats.round_trips += 1;
+            return sleep(backoff_delay(0)).then(function () {
+                return exports.execute(entry.request, true, entry.priority);
+            });
+        };
+        var send = function () {
+            var batch = gapi.client.newBatch();
+            entries.forEach(function (entry, i) {
+                batch.add(entry.request, { 'id': String(i) });
+            });
+            // The batch Promise is rejected when the batch request as a whole
+            // fails: both outcomes are handled below.
+            return new Promise(function (resolve, reject) {
+                batch.then(resolve, resolve);
+            });
+        };
+        var retryable = function (response) {
+            return is_retryable(response && response.result, response && response.status);
+        };
+        send_with_retries(send, retryable, priority, entries.length)
+            .then(function (response) {
+            var ok = response && response.status === 200;
+            var responses = (ok && response.result) || {};
+            entries.forEach(function (entry, i) {
+                var item = ok ? responses[String(i)] : response;
+                var status = item && item.status;
+                if (status === 401) {
+                    entry.resolve(reauthorize_and_retry(entry));
+                }
+                else if (ok && is_retryable(item && item.result, status)) {
+                    entry.resolve(retry_later(entry));
                 }
                 else {
-                    resolve(wrap_result(result));
+                    entry.resolve(wrap_result(item && item.result));
                 }
             });
         });
     };
+    /**
+     * Sends the requests collected during the current batch window.
+     */
+    var flush_batch = function () {
+        if (_batch_timeout !== null) {
+            clearTimeout(_batch_timeout);
+            _batch_timeout = null;
+        }
+        var entries = _batch_queue;
+        _batch_queue = [];
+        for (var i = 0; i < entries.length; i += exports.MAX_BATCH_SIZE) {
+            send_batch(entries.slice(i, i + exports.MAX_BATCH_SIZE));
+        }
+    };
+    /**
+     * Executes a Google API request as part of a batch: requests passed to
+     * this function within `BATCH_WINDOW` milliseconds are sent together.
+     * Errors and re-authorization are handled as in `execute`.
+     *
+     * @param {Object} request The request, generated by the Google JavaScript
+     *     client API.  It must not be a media upload.
+     * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
+     * @return {Promise} Fullfilled with the result on success, or the
+     *     result wrapped as an Error on error.
+     */
+    exports.execute_batched = function (request, priority) {
+        if (priority === void 0) { priority = Priority.INTERACTIVE; }
+        return new Promise(function (resolve, reject) {
+            _batch_queue.push({ request: request, priority: priority, resolve: resolve });
+            if (_batch_queue.length >= exports.MAX_BATCH_SIZE) {
+                flush_batch();
+            }
+            else if (_batch_timeout === null) {
+                _batch_timeout = setTimeout(flush_batch, exports.BATCH_WINDOW);
+            }
+        });
+    };
+    /**
+     * Executes independent Google API requests together, without waiting for
+     * the batch window.
+     *
+     * @param {Array} requests The requests, generated by the Google JavaScript
+     *     client API.  They must not be media uploads.
+     * @param {Priority} [priority=Priority.INTERACTIVE] Scheduling priority
+     * @return {Promise} Fullfilled with the list of results when they all
+     *     succeed, or rejected with the first error.
+     */
+    exports.execute_all = function (requests, priority) {
+        if (priority === void 0) { priority = Priority.INTERACTIVE; }
+        var results = requests.map(function (request) {
+            return new Promise(function (resolve, reject) {
+                _batch_queue.push({ request: request, priority: priority, resolve: resolve });
+            });
+        });
+        flush_batch();
+        return Promise.all(results);
+    };
     /**
      * Authorization and Loading Google API
      *
@@ -168,6 +628,20 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
     };
     /* {set,clear}Timeout handle for the authorization refresh timeout. */
     var _authorizeTimeout = null;
+    /* Callbacks registered with `on_auth_change`. */
+    var _auth_listeners = [];
+    /**
+     * Registers a callback, called with true after each successful
+     * authorization, which may be for another Google account than the previous
+     * one, and with false when authorizing without a popup fails because the
+     * user signed out of Google.
+     */
+    exports.on_auth_change = function (callback) {
+        _auth_listeners.push(callback);
+    };
+    var auth_changed = function (signed_in) {
+        _auth_listeners.forEach(function (callback) { callback(signed_in); });
+    };
     /**
      * Returns a promise fullfilled when the Google API has authorized.
      * @param {boolean} opt_withPopup If true, display popup without first
@@ -211,7 +685,10 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
                             });
                         }, 750 * (+result.expires_in));
                     }
-                    resolve(wrap_result(result));
+                    resolve(wrap_result(result).then(function (result) {
+                        auth_changed(true);
+                        return result;
+                    }));
                 });
             });
         };
@@ -245,6 +722,7 @@ define(["require", "exports", 'jquery', 'base/js/dialog', 'base/js/utils'], func
                     _error.name = 'GapiError';
                     return Promise.reject(_error);
                 }
+                auth_changed(false);
                 return authorize(true, { 'data': { 'gdrive': config } });
             });
         }
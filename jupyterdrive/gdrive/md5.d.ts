@@ -0,0 +1,16 @@
+/**
+ * Encodes a string as UTF-8, like Drive stores text contents.
+ */
+export declare var utf8_bytes: (text: string) => Uint8Array;
+/**
+ * MD5 digest of bytes.
+ * @param {Uint8Array} bytes The bytes to digest
+ * @return {string} the digest, as 32 lowercase hexadecimal digits.
+ */
+export declare var md5_bytes: (bytes: Uint8Array) => string;
+/**
+ * MD5 digest of the UTF-8 encoding of a string.
+ * @param {string} text The string to digest
+ * @return {string} the digest, as 32 lowercase hexadecimal digits.
+ */
+export declare var md5: (text: string) => string;
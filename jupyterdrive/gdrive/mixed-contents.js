@@ -201,6 +201,13 @@ define(["require", "exports", 'jquery', "base/js/utils"], function (require, exp
                 for (var i = 0; i < args.length; i++) {
                     args[i] = _this.from_virtual(root, arg_types[i], args[i], _this._config.data['mixed_contents']['schema']);
                 }
+                if (method_name === 'list_contents' && args[1] && args[1]['on_page']) {
+                    // Pages of streamed listings need virtual paths too.
+                    var on_page = args[1]['on_page'];
+                    args[1] = $.extend({}, args[1], {
+                        'on_page': function (page) { return on_page(_this._to_virtual_list(root, page)); }
+                    });
+                }
                 var contents = filesystem[root];
                 return contents[method_name].apply(contents, args).then($.proxy(_this._to_virtual, _this, root, return_type));
             });
@@ -26,6 +26,39 @@ export declare var notebook_json_contents_from_notebook: (notebook: Notebook) =>
  * @return {String} The JSON representation with lines split.
  */
 export declare var file_contents_from_notebook: (notebook: Notebook) => string;
+/**
+ * Off-main-thread conversions
+ *
+ * Parsing and serialising a notebook of several MB blocks the page for a
+ * noticeable time, so for large notebooks the conversions run in a Web
+ * Worker.  The worker is created from a Blob of the conversion functions
+ * above; if that fails (no Worker support, or a Content Security Policy
+ * forbidding blob: workers) the conversions run on the main thread.
+ *
+ * The strings are not transferred as ArrayBuffers: postMessage copies a
+ * string in one pass, while encoding and decoding it as UTF-8 on the main
+ * thread would cost more than that copy.
+ */
+/**
+ * Size (in characters of the file contents) above which notebooks are
+ * converted in a Web Worker.
+ * @type {number}
+ */
+export declare var WORKER_THRESHOLD: number;
+/**
+ * Like `notebook_from_file_contents`, but in a Web Worker for contents
+ * larger than WORKER_THRESHOLD.
+ * @param {String} contents The contents of the file, as a string.
+ * @return {Promise} fullfilled with a JSON representation of the notebook.
+ */
+export declare var notebook_from_file_contents_async: (contents: string) => Promise<Notebook>;
+/**
+ * Like `file_contents_from_notebook`, but in a Web Worker for notebooks
+ * larger than WORKER_THRESHOLD.
+ * @param {Object} notebook a JSON representation of the notebook.
+ * @return {Promise} fullfilled with the contents of the file.
+ */
+export declare var file_contents_from_notebook_async: (notebook: Notebook) => Promise<string>;
 /**
  * Create a JSON representation of a new notebook
  * @param {string} name Notebook name
@@ -38,11 +38,80 @@ define(["require", "exports"], function (require, exports) {
         });
     };
     /**
-     * Creates a JSON notebook representation from the contents of a file.
-     * @param {String} contents The contents of the file, as a string.
-     * @return {Object} a JSON representation of the notebook.
-         */
-    exports.notebook_from_file_contents = function (contents) {
+     * Joins a multiline string stored as a list of lines.
+     */
+    var join_lines = function (multiline_string) {
+        if (!Array.isArray(multiline_string)) {
+            return multiline_string;
+        }
+        if (multiline_string.length == 1 && typeof (multiline_string[0]) === 'string') {
+            return multiline_string[0];
+        }
+        return multiline_string.join('');
+    };
+    /**
+     * Splits a string into lines, each keeping its trailing newline, in a
+     * single scan.  The lines are slices of the string rather than new
+     * concatenations of a line and '\n'.
+     */
+    var split_lines = function (obj) {
+        if (typeof (obj) !== 'string') {
+            return obj;
+        }
+        var lines = [];
+        var start = 0;
+        var end = obj.indexOf('\n');
+        while (end !== -1) {
+            lines.push(obj.slice(start, end + 1));
+            start = end + 1;
+            end = obj.indexOf('\n', start);
+        }
+        lines.push(obj.slice(start));
+        return lines;
+    };
+    /**
+     * Copy of an object with one of its keys replaced.
+     */
+    var with_key = function (obj, key, value) {
+        var copy = {};
+        for (var k in obj) {
+            if (Object.prototype.hasOwnProperty.call(obj, k)) {
+                copy[k] = obj[k];
+            }
+        }
+        copy[key] = value;
+        return copy;
+    };
+    /**
+     * Copy of a notebook with the multiline strings split into lines.  Only
+     * the cells and outputs are copied, the other objects are shared with the
+     * notebook, which is left unchanged.
+     */
+    var split_notebook = function (notebook) {
+        if (!notebook['cells']) {
+            return notebook;
+        }
+        var cells = notebook['cells'].map(function (cell) {
+            var copy = cell;
+            if (cell['source']) {
+                copy = with_key(copy, 'source', split_lines(cell['source']));
+            }
+            if (cell['outputs']) {
+                copy = with_key(copy, 'outputs', cell['outputs'].map(function (output) {
+                    if (!output['data']) {
+                        return output;
+                    }
+                    return with_key(output, 'data', split_lines(output['data']));
+                }));
+            }
+            return copy;
+        });
+        return with_key(notebook, 'cells', cells);
+    };
+    /**
+     * Parses the contents of a file and joins the multiline strings.
+     */
+    var parse_notebook = function (contents) {
         var notebook = JSON.parse(contents);
         // bug in some case notebook where serialized twice.
         // make sure to re-deserialized, if once parse the notebook is still a
@@ -54,18 +123,18 @@ define(["require", "exports"], function (require, exports) {
             notebook = JSON.parse(notebook);
             console.warn("[notebook_model.ts] Double desirializing went ok.");
         }
-        var unsplit_lines = function (multiline_string) {
-            if (Array.isArray(multiline_string)) {
-                return multiline_string.join('');
-            }
-            else {
-                return multiline_string;
-            }
-        };
-        transform_notebook(notebook, unsplit_lines);
+        transform_notebook(notebook, join_lines);
         notebook.metadata = notebook.metadata || {};
         return notebook;
     };
+    /**
+     * Creates a JSON notebook representation from the contents of a file.
+     * @param {String} contents The contents of the file, as a string.
+     * @return {Object} a JSON representation of the notebook.
+         */
+    exports.notebook_from_file_contents = function (contents) {
+        return parse_notebook(contents);
+    };
     /**
      * Creates the contents of a file from a JSON notebook representation.
      * @param {Object} notebook a JSON representation of the notebook.
@@ -77,22 +146,7 @@ define(["require", "exports"], function (require, exports) {
             console.error(e);
             throw e;
         }
-        var notebook_copy = JSON.parse(JSON.stringify(notebook));
-        var split_lines = function (obj) {
-            if (typeof (obj) !== 'string') {
-                return obj;
-            }
-            return obj.split('\n').map(function (line, idx, array) {
-                if (idx == array.length - 1) {
-                    return line;
-                }
-                else {
-                    return line + '\n';
-                }
-            });
-        };
-        transform_notebook(notebook, split_lines);
-        return notebook;
+        return split_notebook(notebook);
     };
     /**
      * Creates the contents of a file from a JSON notebook representation.
@@ -102,6 +156,189 @@ define(["require", "exports"], function (require, exports) {
     exports.file_contents_from_notebook = function (notebook) {
         return JSON.stringify(exports.notebook_json_contents_from_notebook(notebook));
     };
+    /**
+     * Off-main-thread conversions
+     *
+     * Parsing and serialising a notebook of several MB blocks the page for a
+     * noticeable time, so for large notebooks the conversions run in a Web
+     * Worker.  The worker is created from a Blob of the conversion functions
+     * above; if that fails (no Worker support, or a Content Security Policy
+     * forbidding blob: workers) the conversions run on the main thread.
+     *
+     * The strings are not transferred as ArrayBuffers: postMessage copies a
+     * string in one pass, while encoding and decoding it as UTF-8 on the main
+     * thread would cost more than that copy.
+     */
+    /**
+     * Size (in characters of the file contents) above which notebooks are
+     * converted in a Web Worker.
+     * @type {number}
+     */
+    exports.WORKER_THRESHOLD = 1024 * 1024; // 1 MB
+    /**
+     * Runs a conversion requested by a message: `load` parses file contents,
+     * `dump` serialises a notebook.
+     */
+    var handle_message = function (event) {
+        var message = event.data;
+        try {
+            var result;
+            if (message.op === 'load') {
+                result = parse_notebook(message.payload);
+            }
+            else {
+                result = JSON.stringify(split_notebook(message.payload));
+            }
+            self.postMessage({ id: message.id, result: result });
+        }
+        catch (e) {
+            self.postMessage({ id: message.id, error: String(e) });
+        }
+    };
+    /**
+     * Source of the worker: the functions used by `handle_message`, which must
+     * only refer to each other.
+     */
+    var worker_source = function () {
+        var functions = {
+            'transform_notebook': transform_notebook,
+            'join_lines': join_lines,
+            'split_lines': split_lines,
+            'with_key': with_key,
+            'split_notebook': split_notebook,
+            'parse_notebook': parse_notebook,
+            'handle_message': handle_message
+        };
+        return Object.keys(functions).map(function (name) {
+            return 'var ' + name + ' = ' + functions[name].toString() + ';\n';
+        }).join('') + 'self.onmessage = handle_message;\n';
+    };
+    /* The worker, created on first use, or null if it could not be. */
+    var _worker = undefined;
+    var _worker_requests = {};
+    var _worker_next_id = 0;
+    /**
+     * The worker, or null if Web Workers cannot be used.
+     */
+    var get_worker = function () {
+        if (_worker !== undefined) {
+            return _worker;
+        }
+        try {
+            var url = URL.createObjectURL(new Blob([worker_source()], { type: 'application/javascript' }));
+            _worker = new Worker(url);
+        }
+        catch (e) {
+            console.warn('[notebook_model.js] Cannot create the conversion worker, converting on the main thread.', e);
+            _worker = null;
+            return _worker;
+        }
+        _worker.onmessage = function (event) {
+            var message = event.data;
+            var request = _worker_requests[message.id];
+            delete _worker_requests[message.id];
+            if (message.error !== undefined) {
+                request.reject(new Error(message.error));
+            }
+            else {
+                request.resolve(message.result);
+            }
+        };
+        _worker.onerror = function (event) {
+            // The worker could not start, or died: run the pending and the next
+            // conversions on the main thread.
+            console.warn('[notebook_model.js] Conversion worker failed, converting on the main thread.', event);
+            _worker = null;
+            var requests = _worker_requests;
+            _worker_requests = {};
+            Object.keys(requests).forEach(function (id) {
+                requests[id].fallback();
+            });
+        };
+        return _worker;
+    };
+    /**
+     * Runs `op` on `payload` in the worker, or calls `convert` on the main
+     * thread if there is no worker.
+     */
+    var convert_in_worker = function (op, payload, convert) {
+        var fallback = function () {
+            return new Promise(function (resolve, reject) {
+                resolve(convert(payload));
+            });
+        };
+        var worker = get_worker();
+        if (worker === null) {
+            return fallback();
+        }
+        return new Promise(function (resolve, reject) {
+            var id = _worker_next_id++;
+            _worker_requests[id] = {
+                resolve: resolve,
+                reject: reject,
+                fallback: function () { resolve(fallback()); }
+            };
+            worker.postMessage({ id: id, op: op, payload: payload });
+        });
+    };
+    /**
+     * Estimated size of the file contents of a notebook, from the length of
+     * its multiline strings, without serialising it.
+     */
+    var notebook_size = function (notebook) {
+        var size = 0;
+        var add = function (value) {
+            if (typeof (value) === 'string') {
+                size += value.length;
+            }
+            else if (Array.isArray(value)) {
+                for (var i = 0; i < value.length; i++) {
+                    add(value[i]);
+                }
+            }
+            else if (value && typeof (value) === 'object') {
+                for (var key in value) {
+                    add(value[key]);
+                }
+            }
+        };
+        (notebook['cells'] || []).forEach(function (cell) {
+            add(cell['source']);
+            (cell['outputs'] || []).forEach(function (output) {
+                add(output['data']);
+                add(output['text']);
+            });
+        });
+        return size;
+    };
+    /**
+     * Like `notebook_from_file_contents`, but in a Web Worker for contents
+     * larger than WORKER_THRESHOLD.
+     * @param {String} contents The contents of the file, as a string.
+     * @return {Promise} fullfilled with a JSON representation of the notebook.
+     */
+    exports.notebook_from_file_contents_async = function (contents) {
+        if (contents.length < exports.WORKER_THRESHOLD) {
+            return new Promise(function (resolve, reject) {
+                resolve(exports.notebook_from_file_contents(contents));
+            });
+        }
+        return convert_in_worker('load', contents, exports.notebook_from_file_contents);
+    };
+    /**
+     * Like `file_contents_from_notebook`, but in a Web Worker for notebooks
+     * larger than WORKER_THRESHOLD.
+     * @param {Object} notebook a JSON representation of the notebook.
+     * @return {Promise} fullfilled with the contents of the file.
+     */
+    exports.file_contents_from_notebook_async = function (notebook) {
+        if (typeof (notebook) == 'string' || notebook_size(notebook) < exports.WORKER_THRESHOLD) {
+            return new Promise(function (resolve, reject) {
+                resolve(exports.file_contents_from_notebook(notebook));
+            });
+        }
+        return convert_in_worker('dump', notebook, exports.file_contents_from_notebook);
+    };
     /**
      * Create a JSON representation of a new notebook
      * @param {string} name Notebook name
@@ -0,0 +1,71 @@
+"""Tornado handlers exposing the extra APIs of MixedContentsManager.
+
+Enable them as a server extension::
+
+    {"NotebookApp": {"nbserver_extensions": {"jupyterdrive.handlers": true}}}
+
+- `GET /api/jupyterdrive/metrics`: dispatch metrics in the Prometheus text
+  format (see `jupyterdrive.metrics`).
+- `POST /api/jupyterdrive/metadata` with `{"paths": [...]}`: metadata of
+  many paths in one round trip (see
+  `MixedContentsManager.get_metadata_batch`).
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+import json
+
+from tornado import gen, web
+from tornado.ioloop import IOLoop
+
+from .compat import JUPYTER, string_types
+
+if JUPYTER:
+    from notebook.base.handlers import APIHandler
+    from notebook.utils import url_path_join
+    from jupyter_client.jsonutil import date_default
+else:
+    from IPython.html.base.handlers import IPythonHandler as APIHandler
+    from IPython.html.utils import url_path_join
+    from IPython.utils.jsonutil import date_default
+
+
+class MetricsHandler(APIHandler):
+
+    @web.authenticated
+    def get(self):
+        metrics = getattr(self.contents_manager, 'dispatch_metrics', None)
+        if metrics is None:
+            raise web.HTTPError(404, 'No dispatch metrics, see '
+                                     'MixedContentsManager.instrument_dispatch')
+        self.set_header('Content-Type', 'text/plain; version=0.0.4')
+        self.finish(metrics.prometheus_text())
+
+
+class MetadataBatchHandler(APIHandler):
+
+    @web.authenticated
+    @gen.coroutine
+    def post(self):
+        cm = self.contents_manager
+        if not hasattr(cm, 'get_metadata_batch'):
+            raise web.HTTPError(404, 'Contents manager has no batch metadata')
+        try:
+            body = json.loads(self.request.body.decode('utf-8') or '{}')
+        except ValueError:
+            raise web.HTTPError(400, 'Invalid JSON in body of request')
+        paths = body.get('paths') if isinstance(body, dict) else None
+        if not isinstance(paths, list) or not all(isinstance(p, string_types) for p in paths):
+            raise web.HTTPError(400, 'Expected a list of paths')
+        results = yield IOLoop.current().run_in_executor(None, cm.get_metadata_batch, paths)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({'results': results}, default=date_default))
+
+
+def load_jupyter_server_extension(nbapp):
+    web_app = nbapp.web_app
+    base_url = web_app.settings['base_url']
+    web_app.add_handlers('.*$', [
+        (url_path_join(base_url, '/api/jupyterdrive/metrics'), MetricsHandler),
+        (url_path_join(base_url, '/api/jupyterdrive/metadata'), MetadataBatchHandler),
+    ])
@@ -0,0 +1,179 @@
+"""A metadata cache that can wrap any contents manager."""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+import time
+import threading
+from collections import OrderedDict
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def _parent(path):
+    return path.rsplit('/', 1)[0] if '/' in path else ''
+
+
+class MetadataCachingManager(object):
+    """Wrap a contents manager and memoise its metadata answers.
+
+    `dir_exists`, `file_exists`, `is_hidden` and `get(content=False)` are
+    cached for `ttl` seconds, keeping at most `maxsize` entries and evicting
+    the least recently used ones.  Every other attribute is forwarded to the
+    wrapped manager; the methods that modify contents drop the entries of the
+    paths they touch (and of their parents and children).
+
+    Enabled per mount point with the `cache` key of an entry of
+    `MixedContentsManager.filesystem_scheme`::
+
+        {'root': 'gdrive', 'contents': '...', 'cache': {'ttl': 10, 'maxsize': 1024}}
+
+    The wrapped manager must be synchronous: the answers of coroutine methods
+    are futures, which cannot be cached and are not done when the methods
+    that modify contents return.
+    """
+
+    def __init__(self, manager, ttl=5.0, maxsize=1024):
+        self.manager = manager
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped on invalidation, so that answers computed concurrently with
+        # a modification are not stored.
+        self._generation = 0
+
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
+
+    def stats(self):
+        """Hit, miss and eviction counters, and current size of the cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _cached(self, key, func, *args, **kwargs):
+        now = _clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                # move to the most recently used end.
+                del self._entries[key]
+                self._entries[key] = entry
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        value = func(*args, **kwargs)
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries.pop(key, None)
+            self._entries[key] = (now + self.ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, *paths):
+        """Drop the entries of the paths, of their children and of their parents"""
+        paths = set(path.strip('/') for path in paths)
+        if '' in paths:
+            self.clear()
+            return
+        parents = set(_parent(path) for path in paths)
+        prefixes = tuple(path + '/' for path in paths)
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                path = key[1]
+                if path in paths or path in parents or path.startswith(prefixes):
+                    del self._entries[key]
+
+    # cached metadata
+
+    def dir_exists(self, path):
+        return self._cached(('dir_exists', path.strip('/')), self.manager.dir_exists, path)
+
+    def file_exists(self, path=''):
+        return self._cached(('file_exists', path.strip('/')), self.manager.file_exists, path)
+
+    def is_hidden(self, path):
+        return self._cached(('is_hidden', path.strip('/')), self.manager.is_hidden, path)
+
+    def get(self, path, content=True, type=None, format=None):
+        if content:
+            return self.manager.get(path, content=content, type=type, format=format)
+        model = self._cached(('get', path.strip('/'), type, format),
+                             self.manager.get, path, content=False, type=type, format=format)
+        return dict(model)
+
+    # invalidating methods
+
+    def save(self, model, path):
+        try:
+            return self.manager.save(model, path)
+        finally:
+            self.invalidate(path)
+
+    def update(self, model, path):
+        try:
+            return self.manager.update(model, path)
+        finally:
+            self.invalidate(path, model.get('path', path))
+
+    def delete(self, path):
+        try:
+            return self.manager.delete(path)
+        finally:
+            self.invalidate(path)
+
+    def delete_file(self, path):
+        try:
+            return self.manager.delete_file(path)
+        finally:
+            self.invalidate(path)
+
+    def rename(self, old_path, new_path):
+        try:
+            return self.manager.rename(old_path, new_path)
+        finally:
+            self.invalidate(old_path, new_path)
+
+    def rename_file(self, old_path, new_path):
+        try:
+            return self.manager.rename_file(old_path, new_path)
+        finally:
+            self.invalidate(old_path, new_path)
+
+    def new(self, model=None, path=''):
+        try:
+            return self.manager.new(model, path)
+        finally:
+            self.invalidate(path)
+
+    def new_untitled(self, path='', type='', ext=''):
+        model = self.manager.new_untitled(path, type, ext)
+        self.invalidate(model['path'])
+        return model
+
+    def copy(self, from_path, to_path=None):
+        model = self.manager.copy(from_path, to_path)
+        self.invalidate(model['path'])
+        return model
+
+    def restore_checkpoint(self, checkpoint_id, path):
+        try:
+            return self.manager.restore_checkpoint(checkpoint_id, path)
+        finally:
+            self.invalidate(path)
@@ -0,0 +1,134 @@
+"""Call counts, errors and latency of the mounted contents managers.
+
+With `MixedContentsManager.instrument_dispatch` set, `MixedContentsManager`
+records every call it routes to a mounted contents manager in a
+`DispatchMetrics` instance (its `dispatch_metrics` attribute).
+
+They are served in the Prometheus text format on `/api/jupyterdrive/metrics`
+by the `jupyterdrive.handlers` server extension.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+import inspect
+import time
+from bisect import bisect_left
+
+from tornado import gen
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+#: upper bounds (in seconds) of the latency histogram buckets.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class DispatchMetrics(object):
+    """Per mount point and per method counters and latency histograms.
+
+    Counters are plain lists updated without locking: under the GIL a lost
+    increment is possible but rare, and recording a call costs about a
+    microsecond.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def _new_series(self, key):
+        # [count, errors, total seconds, bucket counts..., +Inf bucket]
+        series = self._series[key] = [0, 0, 0.0] + [0] * (len(self.buckets) + 1)
+        return series
+
+    def record(self, root, method, seconds, error=False):
+        """Record a call of `method` on the manager mounted at `root`"""
+        key = (root, method)
+        series = self._series.get(key) or self._new_series(key)
+        series[0] += 1
+        if error:
+            series[1] += 1
+        series[2] += seconds
+        series[3 + bisect_left(self.buckets, seconds)] += 1
+
+    def reset(self):
+        self._series = {}
+
+    def instrument(self, root, name, meth):
+        """Wrap a bound method so that its calls are recorded"""
+        record = self.record
+        if gen.is_coroutine_function(meth) or _iscoroutinefunction(meth):
+            def timed(*args, **kwargs):
+                start = _clock()
+                future = gen.convert_yielded(meth(*args, **kwargs))
+                future.add_done_callback(lambda f: record(
+                    root, name, _clock() - start,
+                    f.cancelled() or f.exception() is not None))
+                return future
+            # keep it recognisable as a coroutine by the async dispatch.
+            timed.__tornado_coroutine__ = True
+        else:
+            def timed(*args, **kwargs):
+                start = _clock()
+                try:
+                    result = meth(*args, **kwargs)
+                except BaseException:
+                    record(root, name, _clock() - start, True)
+                    raise
+                record(root, name, _clock() - start)
+                return result
+        timed.__name__ = name
+        timed.__doc__ = meth.__doc__
+        return timed
+
+    def snapshot(self):
+        """Copy of the metrics, as `{root: {method: stats}}`
+
+        where stats has `count`, `errors`, `seconds` (total) and `buckets`, a
+        list of `(upper bound, cumulative count)`.
+        """
+        result = {}
+        for (root, method), series in list(self._series.items()):
+            cumulative = []
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[3:]):
+                total += count
+                cumulative.append((bound, total))
+            result.setdefault(root, {})[method] = {
+                'count': series[0],
+                'errors': series[1],
+                'seconds': series[2],
+                'buckets': cumulative,
+            }
+        return result
+
+    def prometheus_text(self):
+        """The metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        latency = [
+            '# HELP jupyterdrive_dispatch_seconds Latency of the calls to mounted contents managers.',
+            '# TYPE jupyterdrive_dispatch_seconds histogram',
+        ]
+        errors = [
+            '# HELP jupyterdrive_dispatch_errors_total Calls to mounted contents managers that raised.',
+            '# TYPE jupyterdrive_dispatch_errors_total counter',
+        ]
+        for root in sorted(snapshot):
+            for method in sorted(snapshot[root]):
+                stats = snapshot[root][method]
+                labels = 'mount="{}",method="{}"'.format(_escape(root), method)
+                for bound, count in stats['buckets']:
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    latency.append('jupyterdrive_dispatch_seconds_bucket{%s,le="%s"} %d'
+                                   % (labels, le, count))
+                latency.append('jupyterdrive_dispatch_seconds_sum{%s} %r' % (labels, stats['seconds']))
+                latency.append('jupyterdrive_dispatch_seconds_count{%s} %d' % (labels, stats['count']))
+                errors.append('jupyterdrive_dispatch_errors_total{%s} %d' % (labels, stats['errors']))
+        return '\n'.join(latency + errors) + '\n'
+
+
+def _iscoroutinefunction(func):
+    return getattr(inspect, 'iscoroutinefunction', lambda f: False)(func)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
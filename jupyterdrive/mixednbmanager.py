@@ -2,34 +2,203 @@
 
 # Copyright (c) IPython Development Team.
 # Distributed under the terms of the Modified BSD License.
-from .compat import JUPYTER
+import base64
+import inspect
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import timedelta
+
+from tornado import gen
+from tornado.ioloop import PeriodicCallback
+from tornado.web import HTTPError
+
+from .checkpointstore import ContentAddressedCheckpoints, MountCheckpoints
+from .compat import JUPYTER, string_types
+from .metadatacache import MetadataCachingManager
+from .metrics import DispatchMetrics
 
 if JUPYTER:
+    from notebook.services.contents.checkpoints import Checkpoints
     from notebook.services.contents.manager import ContentsManager
     from notebook.services.contents.filemanager import FileContentsManager
-    from traitlets.traitlets import List
-    from traitlets import import_item
+    from notebook.services.contents.largefilemanager import LargeFileManager
+    from traitlets.traitlets import List, Integer, Float, Bool, Unicode
+    from traitlets import TraitError, default, import_item, observe, validate
 else:
+    from IPython.html.services.contents.checkpoints import Checkpoints
     from IPython.html.services.contents.manager import ContentsManager
     from IPython.html.services.contents.filemanager import FileContentsManager
-    from IPython.utils.traitlets import List
+    from IPython.utils.traitlets import List, Integer, Float, Bool, Unicode, TraitError
     from IPython.utils.importstring import import_item
+    # no chunked saves before Jupyter
+    LargeFileManager = None
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 #make pyflakes happy
 FileContentsManager
 
-def _split_path(path):
-    """split a path return by the api
 
-    return
-        - the sentinel:
-        - the rest of the path as a list.
-        - the original path stripped of / for normalisation.
+class LazyManagers(Mapping):
+    """Mapping of mount point to contents manager, built on first access.
+
+    Each manager is created by calling its factory the first time it is
+    looked up; concurrent lookups of the same mount point wait for a single
+    construction.
+    """
+
+    def __init__(self, factories, loaded=None):
+        self._factories = dict(factories)
+        self._managers = dict(loaded or {})
+        self._locks = dict((root, threading.Lock()) for root in self._factories)
+
+    def __getitem__(self, root):
+        try:
+            return self._managers[root]
+        except KeyError:
+            pass
+        with self._locks[root]:
+            if root not in self._managers:
+                self._managers[root] = self._factories[root]()
+        return self._managers[root]
+
+    def __contains__(self, root):
+        return root in self._factories
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+    def loaded(self):
+        """The managers that have already been created"""
+        return dict(self._managers)
+
+
+class MountRouter(object):
+    """Resolve paths of the virtual filesystem to mounted contents managers.
+
+    The routing table is built once from a mapping of mount point (without
+    leading or trailing slash) to manager; only the mount points are read, so
+    the mapping can create its managers lazily.  Mount points may be nested
+    (eg: ``team/shared``), in which case the longest matching prefix wins.
+    Bound methods are looked up once per manager and cached, so resolving a
+    call costs a prefix partition and a couple of dictionary lookups.  When
+    given a `DispatchMetrics`, the cached methods record their calls in it.
+    The callers count the calls they route (see `in_flight`), so that the
+    managers of a router that was replaced can be closed once it is idle.
     """
-    path = path.strip('/')
-    list_path = path.split('/')
-    sentinel = list_path.pop(0)
-    return sentinel, list_path, path
+
+    def __init__(self, managers, metrics=None):
+        self.managers = managers
+        self.metrics = metrics
+        self._methods = dict((root, {}) for root in self.managers)
+        # calls routed by the callers, started and finished.
+        self._started = itertools.count()
+        self._finished = itertools.count()
+        # nested mount points, grouped by first path component, deepest first.
+        self._nested = {}
+        for root in sorted(self.managers, key=len, reverse=True):
+            if '/' in root:
+                head = root.partition('/')[0]
+                self._nested.setdefault(head, []).append((root, root + '/'))
+        # all strict prefixes of the mount points are virtual directories,
+        # map them to the names of their children.
+        self.virtual_dirs = {'': set()}
+        for root in self.managers:
+            parts = root.split('/')
+            for i in range(len(parts)):
+                parent = '/'.join(parts[:i])
+                self.virtual_dirs.setdefault(parent, set()).add(parts[i])
+
+    def resolve(self, path):
+        """Find the mount point for a path
+
+        return
+            - the mount point, or None if the path is not in a mount.
+            - the path relative to the mount point, or the normalised path
+              when not in a mount.
+        """
+        path = path.strip('/')
+        head, _, sub_path = path.partition('/')
+        nested = self._nested.get(head)
+        if nested is not None:
+            for root, prefix in nested:
+                if path.startswith(prefix):
+                    return root, path[len(prefix):]
+                if path == root:
+                    return root, ''
+        if head in self.managers:
+            return head, sub_path
+        return None, path
+
+    def method(self, root, name):
+        """Bound method `name` of the manager mounted at `root`"""
+        methods = self._methods[root]
+        meth = methods.get(name)
+        if meth is None:
+            meth = getattr(self.managers[root], name)
+            if self.metrics is not None:
+                meth = self.metrics.instrument(root, name, meth)
+            methods[name] = meth
+        return meth
+
+    def enter(self):
+        """Count a call to the managers of this router, until `leave`"""
+        next(self._started)
+
+    def leave(self):
+        next(self._finished)
+
+    @contextmanager
+    def calling(self):
+        """Count a block calling the managers of this router"""
+        next(self._started)
+        try:
+            yield
+        finally:
+            next(self._finished)
+
+    def leave_when_done(self, future):
+        """Count a call entered before `future` was created until it is done"""
+        future = gen.convert_yielded(future)
+        future.add_done_callback(lambda f: next(self._finished))
+        return future
+
+    def in_flight(self):
+        """Number of calls running on the managers of this router
+
+        Calls starting while counting may be included, never calls still
+        running left out.
+        """
+        # reading a count also increments it: read the finished calls first,
+        # so that a call finishing in between is counted as running.
+        done = next(self._finished)
+        return next(self._started) - done
+
+    def route(self, name, path):
+        """Resolve `path` to a bound method of its manager
+
+        return
+            - the bound method `name` of the manager mounted at the path, or
+              None if the path is not in a mount.
+            - the path relative to the mount point (or the normalised path).
+        """
+        root, sub_path = self.resolve(path)
+        if root is None:
+            return None, sub_path
+        return self.method(root, name), sub_path
 
 
 class MixedContentsManager(ContentsManager):
@@ -46,55 +215,317 @@ class MixedContentsManager(ContentsManager):
         ],
     help="""
     List of virtual mount point name and corresponding contents manager
+
+    An entry can also set `cache` to `True` or to a dict with `ttl` and
+    `maxsize` keys to cache the metadata answers of its contents manager
+    (see `jupyterdrive.metadatacache.MetadataCachingManager`); the cache
+    only wraps synchronous contents managers.
     """, config=True)
 
+    transfer_chunk_size = Integer(8 * 1024 * 1024, config=True,
+    help="""
+    Size in bytes of the chunks used to stream files between mount points
+    on copy and rename across contents managers.
+    """)
+
+    root_listing_timeout = Float(2.0, config=True,
+    help="""
+    Time in seconds to wait for the mounted contents managers when listing
+    the virtual root. Mount points that do not answer in time are listed
+    without their metadata.
+    """)
+
+    root_listing_inline = Bool(False, config=True,
+    help="""
+    Include the first level content of each mount point when listing the
+    virtual root.
+    """)
+
+    lazy_managers = Bool(True, config=True,
+    help="""
+    Import and create the contents manager of each mount point the first
+    time it is used, instead of at startup.
+    """)
+
+    metadata_workers = Integer(8, config=True,
+    help="""
+    Number of threads querying mounted contents managers concurrently, for
+    the virtual root listing and batched metadata checks.
+    """)
+
+    instrument_dispatch = Bool(False, config=True,
+    help="""
+    Record call counts, errors and latency of the calls to each mounted
+    contents manager in `dispatch_metrics`.  This roughly doubles the cost of
+    dispatching a call.
+    """)
+
+    scheme_config_file = Unicode('', config=True,
+    help="""
+    Path of a JSON config file (eg: the jupyter_notebook_config.json written
+    by `python -m jupyterdrive`) to watch for changes of
+    `MixedContentsManager.filesystem_scheme`.  Empty to disable.
+    """)
+
+    scheme_poll_interval = Float(5.0, config=True,
+    help="""
+    Time in seconds between two checks of `scheme_config_file`.
+    """)
+
+    unmount_timeout = Float(30.0, config=True,
+    help="""
+    Time in seconds to wait for the calls running on the contents manager of
+    a removed mount point before closing it.
+    """)
+
+    shared_checkpoints = Bool(False, config=True,
+    help="""
+    Replace the checkpoints of the mounted contents managers by views of
+    `checkpoints`, one store shared by all the mount points.  Its
+    `checkpoints_class` then defaults to
+    `jupyterdrive.checkpointstore.ContentAddressedCheckpoints`, which
+    deduplicates checkpoints across files and mount points, at the cost of
+    slower checkpoint creation.  Managers that do not keep their checkpoints
+    in a `checkpoints` attribute are not affected.
+    """)
+
+    def _shared_checkpoints_class(self):
+        return ContentAddressedCheckpoints if self.shared_checkpoints else Checkpoints
+
+    if JUPYTER:
+        @default('checkpoints_class')
+        def _default_checkpoints_class(self):
+            return self._shared_checkpoints_class()
+    else:
+        _checkpoints_class_default = _shared_checkpoints_class
+
+    # set once the first scheme is loaded, see _validate_filesystem_scheme.
+    _router = None
+
     def __init__(self, **kwargs):
 
         super(MixedContentsManager, self).__init__(**kwargs)
-        self.managers = {}
-
-        ## check consistency of scheme.
-        if not len(set(map(lambda x:x['root'], self.filesystem_scheme))) == len(self.filesystem_scheme):
-            raise ValueError('Scheme should not mount two contents manager on the same mountpoint')
 
         kwargs.update({'parent':self})
-        for scheme in self.filesystem_scheme:
+        self._manager_kwargs = kwargs
+        self._scheme = {}
+        self._next_router = None
+        self._executor = None
+        self._reload_lock = threading.Lock()
+        # root listings of the mount points: still running, and last results.
+        self._mount_listings = {}
+        self._last_mount_listings = {}
+        self._listings_lock = threading.Lock()
+        self.dispatch_metrics = DispatchMetrics() if self.instrument_dispatch else None
+        self._swap_router(*self._build_router(self.filesystem_scheme))
+
+        if not JUPYTER:
+            self.on_trait_change(lambda name, new: self._swap_router(*self._build_router(new)),
+                                 'filesystem_scheme')
+
+        self._scheme_poller = None
+        self._scheme_file_mtime = None
+        if self.scheme_config_file:
+            self._check_scheme_file()
+            self._scheme_poller = _scheme_file_poller(self)
+            self._scheme_poller.start()
+
+    @property
+    def managers(self):
+        """Mapping of mount point to contents manager"""
+        return self._router.managers
+
+    if JUPYTER:
+        @validate('filesystem_scheme')
+        def _validate_filesystem_scheme(self, proposal):
+            # a scheme is only accepted once its router is built, the observer
+            # swaps it in.
+            scheme = proposal['value']
+            if self._router is None:
+                _scheme_roots(scheme)
+            elif scheme != self.filesystem_scheme:
+                self._next_router = self._build_router(scheme)
+            return scheme
+
+        @observe('filesystem_scheme')
+        def _on_filesystem_scheme(self, change):
+            if self._router is not None and self._next_router is not None:
+                next_router, self._next_router = self._next_router, None
+                self._swap_router(*next_router)
+
+    def _build_router(self, filesystem_scheme):
+        """Build a router for filesystem_scheme, without swapping it in.
+
+        The managers of mount points whose entry did not change are kept.
+        Raise TraitError or ValueError for an invalid scheme (see `_scheme_roots`).
+
+        Returns the scheme by mount point, and the router.
+        """
+        roots = _scheme_roots(filesystem_scheme)
+        scheme = dict(zip(roots, filesystem_scheme))
+        loaded = {}
+        if self._router is not None:
+            previous = self._router.managers.loaded()
+            for root, entry in scheme.items():
+                if root in previous and self._scheme.get(root) == entry:
+                    loaded[root] = previous[root]
+        managers = LazyManagers(
+            ((root, self._manager_factory(entry, self._manager_kwargs,
+                                          self._mount_checkpoints(root)))
+             for root, entry in scheme.items()), loaded)
+        if not self.lazy_managers:
+            for root in managers:
+                # looking a manager up creates it.
+                managers[root]
+        return scheme, MountRouter(managers, self.dispatch_metrics)
+
+    def _swap_router(self, scheme, router):
+        """Swap a router built by `_build_router` in.
+
+        The swap is a single assignment: calls that already resolved a
+        manager of a removed mount point run to completion against it, new
+        calls only see the new mount points.  Removed managers are closed
+        once their calls are done.
+        """
+        with self._reload_lock:
+            if self._executor is None or self._executor_size < len(router.managers):
+                old_executor = self._executor
+                self._executor_size = max(self.metadata_workers, len(router.managers))
+                self._executor = ThreadPoolExecutor(max_workers=self._executor_size)
+                if old_executor is not None:
+                    old_executor.shutdown(wait=False)
+            removed = set(self._scheme) - set(scheme)
+            old_router = self._router
+            self._scheme = dict((root, dict(entry)) for root, entry in scheme.items())
+            self._router = router
+
+        if removed:
+            self.log.info('Unmounted %s', ', '.join(sorted(removed)))
+        if old_router is not None:
+            thread = threading.Thread(target=self._close_retired, args=(old_router, router))
+            thread.daemon = True
+            thread.start()
+
+    def _close_retired(self, old_router, router):
+        """Close the managers of a replaced router that the new one does not
+        keep, once the calls running on them are done.
+        """
+        deadline = time.time() + self.unmount_timeout
+        while old_router.in_flight() and time.time() < deadline:
+            time.sleep(0.05)
+        kept = router.managers.loaded()
+        retired = dict((root, manager) for root, manager in old_router.managers.loaded().items()
+                       if kept.get(root) is not manager)
+        if retired and old_router.in_flight():
+            self.log.warning('Closing the managers of %s with calls still running',
+                             ', '.join(sorted(retired)))
+        for manager in retired.values():
+            _close_manager(manager, self.log)
+
+    def close(self):
+        """Stop watching scheme_config_file and close the mounted managers"""
+        if self._scheme_poller is not None:
+            self._scheme_poller.stop()
+            self._scheme_poller = None
+        for manager in self.managers.loaded().values():
+            _close_manager(manager, self.log)
+        self._executor.shutdown(wait=False)
+
+    def _check_scheme_file(self):
+        """Reload filesystem_scheme if scheme_config_file changed"""
+        try:
+            mtime = os.stat(self.scheme_config_file).st_mtime
+        except OSError:
+            return
+        if mtime == self._scheme_file_mtime:
+            return
+        self._scheme_file_mtime = mtime
+        try:
+            with io.open(self.scheme_config_file, encoding='utf-8') as f:
+                config = json.load(f)
+            scheme = config['MixedContentsManager']['filesystem_scheme']
+        except (ValueError, KeyError, IOError):
+            self.log.warning('Could not read filesystem_scheme from %s',
+                             self.scheme_config_file, exc_info=True)
+            return
+        if scheme != list(self.filesystem_scheme):
+            self.log.info('Reloading filesystem_scheme from %s', self.scheme_config_file)
+            try:
+                self.filesystem_scheme = scheme
+            except (ValueError, TraitError):
+                self.log.error('Invalid filesystem_scheme in %s',
+                               self.scheme_config_file, exc_info=True)
+
+    def _mount_checkpoints(self, root):
+        """Factory of the view of the shared checkpoints for a mount point"""
+        if not self.shared_checkpoints:
+            return None
+        return lambda: MountCheckpoints(self.checkpoints, root)
+
+    @staticmethod
+    def _manager_factory(scheme, kwargs, checkpoints=None):
+        def factory():
             manager_class = import_item(scheme['contents'])
-            self.managers[scheme['root']] = manager_class(**kwargs)
+            cache = scheme.get('cache')
+            if cache and (_is_coroutine_function(manager_class.get) or
+                          _is_coroutine_function(manager_class.save)):
+                raise ValueError('Cannot cache the metadata of mount point %r: '
+                                 '%s is not synchronous' % (scheme['root'], scheme['contents']))
+            manager = manager_class(**kwargs)
+            if checkpoints is not None and hasattr(manager, 'checkpoints'):
+                manager.checkpoints = checkpoints()
+            if cache:
+                manager = MetadataCachingManager(manager,
+                    **(cache if isinstance(cache, dict) else {}))
+            return manager
+        return factory
 
+    def cache_stats(self):
+        """Metadata cache counters of the mount points that have a cache"""
+        return dict((root, man.stats()) for root, man in self.managers.loaded().items()
+                    if isinstance(man, MetadataCachingManager))
 
     def path_dispatch1(method):
+        name = method.__name__
         def _wrapper_method(self, path, *args, **kwargs):
-            sentinel, _path, path =  _split_path(path);
-            man = self.managers.get(sentinel, None)
-            if man is not None:
-                meth = getattr(man, method.__name__)
-                sub = meth('/'.join(_path), *args, **kwargs)
-                return sub
+            router = self._router
+            meth, path = router.route(name, path)
+            if meth is not None:
+                router.enter()
+                try:
+                    return meth(path, *args, **kwargs)
+                finally:
+                    router.leave()
             else :
                 return method(self, path, *args, **kwargs)
         return _wrapper_method
 
     def path_dispatch2(method):
+        name = method.__name__
         def _wrapper_method(self, other, path, *args, **kwargs):
-            sentinel, _path, path =  _split_path(path);
-            man = self.managers.get(sentinel, None)
-            if man is not None:
-                meth = getattr(man, method.__name__)
-                sub = meth(other, '/'.join(_path), *args, **kwargs)
-                return sub
+            router = self._router
+            meth, path = router.route(name, path)
+            if meth is not None:
+                router.enter()
+                try:
+                    return meth(other, path, *args, **kwargs)
+                finally:
+                    router.leave()
             else :
                 return method(self, other, path, *args, **kwargs)
         return _wrapper_method
 
     def path_dispatch_kwarg(method):
+        name = method.__name__
         def _wrapper_method(self, path=''):
-            sentinel, _path, path =  _split_path(path);
-            man = self.managers.get(sentinel, None)
-            if man is not None:
-                meth = getattr(man, method.__name__)
-                sub = meth(path='/'.join(_path))
-                return sub
+            router = self._router
+            meth, path = router.route(name, path)
+            if meth is not None:
+                router.enter()
+                try:
+                    return meth(path=path)
+                finally:
+                    router.leave()
             else :
                 return method(self, path=path)
         return _wrapper_method
@@ -104,35 +535,34 @@ class MixedContentsManager(ContentsManager):
 
     @path_dispatch1
     def dir_exists(self, path):
-        ## root exists
-        if len(path) == 0:
-            return True
-        if path in self.managers.keys():
+        ## root and parents of nested mount points exist
+        if path in self._router.virtual_dirs:
             return True
         return False
 
     @path_dispatch1
     def is_hidden(self, path):
-        if (len(path) == 0) or path in self.managers.keys():
+        if path in self._router.virtual_dirs:
             return False;
         raise NotImplementedError('....'+path)
 
     @path_dispatch_kwarg
     def file_exists(self, path=''):
-        if len(path) == 0:
+        if path in self._router.virtual_dirs:
             return False
         raise NotImplementedError('NotImplementedError')
 
     @path_dispatch1
     def exists(self, path):
-        if len(path) == 0:
+        if path in self._router.virtual_dirs:
             return True
         raise NotImplementedError('NotImplementedError')
 
     @path_dispatch1
-    def get(self, path, **kwargs):
-        if len(path) == 0:
-            return [ {'type':'directory'}]
+    def get(self, path, content=True, type=None, format=None):
+        router = self._router
+        if path in router.virtual_dirs:
+            return self._virtual_dir_model(path, content, router)
         raise NotImplementedError('NotImplementedError')
 
     @path_dispatch2
@@ -140,21 +570,43 @@ class MixedContentsManager(ContentsManager):
         raise NotImplementedError('NotImplementedError')
 
     def update(self, model, path):
-        sentinel, listpath, path = _split_path(path)
-        m_sentinel, m_listpath, orig_path =  _split_path(model['path'])
-        if sentinel != m_sentinel:
-            raise ValueError('Does not know how to move model across mountpoints')
-
-        model['path'] = '/'.join(m_listpath)
-
-        man = self.managers.get(sentinel, None)
-        if man is not None:
-            meth = getattr(man, 'update')
-            sub = meth(model, '/'.join(listpath))
-            return sub
+        router = self._router
+        root, path = router.resolve(path)
+        m_root, m_path = router.resolve(model['path'])
+        if root != m_root:
+            with router.calling():
+                self._transfer(router, root, path, m_root, m_path, move=True)
+                return router.method(m_root, 'get')(m_path, content=False)
+
+        model['path'] = m_path
+
+        if root is not None:
+            with router.calling():
+                return router.method(root, 'update')(model, path)
         else :
-            return self.method(model, path)
+            raise NotImplementedError('NotImplementedError')
 
+    def copy(self, from_path, to_path=None):
+        """Copy a file, possibly to another mount point."""
+        router = self._router
+        from_root, from_path = router.resolve(from_path)
+        if to_path is None:
+            to_root = from_root
+        else:
+            to_root, to_path = router.resolve(to_path)
+
+        if from_root is None or to_root is None:
+            raise ValueError('Cannot copy from or to the root of the mixed contents')
+        with router.calling():
+            if from_root == to_root:
+                return router.method(from_root, 'copy')(from_path, to_path)
+
+            to_man = router.managers[to_root]
+            if to_man.dir_exists(to_path):
+                from_name = from_path.rsplit('/', 1)[-1]
+                to_name = to_man.increment_filename(from_name, to_path, insert='-Copy')
+                to_path = '/'.join(p for p in (to_path, to_name) if p)
+            return self._transfer(router, from_root, from_path, to_root, to_path)
 
     @path_dispatch1
     def delete(self, path):
@@ -187,24 +639,24 @@ class MixedContentsManager(ContentsManager):
         """
         decorator for rename-like function, that need dispatch on 2 arguments
         """
+        name = rename_like_method.__name__
 
         def _wrapper_method(self, old_path, new_path):
-            old_path, _old_path, old_sentinel =  _split_path(old_path);
-            new_path, _new_path, new_sentinel =  _split_path(new_path);
-
-            if old_sentinel != new_sentinel:
-                raise ValueError('Does not know how to move things across contents manager mountpoints')
-            else:
-                sentinel = new_sentinel
+            router = self._router
+            old_root, old_path = router.resolve(old_path)
+            new_root, new_path = router.resolve(new_path)
 
+            if old_root != new_root:
+                with router.calling():
+                    return self._transfer(router, old_root, old_path, new_root, new_path,
+                                          move=True)
 
-            man = self.managers.get(sentinel, None)
-            if man is not None:
-                rename_meth = getattr(man, rename_like_method.__name__)
-                sub = rename_meth('/'.join(_old_path), '/'.join(_new_path))
-                return sub
+            if new_root is not None:
+                rename_meth = router.method(new_root, name)
+                with router.calling():
+                    return rename_meth(old_path, new_path)
             else :
-                return rename_meth(self, old_path, new_path)
+                return rename_like_method(self, old_path, new_path)
         return _wrapper_method
 
     @path_dispatch_rename
@@ -218,3 +670,715 @@ class MixedContentsManager(ContentsManager):
         """Rename a file."""
         raise NotImplementedError('must be implemented in a subclass')
 
+
+    # Batched metadata checks.
+
+    def get_metadata_batch(self, paths):
+        """Metadata of many paths at once.
+
+        Paths are grouped by mount point.  A mounted manager that has a
+        `get_metadata_batch` method gets one call per group; otherwise its
+        paths are checked in parallel with `get(path, content=False)`.
+
+        Returns a list in the order of `paths` of dicts with keys:
+            - path: the path as given.
+            - exists: whether there is a file or directory at path.
+            - model: its model without content, or None.
+            - error: (only when the check failed) the error message.
+
+        Raises TypeError if one of the paths is not a string.
+        """
+        for path in paths:
+            if not isinstance(path, string_types):
+                raise TypeError('Paths should be strings, not %r' % (path,))
+        router = self._router
+        results = [None] * len(paths)
+        groups = {}
+        for index, path in enumerate(paths):
+            root, sub_path = router.resolve(path)
+            if root is None:
+                if sub_path in router.virtual_dirs:
+                    model = self._virtual_dir_model(sub_path, content=False)
+                    results[index] = {'path': path, 'exists': True, 'model': model}
+                else:
+                    results[index] = {'path': path, 'exists': False, 'model': None}
+                continue
+            groups.setdefault(root, []).append((index, sub_path))
+
+        with router.calling():
+            executor = self._executor
+            pending = {}
+            for root, group in groups.items():
+                if hasattr(router.managers[root], 'get_metadata_batch'):
+                    batch = router.method(root, 'get_metadata_batch')
+                    future = executor.submit(batch, [sub_path for _, sub_path in group])
+                    pending[future] = [index for index, _ in group]
+                else:
+                    get = router.method(root, 'get')
+                    for index, sub_path in group:
+                        future = executor.submit(_metadata_of, get, sub_path)
+                        pending[future] = index
+
+            for future, index in pending.items():
+                if isinstance(index, list):
+                    for i, result in zip(index, future.result()):
+                        results[i] = dict(result, path=paths[i])
+                else:
+                    results[index] = dict(future.result(), path=paths[index])
+        return results
+
+    # Virtual directories (root and parents of nested mount points).
+
+    def _virtual_dir_model(self, path, content=True, router=None):
+        """Directory model of a virtual directory of `router` (by default the
+        current one).
+
+        The mount points are queried concurrently for their metadata, waiting
+        at most `root_listing_timeout` seconds for all of them.  A mount point
+        that is still busy with a previous listing is not queried again; it
+        is listed with the metadata of its last answer, if any.
+        """
+        model = _virtual_dir_entry(path)
+        if not content:
+            return model
+
+        router = router or self._router
+        children = self._virtual_dir_children(router, path)
+        pending = {}
+        busy = []
+        for child in children:
+            if child['path'] in router.managers:
+                future = self._submit_mount_listing(router, child['path'])
+                if future is None:
+                    busy.append(child)
+                else:
+                    pending[future] = child
+
+        done, not_done = wait(pending, timeout=self.root_listing_timeout)
+        for future in not_done:
+            # a running call cannot be cancelled, later listings skip the
+            # mount point until it returns.
+            self.log.warning('Listing mount point %s timed out', pending[future]['path'])
+            busy.append(pending[future])
+        for future in done:
+            child = pending[future]
+            try:
+                sub = future.result()
+            except Exception:
+                self.log.warning('Listing mount point %s failed', child['path'], exc_info=True)
+                continue
+            self._fill_mount_child(child, sub)
+        self._finish_virtual_dir(model, children, busy)
+        return model
+
+    @staticmethod
+    def _virtual_dir_children(router, path):
+        """Entries of the children of a virtual directory of `router`"""
+        return [_virtual_dir_entry('/'.join(p for p in (path, name) if p))
+                for name in sorted(router.virtual_dirs[path])]
+
+    def _finish_virtual_dir(self, model, children, busy):
+        """Set the content of a virtual directory model to its children.
+
+        The `busy` mount points get the metadata of their last listing.
+        """
+        for child in busy:
+            sub = self._last_mount_listings.get(child['path'])
+            if sub is not None:
+                self._fill_mount_child(child, sub)
+        dates = [c['last_modified'] for c in children if c['last_modified'] is not None]
+        if dates:
+            model['last_modified'] = model['created'] = max(dates)
+        model['content'] = children
+        model['format'] = 'json'
+
+    def _fill_mount_child(self, child, sub):
+        """Copy the metadata of a mount point's root model to its entry"""
+        for key in ('created', 'last_modified', 'writable'):
+            child[key] = sub.get(key, child[key])
+        if self.root_listing_inline and isinstance(sub.get('content'), list):
+            child['content'] = [dict(item, path='/'.join((child['path'], item['path'])))
+                                for item in sub['content']]
+            child['format'] = 'json'
+
+    def _submit_mount_listing(self, router, root):
+        """Start listing the root of a mount point of `router` on the executor.
+
+        Returns the future of the listing, or None if a previous listing of
+        the mount point is still running.
+        """
+        with self._listings_lock:
+            if root in self._mount_listings:
+                return None
+            router.enter()
+            future = self._executor.submit(self._get_mount_root, router, root)
+            self._mount_listings[root] = future
+        def done(future):
+            router.leave()
+            self._mount_listing_done(root, future)
+        future.add_done_callback(done)
+        return future
+
+    def _mount_listing_done(self, root, future):
+        with self._listings_lock:
+            del self._mount_listings[root]
+        if future.exception() is None:
+            self._last_mount_listings[root] = future.result()
+
+    def _get_mount_root(self, router, root):
+        return router.method(root, 'get')('', content=self.root_listing_inline)
+
+    # Transfer across mount points.
+
+    def _transfer(self, router, from_root, from_path, to_root, to_path, move=False):
+        """Copy (or move) a file or directory between two mount points of `router`.
+
+        Files are streamed in chunks of `transfer_chunk_size` when the
+        destination accepts chunked saves.  If anything fails, whatever was
+        written on the destination is removed again before re-raising.
+        """
+        if from_root is None or to_root is None:
+            raise ValueError('Cannot move things to or from the root of the mixed contents')
+        from_man = router.managers[from_root]
+        to_man = router.managers[to_root]
+        created = []
+        # with shared checkpoints, moved files keep theirs.
+        moved_checkpoints = None
+        try:
+            model = self._transfer_model(from_man, from_path, to_man, to_path, created)
+            if move:
+                if self.shared_checkpoints:
+                    moved_checkpoints = ('/'.join(p for p in (from_root, from_path) if p),
+                                         '/'.join(p for p in (to_root, to_path) if p))
+                    self.checkpoints.rename_all_checkpoints(*moved_checkpoints)
+                from_man.delete(from_path)
+        except Exception:
+            if moved_checkpoints is not None:
+                self.checkpoints.rename_all_checkpoints(*reversed(moved_checkpoints))
+            for path in reversed(created):
+                try:
+                    to_man.delete(path)
+                except Exception:
+                    self.log.warning('Could not roll back transfer of %s',
+                                     path, exc_info=True)
+            raise
+        return model
+
+    def _transfer_model(self, from_man, from_path, to_man, to_path, created):
+        kind = from_man.get(from_path, content=False)['type']
+        if kind == 'directory':
+            model = to_man.save({'type': 'directory'}, to_path)
+            created.append(to_path)
+            listing = from_man.get(from_path, content=True)['content']
+            for child in listing:
+                name = child['name']
+                self._transfer_model(from_man, '/'.join(p for p in (from_path, name) if p),
+                                     to_man, '/'.join(p for p in (to_path, name) if p),
+                                     created)
+            return model
+        if kind == 'notebook':
+            model = from_man.get(from_path, content=True, type='notebook')
+            model = to_man.save(self._content_model(model), to_path)
+            created.append(to_path)
+            return model
+        return self._transfer_file(from_man, from_path, to_man, to_path, created)
+
+    def _transfer_file(self, from_man, from_path, to_man, to_path, created):
+        chunks = self._read_chunks(from_man, from_path)
+        first = next(chunks, '')
+        second = next(chunks, None)
+        model = {'type': 'file', 'format': 'base64', 'content': first}
+        if second is None or not _supports_chunks(to_man):
+            if second is not None:
+                model['content'] = ''.join([first, second] + list(chunks))
+            model = to_man.save(model, to_path)
+            created.append(to_path)
+            return model
+
+        model['chunk'] = 1
+        model = to_man.save(model, to_path)
+        created.append(to_path)
+        index, content = 2, second
+        for following in chunks:
+            to_man.save({'type': 'file', 'format': 'base64',
+                         'content': content, 'chunk': index}, to_path)
+            index, content = index + 1, following
+        return to_man.save({'type': 'file', 'format': 'base64',
+                            'content': content, 'chunk': -1}, to_path)
+
+    def _read_chunks(self, man, path):
+        """Yield the content of a file as independently decodable base64 chunks."""
+        size = self.transfer_chunk_size
+        get_os_path = getattr(man, '_get_os_path', None)
+        if get_os_path is not None:
+            with io.open(get_os_path(path), 'rb') as f:
+                while True:
+                    data = f.read(size)
+                    if not data:
+                        break
+                    yield base64.b64encode(data).decode('ascii')
+            return
+        content = man.get(path, content=True, type='file', format='base64')['content']
+        for chunk in _base64_chunks(content, size):
+            yield chunk
+
+    @staticmethod
+    def _content_model(model):
+        return dict((key, model[key]) for key in ('type', 'format', 'content'))
+
+
+class AsyncMixedContentsManager(MixedContentsManager):
+    """A mixed contents manager that does not block the IOLoop.
+
+    The methods that read or write contents return futures, which the
+    notebook handlers wait for: coroutine methods of the mounted managers are
+    called directly, so slow I/O bound mount points run concurrently, and
+    synchronous ones are run on a bounded thread pool instead of the IOLoop.
+
+    The metadata checks (`dir_exists`, `file_exists`, `is_hidden`, `exists`
+    and `get(content=False)`) stay synchronous, as some of the notebook page
+    handlers call them directly.  The `ContentsManager` helpers built on the
+    asynchronous methods (`new`, `new_untitled` and `trust_notebook`) are
+    coroutines, and so are the transfers across mount points and the
+    listings of the virtual directories, which wait for each call to the
+    mounted managers in the same way.
+    """
+
+    executor_workers = Integer(8, config=True,
+    help="""
+    Number of threads running the calls to synchronous contents managers.
+    """)
+
+    def __init__(self, **kwargs):
+        super(AsyncMixedContentsManager, self).__init__(**kwargs)
+        self._io_executor = ThreadPoolExecutor(max_workers=self.executor_workers)
+
+    def _manager_factory(self, scheme, kwargs, checkpoints=None):
+        factory = MixedContentsManager._manager_factory(scheme, kwargs, checkpoints)
+        def threaded_factory():
+            manager = factory()
+            # synchronous managers sign and check notebooks on the executor.
+            notary = getattr(manager, 'notary', None)
+            if getattr(notary, 'store_factory', None) is not None:
+                notary.store.close()
+                notary.store = _ThreadLocalSignatureStore(notary.store_factory)
+            return manager
+        return threaded_factory
+
+    def _call_counted(self, router, meth, *args, **kwargs):
+        """Call a method of a manager of `router`, directly if it is a coroutine
+        and on the executor otherwise; the call is counted until it is done.
+        """
+        router.enter()
+        try:
+            if _is_coroutine_function(meth):
+                future = meth(*args, **kwargs)
+            else:
+                future = self._io_executor.submit(meth, *args, **kwargs)
+        except BaseException:
+            router.leave()
+            raise
+        return router.leave_when_done(future)
+
+    def async_dispatch(name, index):
+        """
+        make an asynchronous version of the method `name`, that gets its path
+        as argument `index`
+        """
+        sync_method = getattr(MixedContentsManager, name)
+        def _wrapper_method(self, *args, **kwargs):
+            router = self._router
+            meth, sub_path = router.route(name, args[index])
+            if meth is None:
+                return self._io_executor.submit(sync_method, self, *args, **kwargs)
+            args = args[:index] + (sub_path,) + args[index + 1:]
+            return self._call_counted(router, meth, *args, **kwargs)
+        _wrapper_method.__name__ = name
+        _wrapper_method.__doc__ = sync_method.__doc__
+        return _wrapper_method
+
+    def async_dispatch_pair(name):
+        """
+        make an asynchronous version of the rename-like method `name`, that
+        need dispatch on 2 arguments
+        """
+        sync_method = getattr(MixedContentsManager, name)
+        def _wrapper_method(self, first, second=None):
+            router = self._router
+            root, sub_path = router.resolve(first)
+            other_root, other_path = root, None
+            if second is not None:
+                other_root, other_path = router.resolve(second)
+            if root is not None and root == other_root:
+                return self._call_counted(router, router.method(root, name),
+                                          sub_path, other_path)
+            if root is None or other_root is None:
+                return self._io_executor.submit(sync_method, self, first, second)
+            # the transfer is counted as a whole, so that the managers are
+            # not closed between its steps by a change of filesystem_scheme.
+            router.enter()
+            if name == 'copy':
+                future = self._async_copy(router, root, sub_path, other_root, other_path)
+            else:
+                future = self._async_transfer(router, root, sub_path,
+                                              other_root, other_path, move=True)
+            return router.leave_when_done(future)
+        _wrapper_method.__name__ = name
+        _wrapper_method.__doc__ = sync_method.__doc__
+        return _wrapper_method
+
+    save = async_dispatch('save', 1)
+    delete = async_dispatch('delete', 0)
+    create_checkpoint = async_dispatch('create_checkpoint', 0)
+    list_checkpoints = async_dispatch('list_checkpoints', 0)
+    restore_checkpoint = async_dispatch('restore_checkpoint', 1)
+    delete_checkpoint = async_dispatch('delete_checkpoint', 1)
+    rename = async_dispatch_pair('rename')
+    copy = async_dispatch_pair('copy')
+
+    def get(self, path, content=True, type=None, format=None):
+        if not content:
+            return super(AsyncMixedContentsManager, self).get(
+                path, content=content, type=type, format=format)
+        router = self._router
+        meth, sub_path = router.route('get', path)
+        if meth is None:
+            if sub_path in router.virtual_dirs:
+                return self._async_virtual_dir_model(router, sub_path)
+            return self._io_executor.submit(MixedContentsManager.get, self, path,
+                                            content=content, type=type, format=format)
+        return self._call_counted(router, meth, sub_path,
+                                  content=content, type=type, format=format)
+
+    def update(self, model, path):
+        router = self._router
+        root, sub_path = router.resolve(path)
+        m_root, m_path = router.resolve(model['path'])
+        if root is not None and root == m_root:
+            model['path'] = m_path
+            return self._call_counted(router, router.method(root, 'update'),
+                                      model, sub_path)
+        if root is None or m_root is None:
+            return self._io_executor.submit(MixedContentsManager.update, self, model, path)
+        router.enter()
+        return router.leave_when_done(self._async_move(router, root, sub_path, m_root, m_path))
+
+    def close(self):
+        super(AsyncMixedContentsManager, self).close()
+        self._io_executor.shutdown(wait=False)
+
+    # Virtual directories, listing the mount points with `_call_counted`.
+
+    @gen.coroutine
+    def _async_virtual_dir_model(self, router, path):
+        model = _virtual_dir_entry(path)
+        children = self._virtual_dir_children(router, path)
+        pending = {}
+        busy = []
+        for child in children:
+            if child['path'] in router.managers:
+                future = self._start_mount_listing(router, child['path'])
+                if future is None:
+                    busy.append(child)
+                else:
+                    pending[future] = child
+
+        if pending:
+            try:
+                yield gen.with_timeout(timedelta(seconds=self.root_listing_timeout),
+                                       _settle(list(pending)))
+            except gen.TimeoutError:
+                pass
+        for future, child in pending.items():
+            if not future.done():
+                self.log.warning('Listing mount point %s timed out', child['path'])
+                busy.append(child)
+                continue
+            try:
+                sub = future.result()
+            except Exception:
+                self.log.warning('Listing mount point %s failed', child['path'], exc_info=True)
+                continue
+            self._fill_mount_child(child, sub)
+        self._finish_virtual_dir(model, children, busy)
+        raise gen.Return(model)
+
+    def _start_mount_listing(self, router, root):
+        """Start listing the root of a mount point of `router`.
+
+        Returns the future of the listing, or None if a previous listing of
+        the mount point is still running.
+        """
+        with self._listings_lock:
+            if root in self._mount_listings:
+                return None
+            future = self._call_counted(router, router.method(root, 'get'),
+                                        '', content=self.root_listing_inline)
+            self._mount_listings[root] = future
+        future.add_done_callback(lambda f: self._mount_listing_done(root, f))
+        return future
+
+    # Transfer across mount points, waiting for each call to the managers.
+
+    @gen.coroutine
+    def _async_copy(self, router, from_root, from_path, to_root, to_path):
+        to_man = router.managers[to_root]
+        is_dir = yield self._call_counted(router, to_man.dir_exists, to_path)
+        if is_dir:
+            from_name = from_path.rsplit('/', 1)[-1]
+            to_name = yield self._call_counted(router, to_man.increment_filename,
+                                               from_name, to_path, insert='-Copy')
+            to_path = '/'.join(p for p in (to_path, to_name) if p)
+        model = yield self._async_transfer(router, from_root, from_path, to_root, to_path)
+        raise gen.Return(model)
+
+    @gen.coroutine
+    def _async_move(self, router, from_root, from_path, to_root, to_path):
+        yield self._async_transfer(router, from_root, from_path, to_root, to_path, move=True)
+        model = yield self._call_counted(router, router.method(to_root, 'get'),
+                                         to_path, content=False)
+        raise gen.Return(model)
+
+    @gen.coroutine
+    def _async_transfer(self, router, from_root, from_path, to_root, to_path, move=False):
+        """Coroutine version of `_transfer`"""
+        from_man = router.managers[from_root]
+        to_man = router.managers[to_root]
+        created = []
+        moved_checkpoints = None
+        try:
+            model = yield self._async_transfer_model(router, from_man, from_path,
+                                                     to_man, to_path, created)
+            if move:
+                if self.shared_checkpoints:
+                    moved_checkpoints = ('/'.join(p for p in (from_root, from_path) if p),
+                                         '/'.join(p for p in (to_root, to_path) if p))
+                    yield self._io_executor.submit(self.checkpoints.rename_all_checkpoints,
+                                                   *moved_checkpoints)
+                yield self._call_counted(router, from_man.delete, from_path)
+        except Exception as error:
+            if moved_checkpoints is not None:
+                yield self._io_executor.submit(self.checkpoints.rename_all_checkpoints,
+                                               *reversed(moved_checkpoints))
+            for path in reversed(created):
+                try:
+                    yield self._call_counted(router, to_man.delete, path)
+                except Exception:
+                    self.log.warning('Could not roll back transfer of %s',
+                                     path, exc_info=True)
+            raise error
+        raise gen.Return(model)
+
+    @gen.coroutine
+    def _async_transfer_model(self, router, from_man, from_path, to_man, to_path, created):
+        call = self._call_counted
+        model = yield call(router, from_man.get, from_path, content=False)
+        if model['type'] == 'directory':
+            model = yield call(router, to_man.save, {'type': 'directory'}, to_path)
+            created.append(to_path)
+            listing = yield call(router, from_man.get, from_path, content=True)
+            for child in listing['content']:
+                name = child['name']
+                yield self._async_transfer_model(
+                    router, from_man, '/'.join(p for p in (from_path, name) if p),
+                    to_man, '/'.join(p for p in (to_path, name) if p), created)
+            raise gen.Return(model)
+        if model['type'] == 'notebook':
+            model = yield call(router, from_man.get, from_path, content=True, type='notebook')
+            model = yield call(router, to_man.save, self._content_model(model), to_path)
+            created.append(to_path)
+            raise gen.Return(model)
+        model = yield self._async_transfer_file(router, from_man, from_path,
+                                                to_man, to_path, created)
+        raise gen.Return(model)
+
+    @gen.coroutine
+    def _async_transfer_file(self, router, from_man, from_path, to_man, to_path, created):
+        call = self._call_counted
+        if getattr(from_man, '_get_os_path', None) is not None:
+            # read the file chunk by chunk on the executor.
+            chunks = self._read_chunks(from_man, from_path)
+            next_chunk = lambda: self._io_executor.submit(next, chunks, None)
+        else:
+            model = yield call(router, from_man.get, from_path,
+                               content=True, type='file', format='base64')
+            remaining = _base64_chunks(model['content'], self.transfer_chunk_size)
+            @gen.coroutine
+            def next_chunk():
+                raise gen.Return(next(remaining, None))
+
+        first = yield next_chunk()
+        second = yield next_chunk()
+        model = {'type': 'file', 'format': 'base64', 'content': first or ''}
+        if second is None or not _supports_chunks(to_man):
+            content = [model['content']]
+            while second is not None:
+                content.append(second)
+                second = yield next_chunk()
+            model['content'] = ''.join(content)
+            model = yield call(router, to_man.save, model, to_path)
+            created.append(to_path)
+            raise gen.Return(model)
+
+        model['chunk'] = 1
+        model = yield call(router, to_man.save, model, to_path)
+        created.append(to_path)
+        index, content = 2, second
+        while True:
+            following = yield next_chunk()
+            if following is None:
+                break
+            yield call(router, to_man.save, {'type': 'file', 'format': 'base64',
+                                             'content': content, 'chunk': index}, to_path)
+            index, content = index + 1, following
+        model = yield call(router, to_man.save, {'type': 'file', 'format': 'base64',
+                                                 'content': content, 'chunk': -1}, to_path)
+        raise gen.Return(model)
+
+    # ContentsManager helpers calling the asynchronous methods.
+
+    @gen.coroutine
+    def new(self, model=None, path=''):
+        # returns the result of save.
+        model = yield super(AsyncMixedContentsManager, self).new(model, path)
+        raise gen.Return(model)
+
+    @gen.coroutine
+    def new_untitled(self, path='', type='', ext=''):
+        # returns the result of new.
+        model = yield super(AsyncMixedContentsManager, self).new_untitled(path, type, ext)
+        raise gen.Return(model)
+
+    @gen.coroutine
+    def trust_notebook(self, path):
+        model = yield self.get(path)
+        nb = model['content']
+        self.log.warning("Trusting notebook %s", path)
+        self.notary.mark_cells(nb, True)
+        self.check_and_sign(nb, path)
+
+
+class _ThreadLocalSignatureStore(object):
+    """Signature store of a notary used from several threads.
+
+    SQLite connections can only be used in the thread that opened them, so
+    each thread gets its own store, created by `factory`.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        store = getattr(self._local, 'store', None)
+        if store is None:
+            store = self._local.store = self._factory()
+        return getattr(store, name)
+
+
+def _scheme_roots(filesystem_scheme):
+    """Mount points of a filesystem_scheme.
+
+    Raise TraitError if it is not a list of entries with a `root` and a
+    `contents` string, and ValueError if two entries share a mount point.
+    """
+    if not isinstance(filesystem_scheme, list):
+        raise TraitError('filesystem_scheme should be a list, not %r' % (filesystem_scheme,))
+    for scheme in filesystem_scheme:
+        if not (isinstance(scheme, dict) and
+                isinstance(scheme.get('root'), string_types) and
+                isinstance(scheme.get('contents'), string_types)):
+            raise TraitError('Entries of filesystem_scheme should be dicts with '
+                             'root and contents strings, not %r' % (scheme,))
+    ## check consistency of scheme.
+    roots = [scheme['root'].strip('/') for scheme in filesystem_scheme]
+    if not len(set(roots)) == len(roots):
+        raise ValueError('Scheme should not mount two contents manager on the same mountpoint')
+    return roots
+
+
+def _scheme_file_poller(manager):
+    """PeriodicCallback checking the scheme_config_file of a manager.
+
+    The callback only holds a weak reference to the manager, and stops once
+    the manager is gone.
+    """
+    ref = weakref.ref(manager)
+    def check_scheme_file():
+        manager = ref()
+        if manager is None:
+            poller.stop()
+        else:
+            manager._check_scheme_file()
+    poller = PeriodicCallback(check_scheme_file, manager.scheme_poll_interval * 1000)
+    return poller
+
+
+def _close_manager(manager, log):
+    """Close a contents manager, if it has a `close` method"""
+    close = getattr(manager, 'close', None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        log.warning('Could not close %s', manager, exc_info=True)
+
+
+def _is_coroutine_function(func):
+    """Whether calling func returns an awaitable (native or tornado coroutine)"""
+    iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', lambda f: False)
+    return iscoroutinefunction(func) or gen.is_coroutine_function(func)
+
+
+def _metadata_of(get, path):
+    """One result of `MixedContentsManager.get_metadata_batch`"""
+    try:
+        model = get(path, content=False)
+    except HTTPError as e:
+        if e.status_code == 404:
+            return {'exists': False, 'model': None}
+        return {'exists': False, 'model': None, 'error': e.log_message or str(e)}
+    except Exception as e:
+        return {'exists': False, 'model': None, 'error': str(e)}
+    return {'exists': True, 'model': model}
+
+
+def _virtual_dir_entry(path):
+    """Model of a virtual directory of the mixed contents, without content"""
+    return {
+        'name': path.rsplit('/', 1)[-1],
+        'path': path,
+        'type': 'directory',
+        'created': None,
+        'last_modified': None,
+        'writable': False,
+        'mimetype': None,
+        'content': None,
+        'format': None,
+    }
+
+
+def _base64_chunks(content, size):
+    """Split base64 content into independently decodable chunks of about `size` bytes"""
+    # 4 base64 characters encode 3 bytes.
+    step = max(4, size // 3 * 4)
+    for start in range(0, len(content), step):
+        yield content[start:start + step]
+
+
+@gen.coroutine
+def _settle(futures):
+    """Wait for all the futures, ignoring their exceptions"""
+    for future in futures:
+        try:
+            yield future
+        except Exception:
+            pass
+
+
+def _supports_chunks(manager):
+    """Whether the manager accepts chunked saves (the `chunk` model key)"""
+    if isinstance(manager, MetadataCachingManager):
+        manager = manager.manager
+    return LargeFileManager is not None and isinstance(manager, LargeFileManager)
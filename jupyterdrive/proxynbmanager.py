@@ -0,0 +1,175 @@
+"""A contents manager that forwards its operations to a remote backend."""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+import copy
+import threading
+from concurrent.futures import Future
+
+from .compat import JUPYTER
+
+if JUPYTER:
+    from notebook.services.contents.manager import ContentsManager
+    from traitlets.traitlets import Integer, Unicode, Dict
+    from traitlets import import_item
+else:
+    from IPython.html.services.contents.manager import ContentsManager
+    from IPython.utils.traitlets import Integer, Unicode, Dict
+    from IPython.utils.importstring import import_item
+
+
+class ContentsBackend(object):
+    """Interface of the backends of `ProxyContentsManager`.
+
+    Methods may be called from several threads at once, and take and return
+    contents models like the `ContentsManager` methods of the same name.
+    """
+
+    def get(self, path, content=True, type=None, format=None):
+        raise NotImplementedError('must be implemented in a subclass')
+
+    def save(self, model, path):
+        raise NotImplementedError('must be implemented in a subclass')
+
+    def delete_file(self, path):
+        raise NotImplementedError('must be implemented in a subclass')
+
+    def rename_file(self, old_path, new_path):
+        raise NotImplementedError('must be implemented in a subclass')
+
+    def file_exists(self, path):
+        raise NotImplementedError('must be implemented in a subclass')
+
+    def dir_exists(self, path):
+        raise NotImplementedError('must be implemented in a subclass')
+
+    def is_hidden(self, path):
+        return False
+
+    def create_checkpoint(self, path):
+        raise NotImplementedError('Checkpoints are not supported by this backend')
+
+    def list_checkpoints(self, path):
+        return []
+
+    def restore_checkpoint(self, checkpoint_id, path):
+        raise NotImplementedError('Checkpoints are not supported by this backend')
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        raise NotImplementedError('Checkpoints are not supported by this backend')
+
+
+class ProxyContentsManager(ContentsManager):
+    """Contents manager that forwards its operations to a `ContentsBackend`.
+
+    Backend calls block the calling thread, with at most `max_concurrency`
+    calls in flight per manager (so per mount point of a
+    `MixedContentsManager`) so that one slow backend cannot take all the
+    threads of the server.  Identical read requests (`get`, `file_exists`,
+    `dir_exists`, `is_hidden`) issued while one is in flight wait for its
+    answer instead of calling the backend again; each caller gets its own
+    copy of the result.
+
+    The calling thread is the server's IOLoop when the manager is the
+    contents manager of the server, or is mounted in a `MixedContentsManager`:
+    every request then waits for the backend.  Mount it in an
+    `AsyncMixedContentsManager` instead, whose thread pool runs the calls
+    that read or write contents; only its metadata checks still run on the
+    IOLoop.
+    """
+
+    backend_class = Unicode('', config=True,
+    help="""
+    Import string of the `ContentsBackend` subclass to forward operations to.
+    """)
+
+    backend_kwargs = Dict({}, config=True,
+    help="""
+    Keyword arguments used to create the backend.
+    """)
+
+    max_concurrency = Integer(4, config=True,
+    help="""
+    Maximum number of calls to the backend in flight for this manager.
+    """)
+
+    def __init__(self, backend=None, **kwargs):
+        super(ProxyContentsManager, self).__init__(**kwargs)
+        if backend is None:
+            backend = self._create_backend()
+        self.backend = backend
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _create_backend(self):
+        """The backend to use when none is given, from the config"""
+        return import_item(self.backend_class)(**self.backend_kwargs)
+
+    def _call(self, name, *args, **kwargs):
+        """Call a backend method, waiting for a free slot first"""
+        meth = getattr(self.backend, name)
+        with self._slots:
+            return meth(*args, **kwargs)
+
+    def _coalesced(self, name, *args):
+        """Like _call, but share the call with identical in-flight ones"""
+        key = (name,) + args
+        with self._in_flight_lock:
+            shared = self._in_flight.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._in_flight[key] = Future()
+        if not leader:
+            return copy.deepcopy(shared.result())
+        try:
+            result = self._call(name, *args)
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        else:
+            shared.set_result(result)
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+        return copy.deepcopy(result)
+
+    def get(self, path, content=True, type=None, format=None):
+        return self._coalesced('get', path.strip('/'), content, type, format)
+
+    def file_exists(self, path=''):
+        return self._coalesced('file_exists', path.strip('/'))
+
+    def dir_exists(self, path):
+        return self._coalesced('dir_exists', path.strip('/'))
+
+    def is_hidden(self, path):
+        return self._coalesced('is_hidden', path.strip('/'))
+
+    def save(self, model, path):
+        return self._call('save', model, path.strip('/'))
+
+    def delete_file(self, path):
+        return self._call('delete_file', path.strip('/'))
+
+    def delete(self, path):
+        return self.delete_file(path)
+
+    def rename_file(self, old_path, new_path):
+        return self._call('rename_file', old_path.strip('/'), new_path.strip('/'))
+
+    def rename(self, old_path, new_path):
+        return self.rename_file(old_path, new_path)
+
+    def create_checkpoint(self, path):
+        return self._call('create_checkpoint', path.strip('/'))
+
+    def list_checkpoints(self, path):
+        return self._call('list_checkpoints', path.strip('/'))
+
+    def restore_checkpoint(self, checkpoint_id, path):
+        return self._call('restore_checkpoint', checkpoint_id, path.strip('/'))
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        return self._call('delete_checkpoint', checkpoint_id, path.strip('/'))
+
@@ -0,0 +1,725 @@
+"""A local stand-in for the Google Drive v2 REST API.
+
+Implements, in memory, the part of the API used by the Drive contents:
+`about.get`, `files.list/get/insert/patch/delete` (with the `q`, `orderBy`,
+`fields` and paging parameters), `children.list`, `revisions.list/get/patch`,
+`changes.getStartPageToken/list`, multipart and resumable uploads, media
+downloads (with `Range` requests) and batch requests.  Every HTTP request
+can be delayed by an injected latency, and the server counts round trips,
+API calls (batched ones included) and bytes transferred, to benchmark the
+clients of Drive against it (see `benchmarks/bench_drive_e2e.js`).
+
+It is only used by the tests and benchmarks, and is not installed with the
+package.  Run it from a checkout with::
+
+    python jupyterdrive/tests/fakedrive.py --port 8890 --latency 50
+
+Besides the Drive endpoints, `GET /fakedrive/stats` returns the counters,
+`DELETE /fakedrive/stats` resets them, and `POST /fakedrive/files` with
+`{"files": [{"path": "a/b.ipynb", "content": "..."}, ...]}` adds files
+(and their folders) without being counted.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+from __future__ import print_function
+
+import base64
+import datetime
+import hashlib
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+
+from tornado import gen, netutil, web
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+try:
+    from urllib.parse import parse_qsl, urlsplit
+except ImportError:  # Python 2
+    from urlparse import parse_qsl, urlsplit
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+_STATUS_LINES = {200: 'OK', 204: 'No Content', 206: 'Partial Content',
+                 308: 'Resume Incomplete', 400: 'Bad Request',
+                 404: 'Not Found', 416: 'Requested Range Not Satisfiable'}
+
+
+class DriveError(Exception):
+    """An error answered with a Drive error resource"""
+
+    def __init__(self, code, reason, message):
+        super(DriveError, self).__init__(message)
+        self.code = code
+        self.reason = reason
+
+    def resource(self):
+        return {'error': {
+            'errors': [{'domain': 'global', 'reason': self.reason, 'message': str(self)}],
+            'code': self.code,
+            'message': str(self),
+        }}
+
+
+def not_found(file_id):
+    return DriveError(404, 'notFound', 'File not found: %s' % file_id)
+
+
+def _now():
+    return datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _to_bytes(data):
+    if isinstance(data, bytes):
+        return data
+    return data.encode('utf-8')
+
+
+def parse_fields(fields):
+    """Parse a partial response selector: 'a,b(c,d)' -> {'a': None, 'b': {'c': None, 'd': None}}"""
+    spec = current = {}
+    stack = []
+    name = ''
+    for char in fields + ',':
+        if char not in ',()':
+            name += char
+            continue
+        name = name.strip()
+        if char == '(':
+            child = current[name] = {}
+            stack.append(current)
+            current = child
+        else:
+            if name:
+                current[name] = None
+            if char == ')':
+                current = stack.pop()
+        name = ''
+    return spec
+
+
+def select_fields(value, spec):
+    """Keep only the fields of `value` selected by a `parse_fields` spec"""
+    if spec is None:
+        return value
+    if isinstance(value, list):
+        return [select_fields(item, spec) for item in value]
+    if isinstance(value, dict):
+        return dict((key, select_fields(value[key], sub))
+                    for key, sub in spec.items() if key in value)
+    return value
+
+
+_AND = re.compile(r"\s+and\s+(?=(?:[^']*'[^']*')*[^']*$)", re.IGNORECASE)
+_CLAUSES = [
+    (re.compile(r"^'(.*)'\s+in\s+parents$"),
+     lambda drive, f, v: any(p['id'] == drive.resolve_id(v) for p in f['parents'])),
+    (re.compile(r"^title\s*=\s*'(.*)'$"), lambda drive, f, v: f['title'] == v),
+    (re.compile(r"^title\s+contains\s+'(.*)'$"), lambda drive, f, v: v in f['title']),
+    (re.compile(r"^mimeType\s*=\s*'(.*)'$"), lambda drive, f, v: f['mimeType'] == v),
+    (re.compile(r"^mimeType\s*!=\s*'(.*)'$"), lambda drive, f, v: f['mimeType'] != v),
+    (re.compile(r"^trashed\s*=\s*(true|false)$"),
+     lambda drive, f, v: f['labels']['trashed'] == (v == 'true')),
+]
+
+
+def _split_part(part):
+    """Split a MIME part (or HTTP message) into its headers and body"""
+    if part.startswith(b'\r\n'):
+        return {}, part[2:]
+    head, _, body = part.partition(b'\r\n\r\n')
+    headers = {}
+    for line in head.decode('utf-8').split('\r\n'):
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return headers, body
+
+
+def split_multipart(body, content_type):
+    """The (headers, body) of the parts of a multipart body"""
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if not match:
+        raise DriveError(400, 'badContent', 'Missing multipart boundary')
+    delimiter = b'--' + _to_bytes(match.group(1))
+    parts = []
+    for segment in body.split(delimiter)[1:]:
+        if segment.startswith(b'--'):
+            break
+        if segment.startswith(b'\r\n'):
+            segment = segment[2:]
+        if segment.endswith(b'\r\n'):
+            segment = segment[:-2]
+        parts.append(_split_part(segment))
+    return parts
+
+
+class FakeDrive(object):
+    """An in-memory Drive, answering Drive v2 REST requests.
+
+    `handle` answers an HTTP request with a (status, headers, body) tuple,
+    and counts it in `stats`.  `add` creates files directly.
+
+    Any access token is accepted, unless `access_token` is set: requests
+    with another one are then answered with a 401.  `POST /o/oauth2/token`
+    exchanges `refresh_token` for a new `access_token`.
+    """
+
+    routes = [
+        ('GET', r'/drive/v2/about', 'about_get'),
+        ('GET', r'/drive/v2/files', 'files_list'),
+        ('POST', r'/drive/v2/files', 'files_insert'),
+        ('GET', r'/drive/v2/files/([^/]+)', 'files_get'),
+        ('PATCH', r'/drive/v2/files/([^/]+)', 'files_patch'),
+        ('PUT', r'/drive/v2/files/([^/]+)', 'files_patch'),
+        ('DELETE', r'/drive/v2/files/([^/]+)', 'files_delete'),
+        ('GET', r'/drive/v2/files/([^/]+)/children', 'children_list'),
+        ('GET', r'/drive/v2/files/([^/]+)/revisions', 'revisions_list'),
+        ('GET', r'/drive/v2/files/([^/]+)/revisions/([^/]+)', 'revisions_get'),
+        ('PATCH', r'/drive/v2/files/([^/]+)/revisions/([^/]+)', 'revisions_patch'),
+        ('GET', r'/drive/v2/changes/startPageToken', 'changes_start_page_token'),
+        ('GET', r'/drive/v2/changes', 'changes_list'),
+        ('POST', r'/upload/drive/v2/files', 'upload'),
+        ('PUT', r'/upload/drive/v2/files', 'upload'),
+        ('PUT', r'/upload/drive/v2/files/([^/]+)', 'upload'),
+        ('POST', r'/batch(?:/drive/v2)?', 'batch'),
+        ('POST', r'/o/oauth2/token', 'oauth2_token'),
+    ]
+
+    def __init__(self, base_url=''):
+        self.base_url = base_url
+        self.access_token = None
+        self.refresh_token = None
+        self.files = {}
+        self.contents = {}
+        self.revisions = {}
+        self.changes = []
+        self._ids = itertools.count(1)
+        self._sessions = {}
+        self.root_id = None
+        self._routes = [(method, re.compile('^' + pattern + '$'), name)
+                        for method, pattern, name in self.routes]
+        self.root_id = self._create({'title': 'My Drive', 'mimeType': FOLDER_MIME_TYPE},
+                                    parents=[])['id']
+        self.reset_stats()
+
+    # Statistics
+
+    def reset_stats(self):
+        self.stats = {'round_trips': 0, 'api_calls': 0, 'bytes_received': 0,
+                      'bytes_sent': 0, 'calls': {}}
+
+    def _count_call(self, name):
+        self.stats['api_calls'] += 1
+        self.stats['calls'][name] = self.stats['calls'].get(name, 0) + 1
+
+    # Direct access
+
+    def set_base_url(self, base_url):
+        """Set the URL the server is reached at, used in download URLs"""
+        self.base_url = base_url
+        for file_id, resource in self.files.items():
+            if 'downloadUrl' in resource:
+                resource['downloadUrl'] = '%s/drive/v2/files/%s?alt=media' % (base_url, file_id)
+            for revision in self.revisions.get(file_id, []):
+                revision['downloadUrl'] = '%s/drive/v2/files/%s/revisions/%s?alt=media' % (
+                    base_url, file_id, revision['id'])
+
+    def resolve_id(self, file_id):
+        return self.root_id if file_id == 'root' else file_id
+
+    def add(self, path, content=None, mime_type=None):
+        """Create a file (or a folder when `content` is None) and its folders.
+
+        Returns the files resource of the last component of `path`.
+        """
+        components = [c for c in path.split('/') if c]
+        parent = self.root_id
+        for i, title in enumerate(components):
+            last = i == len(components) - 1
+            is_folder = not last or content is None
+            existing = [f for f in self.files.values()
+                        if f['title'] == title and not f['labels']['trashed']
+                        and any(p['id'] == parent for p in f['parents'])]
+            if existing and not last:
+                parent = existing[0]['id']
+                continue
+            metadata = {'title': title, 'mimeType': FOLDER_MIME_TYPE if is_folder else
+                        mime_type or ('application/ipynb' if title.endswith('.ipynb') else 'text/plain')}
+            resource = self._create(metadata, [parent], None if is_folder else _to_bytes(content))
+            parent = resource['id']
+        return self.files[parent]
+
+    def _parent_ref(self, parent_id):
+        parent_id = self.resolve_id(parent_id)
+        return {'id': parent_id, 'isRoot': parent_id == self.root_id}
+
+    def _create(self, metadata, parents=None, data=b'', pinned=False):
+        file_id = 'f%d' % next(self._ids)
+        if parents is None:
+            parents = [p['id'] for p in metadata.get('parents') or []] or [self.root_id]
+        now = _now()
+        resource = {
+            'kind': 'drive#file',
+            'id': file_id,
+            'title': metadata.get('title', 'Untitled'),
+            'mimeType': metadata.get('mimeType', 'application/octet-stream'),
+            'parents': [self._parent_ref(p) for p in parents],
+            'labels': {'trashed': False, 'starred': False},
+            'createdDate': now,
+            'modifiedDate': now,
+            'editable': True,
+        }
+        self.files[file_id] = resource
+        if resource['mimeType'] == FOLDER_MIME_TYPE:
+            self._changed(file_id)
+        else:
+            self._write(file_id, data, pinned)
+        return resource
+
+    def _write(self, file_id, data, pinned=False):
+        resource = self.files[file_id]
+        revision_id = 'r%d' % next(self._ids)
+        md5 = hashlib.md5(data).hexdigest()
+        resource.update({
+            'headRevisionId': revision_id,
+            'md5Checksum': md5,
+            'fileSize': str(len(data)),
+            'modifiedDate': _now(),
+            'downloadUrl': '%s/drive/v2/files/%s?alt=media' % (self.base_url, file_id),
+        })
+        self.contents[file_id] = data
+        self.revisions.setdefault(file_id, []).append({
+            'kind': 'drive#revision',
+            'id': revision_id,
+            'modifiedDate': resource['modifiedDate'],
+            'pinned': pinned,
+            'md5Checksum': md5,
+            'fileSize': str(len(data)),
+            'downloadUrl': '%s/drive/v2/files/%s/revisions/%s?alt=media' % (
+                self.base_url, file_id, revision_id),
+            'contents': data,
+        })
+        self._changed(file_id)
+
+    def _changed(self, file_id):
+        self.changes.append(file_id)
+
+    def _file(self, file_id):
+        resource = self.files.get(self.resolve_id(file_id))
+        if resource is None:
+            raise not_found(file_id)
+        return resource
+
+    def _revision(self, file_id, revision_id):
+        for revision in self.revisions.get(self.resolve_id(file_id), []):
+            if revision['id'] == revision_id:
+                return revision
+        raise DriveError(404, 'notFound', 'Revision not found: %s' % revision_id)
+
+    # HTTP
+
+    def handle(self, method, path, query, headers, body):
+        """Answer an HTTP request, counting it as a round trip.
+
+        `query` and `headers` are dicts (header names in lower case), and
+        `body` is bytes.  Returns (status, headers, body bytes).
+        """
+        self.stats['round_trips'] += 1
+        self.stats['bytes_received'] += len(body)
+        if (self.access_token is not None and path != '/o/oauth2/token'
+                and headers.get('authorization') != 'Bearer ' + self.access_token):
+            error = DriveError(401, 'authError', 'Invalid Credentials')
+            status, response_headers, response_body = self._json(error.code, error.resource())
+        else:
+            status, response_headers, response_body = self._dispatch(method, path, query, headers, body)
+        self.stats['bytes_sent'] += len(response_body)
+        return status, response_headers, response_body
+
+    def _dispatch(self, method, path, query, headers, body):
+        for route_method, pattern, name in self._routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            error = DriveError(404, 'notFound', 'No such endpoint: %s %s' % (method, path))
+            return self._json(error.code, error.resource())
+        if name != 'batch':
+            self._count_call(name)
+        try:
+            result = getattr(self, name)(query, headers, body, *match.groups())
+        except DriveError as error:
+            return self._json(error.code, error.resource())
+        if isinstance(result, tuple):
+            return result
+        if result is None:
+            return 204, {}, b''
+        if 'fields' in query:
+            result = select_fields(result, parse_fields(query['fields']))
+        return self._json(200, result)
+
+    def _json(self, status, resource):
+        body = json.dumps(resource).encode('utf-8')
+        return status, {'Content-Type': 'application/json; charset=UTF-8'}, body
+
+    def _media(self, data, mime_type, headers):
+        response_headers = {'Content-Type': mime_type, 'Accept-Ranges': 'bytes'}
+        match = re.match(r'bytes=(\d*)-(\d*)$', headers.get('range', ''))
+        if not match:
+            return 200, response_headers, data
+        start, end = match.groups()
+        size = len(data)
+        if start:
+            start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        else:
+            start, end = max(size - int(end or 0), 0), size - 1
+        if start > end:
+            response_headers['Content-Range'] = 'bytes */%d' % size
+            return 416, response_headers, b''
+        response_headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+        return 206, response_headers, data[start:end + 1]
+
+    # Endpoints
+
+    def oauth2_token(self, query, headers, body):
+        form = dict(parse_qsl(body.decode('utf-8')))
+        if (self.refresh_token is None or form.get('grant_type') != 'refresh_token'
+                or form.get('refresh_token') != self.refresh_token):
+            return self._json(400, {'error': 'invalid_grant'})
+        self.access_token = 'access-%d' % next(self._ids)
+        return {'access_token': self.access_token, 'token_type': 'Bearer', 'expires_in': 3600}
+
+    def about_get(self, query, headers, body):
+        return {'kind': 'drive#about', 'rootFolderId': self.root_id,
+                'user': {'displayName': 'Fake Drive user', 'permissionId': '0',
+                         'picture': {'url': ''}}}
+
+    def _matching(self, q):
+        files = [f for f in self.files.values() if f['id'] != self.root_id]
+        for clause in _AND.split(q.strip()) if q.strip() else []:
+            for pattern, predicate in _CLAUSES:
+                match = pattern.match(clause.strip())
+                if match:
+                    value = match.group(1).replace("\\'", "'")
+                    files = [f for f in files if predicate(self, f, value)]
+                    break
+            else:
+                raise DriveError(400, 'invalid', 'Invalid query: %s' % clause)
+        return files
+
+    def _page(self, items, query):
+        max_results = min(int(query.get('maxResults', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        start = int(query.get('pageToken') or 0)
+        result = {'items': items[start:start + max_results]}
+        if start + max_results < len(items):
+            result['nextPageToken'] = str(start + max_results)
+        return result
+
+    def files_list(self, query, headers, body):
+        files = self._matching(query.get('q', ''))
+        files.sort(key=lambda f: int(f['id'][1:]))
+        for key in reversed([k.strip() for k in query.get('orderBy', '').split(',') if k.strip()]):
+            name, _, direction = key.partition(' ')
+            if name == 'folder':
+                sort_key = lambda f: f['mimeType'] != FOLDER_MIME_TYPE
+            else:
+                sort_key = lambda f, name=name: f.get(name, '')
+            files.sort(key=sort_key, reverse=direction == 'desc')
+        result = self._page(files, query)
+        result['kind'] = 'drive#fileList'
+        return result
+
+    def files_insert(self, query, headers, body):
+        return self._create(json.loads(body.decode('utf-8') or '{}'))
+
+    def files_get(self, query, headers, body, file_id):
+        resource = self._file(file_id)
+        if query.get('alt') == 'media':
+            if resource['id'] not in self.contents:
+                raise DriveError(400, 'fileNotDownloadable', 'Only files with binary content can be downloaded')
+            return self._media(self.contents[resource['id']], resource['mimeType'], headers)
+        return resource
+
+    def files_patch(self, query, headers, body, file_id):
+        resource = self._file(file_id)
+        metadata = json.loads(body.decode('utf-8') or '{}')
+        for key in ('title', 'mimeType'):
+            if key in metadata:
+                resource[key] = metadata[key]
+        if 'parents' in metadata:
+            resource['parents'] = [self._parent_ref(p['id']) for p in metadata['parents']]
+        if 'trashed' in metadata.get('labels', {}):
+            resource['labels']['trashed'] = bool(metadata['labels']['trashed'])
+        resource['modifiedDate'] = _now()
+        self._changed(resource['id'])
+        return resource
+
+    def files_delete(self, query, headers, body, file_id):
+        resource = self._file(file_id)
+        for child in list(self.files.values()):
+            if any(p['id'] == resource['id'] for p in child['parents']):
+                self.files_delete(query, headers, body, child['id'])
+        del self.files[resource['id']]
+        self.contents.pop(resource['id'], None)
+        self.revisions.pop(resource['id'], None)
+        self._changed(resource['id'])
+
+    def children_list(self, query, headers, body, folder_id):
+        folder_id = self._file(folder_id)['id']
+        files = [f for f in self._matching(query.get('q', ''))
+                 if any(p['id'] == folder_id for p in f['parents'])]
+        files.sort(key=lambda f: int(f['id'][1:]))
+        result = self._page([{'kind': 'drive#childReference', 'id': f['id'],
+                              'childLink': '%s/drive/v2/files/%s' % (self.base_url, f['id'])}
+                             for f in files], query)
+        result['kind'] = 'drive#childList'
+        return result
+
+    def _revision_resource(self, revision):
+        return dict((k, v) for k, v in revision.items() if k != 'contents')
+
+    def revisions_list(self, query, headers, body, file_id):
+        self._file(file_id)
+        return {'kind': 'drive#revisionList',
+                'items': [self._revision_resource(r) for r in self.revisions.get(self.resolve_id(file_id), [])]}
+
+    def revisions_get(self, query, headers, body, file_id, revision_id):
+        revision = self._revision(file_id, revision_id)
+        if query.get('alt') == 'media':
+            return self._media(revision['contents'], self._file(file_id)['mimeType'], headers)
+        return self._revision_resource(revision)
+
+    def revisions_patch(self, query, headers, body, file_id, revision_id):
+        revision = self._revision(file_id, revision_id)
+        metadata = json.loads(body.decode('utf-8') or '{}')
+        if 'pinned' in metadata:
+            revision['pinned'] = bool(metadata['pinned'])
+        return self._revision_resource(revision)
+
+    def changes_start_page_token(self, query, headers, body):
+        return {'kind': 'drive#startPageToken', 'startPageToken': str(len(self.changes))}
+
+    def changes_list(self, query, headers, body):
+        start = int(query.get('pageToken', 0))
+        max_results = min(int(query.get('maxResults', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        end = min(start + max_results, len(self.changes))
+        items = []
+        for change_id in range(start, end):
+            file_id = self.changes[change_id]
+            resource = self.files.get(file_id)
+            if resource is None and query.get('includeDeleted') == 'false':
+                continue
+            item = {'kind': 'drive#change', 'id': str(change_id), 'fileId': file_id,
+                    'deleted': resource is None}
+            if resource is not None:
+                item['file'] = resource
+            items.append(item)
+        result = {'kind': 'drive#changeList', 'items': items}
+        if end < len(self.changes):
+            result['nextPageToken'] = str(end)
+        else:
+            result['newStartPageToken'] = str(end)
+        return result
+
+    def _finish_upload(self, file_id, metadata, data, query):
+        pinned = query.get('pinned') == 'true'
+        if file_id is None:
+            return self._create(metadata, data=data, pinned=pinned)
+        resource = self._file(file_id)
+        if metadata:
+            self.files_patch({}, {}, json.dumps(metadata).encode('utf-8'), file_id)
+        self._write(resource['id'], data, pinned)
+        return resource
+
+    def upload(self, query, headers, body, file_id=None):
+        upload_type = query.get('uploadType')
+        if 'upload_id' in query:
+            return self._upload_chunk(query, headers, body)
+        if upload_type == 'multipart':
+            parts = split_multipart(body, headers.get('content-type'))
+            if len(parts) != 2:
+                raise DriveError(400, 'badContent', 'Expected metadata and media parts')
+            metadata = json.loads(parts[0][1].decode('utf-8') or '{}')
+            part_headers, data = parts[1]
+            if part_headers.get('content-transfer-encoding') == 'base64':
+                data = base64.b64decode(data)
+            return self._finish_upload(file_id, metadata, data, query)
+        if upload_type == 'resumable':
+            upload_id = 'u%d' % next(self._ids)
+            self._sessions[upload_id] = {
+                'file_id': file_id,
+                'metadata': json.loads(body.decode('utf-8') or '{}'),
+                'query': query,
+                'data': b'',
+            }
+            location = '%s/upload/drive/v2/files%s?uploadType=resumable&upload_id=%s' % (
+                self.base_url, '/' + file_id if file_id else '', upload_id)
+            return 200, {'Location': location}, b''
+        if upload_type == 'media':
+            return self._finish_upload(file_id, {}, body, query)
+        raise DriveError(400, 'invalid', 'Unsupported uploadType: %s' % upload_type)
+
+    def _upload_chunk(self, query, headers, body):
+        session = self._sessions.get(query['upload_id'])
+        if session is None:
+            raise DriveError(404, 'notFound', 'Upload session not found')
+        match = re.match(r'bytes (?:(\d+)-(\d+)|\*)/(\d+)$', headers.get('content-range', ''))
+        if not match:
+            raise DriveError(400, 'badContent', 'Missing Content-Range')
+        start, _, total = match.groups()
+        if start is not None and int(start) == len(session['data']):
+            session['data'] += body
+        if len(session['data']) >= int(total):
+            del self._sessions[query['upload_id']]
+            return self._json(200, self._finish_upload(
+                session['file_id'], session['metadata'], session['data'], session['query']))
+        response_headers = {}
+        if session['data']:
+            response_headers['Range'] = 'bytes=0-%d' % (len(session['data']) - 1)
+        return 308, response_headers, b''
+
+    def batch(self, query, headers, body):
+        boundary = 'batch_fakedrive'
+        response = []
+        for part_headers, http_request in split_multipart(body, headers.get('content-type')):
+            request_line, _, rest = http_request.partition(b'\r\n')
+            method, url = request_line.decode('utf-8').split(' ')[:2]
+            request_headers, request_body = _split_part(rest) if rest else ({}, b'')
+            split = urlsplit(url)
+            status, response_headers, response_body = self._dispatch(
+                method, split.path, dict(parse_qsl(split.query)), request_headers, request_body)
+            lines = ['--' + boundary, 'Content-Type: application/http']
+            if 'content-id' in part_headers:
+                lines.append('Content-ID: <response-%s>' % part_headers['content-id'].strip('<>'))
+            lines += ['', 'HTTP/1.1 %d %s' % (status, _STATUS_LINES.get(status, ''))]
+            lines += ['%s: %s' % item for item in response_headers.items()]
+            response.append(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + response_body + b'\r\n')
+        response.append(('--' + boundary + '--\r\n').encode('utf-8'))
+        return 200, {'Content-Type': 'multipart/mixed; boundary=' + boundary}, b''.join(response)
+
+
+class DriveHandler(web.RequestHandler):
+
+    SUPPORTED_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+    def initialize(self, drive, latency, jitter):
+        self.drive = drive
+        self.latency = latency
+        self.jitter = jitter
+
+    @gen.coroutine
+    def _handle(self, *args):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            yield gen.sleep(delay)
+        query = dict((k, v[-1].decode('utf-8')) for k, v in self.request.query_arguments.items())
+        headers = dict((k.lower(), v) for k, v in self.request.headers.items())
+        status, response_headers, body = self.drive.handle(
+            self.request.method, self.request.path, query, headers, self.request.body)
+        self.set_status(status, _STATUS_LINES.get(status))
+        for name, value in response_headers.items():
+            self.set_header(name, value)
+        if body:
+            self.write(body)
+
+    get = post = put = patch = delete = _handle
+
+
+class ControlHandler(web.RequestHandler):
+
+    def initialize(self, drive):
+        self.drive = drive
+
+    def get(self):
+        self.write(self.drive.stats)
+
+    def delete(self):
+        self.drive.reset_stats()
+
+    def post(self):
+        spec = json.loads(self.request.body.decode('utf-8'))
+        ids = {}
+        for entry in spec.get('files', []):
+            ids[entry['path']] = self.drive.add(entry['path'], entry.get('content'),
+                                                entry.get('mimeType'))['id']
+        self.write(ids)
+
+
+def make_app(drive, latency=0, jitter=0):
+    """A tornado Application serving `drive`; `latency` and `jitter` in seconds"""
+    return web.Application([
+        (r'/fakedrive/stats', ControlHandler, {'drive': drive}),
+        (r'/fakedrive/files', ControlHandler, {'drive': drive}),
+        (r'/.*', DriveHandler, {'drive': drive, 'latency': latency, 'jitter': jitter}),
+    ])
+
+
+def serve_in_thread(drive, latency=0, jitter=0, host='127.0.0.1'):
+    """Serve `drive` on a free port from a daemon thread.
+
+    Returns the base URL of the server and a function stopping it.
+    """
+    sockets = netutil.bind_sockets(0, host)
+    drive.set_base_url('http://%s:%d' % (host, sockets[0].getsockname()[1]))
+    started = threading.Event()
+    state = {}
+
+    def run():
+        if asyncio is not None:
+            asyncio.set_event_loop(asyncio.new_event_loop())
+        loop = IOLoop.current()
+        server = HTTPServer(make_app(drive, latency, jitter))
+        server.add_sockets(sockets)
+        state['loop'] = loop
+        started.set()
+        loop.start()
+        server.stop()
+        loop.close(all_fds=True)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    started.wait()
+
+    def stop():
+        state['loop'].add_callback(state['loop'].stop)
+        thread.join()
+
+    return drive.base_url, stop
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='fakedrive.py',
+                                     description='Local stand-in for the Google Drive v2 REST API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='port, 0 for a free one')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='latency added to every HTTP request, in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='random extra latency, up to this many milliseconds')
+    args = parser.parse_args(argv)
+
+    sockets = netutil.bind_sockets(args.port, args.host)
+    drive = FakeDrive('http://%s:%d' % (args.host, sockets[0].getsockname()[1]))
+    server = HTTPServer(make_app(drive, args.latency / 1000.0, args.jitter / 1000.0))
+    server.add_sockets(sockets)
+    print('Fake Drive listening on %s' % drive.base_url)
+    sys.stdout.flush()
+    IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+from __future__ import print_function, absolute_import
+
+import copy
+import os
+import shutil
+import tempfile
+
+from nbformat.v4 import new_notebook, new_code_cell, new_output
+from notebook.services.contents.checkpoints import Checkpoints
+from traitlets.config import Config
+
+from jupyterdrive.checkpointstore import ContentAddressedCheckpoints
+from jupyterdrive.mixednbmanager import MixedContentsManager
+
+
+FILE_MANAGER = 'notebook.services.contents.filemanager.FileContentsManager'
+
+
+BASE = new_notebook(cells=[
+    new_code_cell('x = %d' % n, outputs=[new_output('stream', text='%d\n' % n * 1000)])
+    for n in range(10)])
+
+
+def notebook(i):
+    nb = copy.deepcopy(BASE)
+    nb.cells[0].source = 'print(%d)' % i
+    return nb
+
+
+def make_manager(root_dir, store_dir):
+    scheme = [{'root': 'one', 'contents': FILE_MANAGER},
+              {'root': 'two', 'contents': FILE_MANAGER}]
+    config = Config({
+        'FileContentsManager': {'root_dir': root_dir},
+        'MixedContentsManager': {'filesystem_scheme': scheme, 'shared_checkpoints': True},
+        'ContentAddressedCheckpoints': {'store_dir': store_dir, 'max_checkpoints': 3},
+    })
+    return MixedContentsManager(config=config)
+
+
+def test_deduplicated_notebook_checkpoints():
+    store_dir = tempfile.mkdtemp()
+    try:
+        store = ContentAddressedCheckpoints(store_dir=store_dir, max_checkpoints=3, gc_every=1)
+        first = store.create_notebook_checkpoint(notebook(0), 'a.ipynb')
+        blobs = store.disk_usage()[0]
+        assert blobs == 20
+        store.create_notebook_checkpoint(notebook(1), 'a.ipynb')
+        store.create_notebook_checkpoint(notebook(1), 'copy.ipynb')
+        # only the first cell changed.
+        assert store.disk_usage()[0] == blobs + 1
+
+        restored = store.get_notebook_checkpoint(first['id'], 'a.ipynb')['content']
+        assert restored == notebook(0)
+
+        for i in range(2, 5):
+            store.create_notebook_checkpoint(notebook(i), 'a.ipynb')
+        assert len(store.list_checkpoints('a.ipynb')) == 3
+        # print(0) was only in pruned checkpoints, the copy refers to print(1).
+        assert store.disk_usage()[0] == blobs + 3
+    finally:
+        shutil.rmtree(store_dir)
+
+
+def test_file_checkpoints_in_chunks():
+    store_dir = tempfile.mkdtemp()
+    try:
+        store = ContentAddressedCheckpoints(store_dir=store_dir, chunk_size=4)
+        checkpoint = store.create_file_checkpoint('aaaabbbbaaaa', 'text', 'f.txt')
+        assert store.disk_usage()[0] == 2
+        model = store.get_file_checkpoint(checkpoint['id'], 'f.txt')
+        assert model == {'type': 'file', 'format': 'text', 'content': 'aaaabbbbaaaa'}
+        store.delete_checkpoint(checkpoint['id'], 'f.txt')
+        assert store.list_checkpoints('f.txt') == []
+        assert store.collect_garbage()[0] == 2
+    finally:
+        shutil.rmtree(store_dir)
+
+
+def test_shared_checkpoints_in_mixed_manager():
+    root_dir = tempfile.mkdtemp()
+    store_dir = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(root_dir, 'two'))
+        mixed = make_manager(root_dir, store_dir)
+        assert isinstance(mixed.checkpoints, ContentAddressedCheckpoints)
+        mixed.save({'type': 'notebook', 'content': notebook(0)}, 'one/n.ipynb')
+        # the file manager creates a first checkpoint on save.
+        assert [c['id'] for c in mixed.list_checkpoints('one/n.ipynb')] == ['1']
+        mixed.save({'type': 'notebook', 'content': notebook(1)}, 'one/n.ipynb')
+        checkpoint = mixed.create_checkpoint('one/n.ipynb')
+        assert not os.path.exists(os.path.join(root_dir, '.ipynb_checkpoints'))
+
+        mixed.save({'type': 'notebook', 'content': notebook(2)}, 'one/n.ipynb')
+        mixed.rename('one/n.ipynb', 'two/m.ipynb')
+        assert mixed.list_checkpoints('one/n.ipynb') == []
+        assert [c['id'] for c in mixed.list_checkpoints('two/m.ipynb')] == ['1', checkpoint['id']]
+
+        mixed.restore_checkpoint(checkpoint['id'], 'two/m.ipynb')
+        assert mixed.get('two/m.ipynb')['content'].cells[0].source == 'print(1)'
+
+        mixed.save({'type': 'directory'}, 'two/d')
+        mixed.rename('two/m.ipynb', 'two/d/m.ipynb')
+        mixed.rename('two/d', 'two/e')
+        assert len(mixed.list_checkpoints('two/e/m.ipynb')) == 2
+
+        mixed.delete('two/e/m.ipynb')
+        assert mixed.list_checkpoints('two/e/m.ipynb') == []
+    finally:
+        shutil.rmtree(root_dir)
+        shutil.rmtree(store_dir)
+
+
+def test_checkpoints_class_default():
+    root_dir = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'one', 'contents': FILE_MANAGER}]
+        config = Config({
+            'FileContentsManager': {'root_dir': root_dir},
+            'MixedContentsManager': {'filesystem_scheme': scheme},
+        })
+        mixed = MixedContentsManager(config=config)
+        assert mixed.checkpoints_class is Checkpoints
+        config.MixedContentsManager.checkpoints_class = ContentAddressedCheckpoints
+        assert MixedContentsManager(config=config).checkpoints_class is ContentAddressedCheckpoints
+    finally:
+        shutil.rmtree(root_dir)
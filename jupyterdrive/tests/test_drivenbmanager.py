@@ -0,0 +1,181 @@
+from __future__ import print_function, absolute_import
+
+import socket
+
+import nbformat
+from nbformat.v4 import new_notebook, new_code_cell
+from tornado.web import HTTPError
+from traitlets.config import Config
+
+from jupyterdrive import drivenbmanager
+from jupyterdrive.drivenbmanager import DriveContentsManager
+from jupyterdrive.mixednbmanager import MixedContentsManager
+
+from fakedrive import FakeDrive, serve_in_thread
+
+
+def serve():
+    drive = FakeDrive()
+    url, stop = serve_in_thread(drive)
+    return drive, url, stop
+
+
+def manager(url, **kwargs):
+    return DriveContentsManager(access_token='token', api_url=url, **kwargs)
+
+
+def test_notebooks_files_and_directories():
+    drive, url, stop = serve()
+    try:
+        cm = manager(url)
+        cm.save({'type': 'directory'}, 'a')
+        nb = new_notebook(cells=[new_code_cell('print(1)')])
+        model = cm.save({'type': 'notebook', 'content': nb}, 'a/n.ipynb')
+        assert model['type'] == 'notebook'
+        assert cm.file_exists('a/n.ipynb')
+        assert cm.dir_exists('a')
+        assert not cm.dir_exists('a/n.ipynb')
+        assert not cm.file_exists('a/missing')
+
+        loaded = cm.get('a/n.ipynb')
+        assert loaded['content'].cells[0].source == 'print(1)'
+        assert loaded['last_modified'] is not None
+
+        cm.save({'type': 'file', 'format': 'base64', 'content': '//4A'}, 'a/b.bin')
+        assert cm.get('a/b.bin')['content'] == '//4A'
+        assert cm.get('a/b.bin')['format'] == 'base64'
+
+        listing = cm.get('a')
+        assert sorted(m['name'] for m in listing['content']) == ['b.bin', 'n.ipynb']
+
+        cm.rename('a/b.bin', 'c.bin')
+        assert not cm.file_exists('a/b.bin')
+        assert cm.get('c.bin', type='file', format='base64')['content'] == '//4A'
+
+        cm.delete('c.bin')
+        assert not cm.file_exists('c.bin')
+        try:
+            cm.get('c.bin')
+        except HTTPError as e:
+            assert e.status_code == 404
+        else:
+            raise AssertionError('deleted file still readable')
+    finally:
+        stop()
+
+
+def test_checkpoints_are_pinned_revisions():
+    drive, url, stop = serve()
+    try:
+        cm = manager(url)
+        cm.save({'type': 'file', 'format': 'text', 'content': 'one'}, 'f.txt')
+        checkpoint = cm.create_checkpoint('f.txt')
+        cm.save({'type': 'file', 'format': 'text', 'content': 'two'}, 'f.txt')
+        assert [c['id'] for c in cm.list_checkpoints('f.txt')] == [checkpoint['id']]
+        cm.restore_checkpoint(checkpoint['id'], 'f.txt')
+        assert cm.get('f.txt')['content'] == 'one'
+        cm.delete_checkpoint(checkpoint['id'], 'f.txt')
+        assert cm.list_checkpoints('f.txt') == []
+    finally:
+        stop()
+
+
+def test_shared_cache_and_keep_alive():
+    drive, url, stop = serve()
+    try:
+        drive.add('l1/l2/l3/deep.ipynb', nbformat.writes(new_notebook()))
+        first, second = manager(url), manager(url)
+        first.get('l1/l2/l3/deep.ipynb', content=False)
+        assert first.backend.cache is second.backend.cache
+        drive.reset_stats()
+        second.get('l1/l2/l3/deep.ipynb', content=False)
+        assert drive.stats['round_trips'] == 0
+
+        pool = first.backend.pool
+        opened = pool.stats()['connections_opened']
+        for i in range(5):
+            second.get('l1/l2/l3/deep.ipynb')
+        assert pool.stats()['connections_opened'] == opened
+    finally:
+        stop()
+        drivenbmanager._shared_pools.clear()
+
+
+def test_access_token_refresh():
+    drive, url, stop = serve()
+    try:
+        drive.add('f.txt', 'hello')
+        drive.access_token = 'current'
+        drive.refresh_token = 'refresh'
+        cm = manager(url, refresh_token='refresh', client_id='id', client_secret='secret',
+                     token_url=url + '/o/oauth2/token')
+        assert cm.get('f.txt')['content'] == 'hello'
+        assert cm.backend.access_token == drive.access_token != 'current'
+
+        provided = manager(url, token_provider=lambda: drive.access_token)
+        provided.backend.access_token = 'expired'
+        provided.save({'type': 'file', 'format': 'text', 'content': 'hi'}, 'g.txt')
+        assert provided.backend.access_token == drive.access_token
+
+        rejected = manager(url, refresh_token='revoked', token_url=url + '/o/oauth2/token')
+        try:
+            rejected.get('f.txt')
+        except HTTPError as e:
+            assert e.status_code == 401
+        else:
+            raise AssertionError('expired token accepted')
+    finally:
+        stop()
+        drivenbmanager._shared_pools.clear()
+
+
+class DroppedConnection(object):
+    """A kept-alive connection the server closed: requests get no response"""
+
+    def request(self, method, url, body=None, headers=None):
+        pass
+
+    def getresponse(self):
+        raise socket.error('connection reset by peer')
+
+    def close(self):
+        pass
+
+
+def test_pool_only_resends_idempotent_requests():
+    drive, url, stop = serve()
+    try:
+        pool = drivenbmanager._get_shared_pool(url, 10)
+        pool._idle.append(DroppedConnection())
+        status, _, _ = pool.request('GET', '/drive/v2/about')
+        assert status == 200
+
+        pool._idle.append(DroppedConnection())
+        drive.reset_stats()
+        try:
+            pool.request('POST', '/drive/v2/files', b'{}', {'Content-Type': 'application/json'})
+        except socket.error:
+            pass
+        else:
+            raise AssertionError('POST sent again')
+        assert drive.stats['round_trips'] == 0
+    finally:
+        stop()
+        drivenbmanager._shared_pools.clear()
+
+
+def test_mounted_in_mixed_manager():
+    drive, url, stop = serve()
+    try:
+        drive.add('shared/x.txt', 'hello')
+        c = Config()
+        c.DriveContentsManager.access_token = 'token'
+        c.DriveContentsManager.api_url = url
+        c.MixedContentsManager.filesystem_scheme = [
+            {'root': 'gdrive', 'contents': 'jupyterdrive.drivenbmanager.DriveContentsManager'},
+        ]
+        mixed = MixedContentsManager(config=c)
+        assert mixed.get('gdrive/shared/x.txt')['content'] == 'hello'
+        assert [m['name'] for m in mixed.get('gdrive/shared')['content']] == ['x.txt']
+    finally:
+        stop()
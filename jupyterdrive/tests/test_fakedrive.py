@@ -0,0 +1,71 @@
+from __future__ import print_function, absolute_import
+
+import json
+
+from fakedrive import FakeDrive, parse_fields, select_fields
+
+
+def request(drive, method, path, query=None, headers=None, body=b''):
+    status, response_headers, response_body = drive.handle(
+        method, path, query or {}, headers or {}, body)
+    if response_headers.get('Content-Type', '').startswith('application/json'):
+        return status, json.loads(response_body.decode('utf-8'))
+    return status, response_body
+
+
+def test_parse_and_select_fields():
+    spec = parse_fields('items(id,title),nextPageToken')
+    assert spec == {'items': {'id': None, 'title': None}, 'nextPageToken': None}
+    value = {'items': [{'id': 'a', 'title': 'b', 'x': 1}], 'kind': 'k'}
+    assert select_fields(value, spec) == {'items': [{'id': 'a', 'title': 'b'}]}
+
+
+def test_files_list_query_and_paging():
+    drive = FakeDrive()
+    folder = drive.add('a/b.ipynb', '{}')['parents'][0]['id']
+    for i in range(5):
+        drive.add('a/f%d.txt' % i, 'x')
+    q = "'%s' in parents and trashed = false" % folder
+    status, page = request(drive, 'GET', '/drive/v2/files', {'q': q, 'maxResults': '4'})
+    assert status == 200
+    assert len(page['items']) == 4
+    status, page = request(drive, 'GET', '/drive/v2/files',
+                           {'q': q, 'pageToken': page['nextPageToken']})
+    assert [f['title'] for f in page['items']] == ['f3.txt', 'f4.txt']
+    assert 'nextPageToken' not in page
+    status, children = request(drive, 'GET', '/drive/v2/files/%s/children' % folder)
+    assert len(children['items']) == 6
+
+
+def test_multipart_upload_revisions_and_range():
+    drive = FakeDrive('http://fake')
+    body = (b'--xx\r\nContent-Type: application/json\r\n\r\n{"title": "n.txt"}\r\n'
+            b'--xx\r\nContent-Type: text/plain\r\n\r\nhello world\r\n--xx--')
+    status, resource = request(drive, 'POST', '/upload/drive/v2/files',
+                               {'uploadType': 'multipart'},
+                               {'content-type': 'multipart/related; boundary=xx'}, body)
+    assert status == 200
+    assert resource['fileSize'] == '11'
+    drive._write(resource['id'], b'changed')
+    status, revisions = request(drive, 'GET', '/drive/v2/files/%s/revisions' % resource['id'])
+    assert len(revisions['items']) == 2
+    status, data = request(drive, 'GET', '/drive/v2/files/%s' % resource['id'],
+                           {'alt': 'media'}, {'range': 'bytes=0-3'})
+    assert (status, data) == (206, b'chan')
+
+
+def test_stats_count_batched_calls():
+    drive = FakeDrive()
+    file_id = drive.add('x.txt', 'x')['id']
+    drive.reset_stats()
+    body = ''.join('--b\r\nContent-Type: application/http\r\nContent-ID: <%d>\r\n\r\n'
+                   'GET /drive/v2/files/%s HTTP/1.1\r\n\r\n\r\n' % (i, file_id)
+                   for i in range(3)) + '--b--'
+    status, _ = request(drive, 'POST', '/batch/drive/v2', {},
+                        {'content-type': 'multipart/mixed; boundary=b'}, body.encode('utf-8'))
+    assert status == 200
+    assert drive.stats['round_trips'] == 1
+    assert drive.stats['api_calls'] == 3
+    status, error = request(drive, 'GET', '/drive/v2/files/missing')
+    assert status == 404
+    assert error['error']['errors'][0]['reason'] == 'notFound'
@@ -0,0 +1,74 @@
+from __future__ import print_function, absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+
+from jupyterdrive.handlers import MetadataBatchHandler
+from jupyterdrive.mixednbmanager import MixedContentsManager
+from tornado import gen, web
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.testing import bind_unused_port
+from traitlets.config import Config
+
+
+FILE_MANAGER = 'notebook.services.contents.filemanager.FileContentsManager'
+
+
+class BatchHandler(MetadataBatchHandler):
+
+    def get_current_user(self):
+        return 'user'
+
+
+def post_batches(contents_manager, bodies):
+    """Status code and body of the answers to POST requests of the batch handler"""
+    app = web.Application([('/metadata', BatchHandler)],
+                          contents_manager=contents_manager)
+    sock, port = bind_unused_port()
+    server = HTTPServer(app)
+    server.add_sockets([sock])
+
+    @gen.coroutine
+    def post_all():
+        client = AsyncHTTPClient()
+        answers = []
+        for body in bodies:
+            response = yield client.fetch('http://127.0.0.1:%d/metadata' % port,
+                                          method='POST', body=body, raise_error=False)
+            answers.append((response.code, response.body))
+        raise gen.Return(answers)
+
+    try:
+        return IOLoop.current().run_sync(post_all, timeout=10)
+    finally:
+        server.stop()
+
+
+def test_metadata_batch_handler():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER}]
+        mixed = MixedContentsManager(config=Config(
+            {'FileContentsManager': {'root_dir': tmp},
+             'MixedContentsManager': {'filesystem_scheme': scheme}}))
+        with open(os.path.join(tmp, 'a.txt'), 'w') as f:
+            f.write('hi')
+
+        answers = post_batches(mixed, [
+            json.dumps({'paths': ['local/a.txt', 'local/b.txt']}),
+            json.dumps({'paths': [1]}),
+            json.dumps({'paths': ['local/a.txt', None]}),
+            json.dumps({'paths': 'local/a.txt'}),
+            '{',
+        ])
+        code, body = answers[0]
+        assert code == 200
+        results = json.loads(body.decode('utf-8'))['results']
+        assert [r['exists'] for r in results] == [True, False]
+        assert [code for code, body in answers[1:]] == [400, 400, 400, 400]
+    finally:
+        shutil.rmtree(tmp)
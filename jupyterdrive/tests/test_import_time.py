@@ -0,0 +1,48 @@
+from __future__ import print_function, absolute_import
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+
+# Only needed to install/activate the extension; the import time of the
+# modules is measured by benchmarks/bench_import.py.
+INSTALL_MODULES = ('IPython', 'IPython.paths', 'notebook.nbextensions',
+                   'traitlets.config.loader', 'jupyter_core.paths')
+
+# What the contents managers of the notebook server import anyway.
+NOTEBOOK_CONTENTS = ('notebook.services.contents.manager',
+                     'notebook.services.contents.filemanager',
+                     'notebook.services.contents.largefilemanager')
+
+NEW_MODULES = """
+import json, sys
+for module in sys.argv[2:]:
+    __import__(module)
+before = set(sys.modules)
+__import__(sys.argv[1])
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+def imported_by(module, *already):
+    """Modules imported by `module` in a fresh interpreter, after the `already` ones"""
+    output = subprocess.check_output(
+        [sys.executable, '-c', NEW_MODULES, module] + list(already),
+        universal_newlines=True)
+    return set(json.loads(output))
+
+
+def test_package_does_not_import_install_machinery():
+    modules = imported_by('jupyterdrive')
+    for name in INSTALL_MODULES:
+        assert name not in modules
+
+
+@pytest.mark.parametrize('manager', ['mixednbmanager', 'clientsidenbmanager'])
+def test_manager_does_not_import_install_machinery(manager):
+    modules = imported_by('jupyterdrive.' + manager, *NOTEBOOK_CONTENTS)
+    for name in INSTALL_MODULES:
+        assert name not in modules
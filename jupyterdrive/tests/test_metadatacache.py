@@ -0,0 +1,130 @@
+from __future__ import print_function, absolute_import
+
+import shutil
+import tempfile
+import time
+
+from jupyterdrive.metadatacache import MetadataCachingManager
+from jupyterdrive.clientsidenbmanager import ClientSideContentsManager
+from jupyterdrive.mixednbmanager import MixedContentsManager
+from tornado import gen
+from traitlets.config import Config
+
+
+FILE_MANAGER = 'notebook.services.contents.filemanager.FileContentsManager'
+
+
+class CoroutineContentsManager(ClientSideContentsManager):
+
+    @gen.coroutine
+    def get(self, path, content=True, type=None, format=None):
+        raise gen.Return({'type': 'file', 'path': path})
+
+
+class Counting(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.exists = set()
+
+    def file_exists(self, path=''):
+        self.calls += 1
+        return path in self.exists
+
+    def save(self, model, path):
+        self.exists.add(path)
+        return model
+
+    def delete(self, path):
+        self.exists.discard(path)
+
+
+def test_ttl_and_counters():
+    man = Counting()
+    cached = MetadataCachingManager(man, ttl=0.05)
+    assert not cached.file_exists('a')
+    assert not cached.file_exists('/a/')
+    assert man.calls == 1
+    time.sleep(0.1)
+    assert not cached.file_exists('a')
+    assert man.calls == 2
+    assert cached.stats() == {'hits': 1, 'misses': 2, 'evictions': 0, 'size': 1}
+
+
+def test_lru_eviction():
+    man = Counting()
+    cached = MetadataCachingManager(man, maxsize=2)
+    cached.file_exists('a')
+    cached.file_exists('b')
+    cached.file_exists('a')
+    cached.file_exists('c')
+    assert cached.stats()['evictions'] == 1
+    calls = man.calls
+    cached.file_exists('a')
+    assert man.calls == calls
+    cached.file_exists('b')
+    assert man.calls == calls + 1
+
+
+def test_invalidation():
+    man = Counting()
+    cached = MetadataCachingManager(man)
+    assert not cached.file_exists('dir/a')
+    cached.file_exists('dir')
+    cached.file_exists('dir/sub/b')
+    cached.file_exists('other')
+    cached.save({}, 'dir/a')
+    assert cached.file_exists('dir/a')
+    assert cached.stats()['size'] == 3
+    cached.delete('dir')
+    assert cached.stats()['size'] == 1
+
+
+def test_cache_through_mixed_manager():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER, 'cache': {'ttl': 60}},
+                  {'root': 'plain', 'contents': FILE_MANAGER}]
+        config = Config({'FileContentsManager': {'root_dir': tmp},
+                         'MixedContentsManager': {'filesystem_scheme': scheme}})
+        mixed = MixedContentsManager(config=config)
+        assert not mixed.file_exists('local/a.txt')
+        mixed.save({'type': 'file', 'format': 'text', 'content': 'hi'}, 'local/a.txt')
+        assert mixed.file_exists('local/a.txt')
+        assert mixed.get('local/a.txt', content=False)['name'] == 'a.txt'
+
+        mixed.rename('local/a.txt', 'local/b.txt')
+        assert not mixed.file_exists('local/a.txt')
+        mixed.update({'path': 'plain/c.txt'}, 'local/b.txt')
+        assert not mixed.file_exists('local/b.txt')
+        assert mixed.file_exists('local/c.txt')
+
+        # destinations of transfers from another mount point, seeded in the
+        # cache as missing, are invalidated.
+        mixed.save({'type': 'file', 'format': 'text', 'content': 'hi'}, 'plain/d.txt')
+        assert not mixed.file_exists('local/moved.txt')
+        assert not mixed.file_exists('local/copied.txt')
+        mixed.rename('plain/d.txt', 'local/moved.txt')
+        mixed.copy('plain/c.txt', 'local/copied.txt')
+        assert mixed.file_exists('local/moved.txt')
+        assert mixed.get('local/moved.txt', content=False)['name'] == 'moved.txt'
+        assert mixed.file_exists('local/copied.txt')
+        assert mixed.get('local/copied.txt', content=False)['name'] == 'copied.txt'
+
+        assert list(mixed.cache_stats()) == ['local']
+        assert mixed.cache_stats()['local']['misses'] > 0
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_cache_rejected_for_coroutine_manager():
+    scheme = [{'root': 'coro', 'contents': __name__ + '.CoroutineContentsManager',
+               'cache': True}]
+    mixed = MixedContentsManager(config=Config(
+        {'MixedContentsManager': {'filesystem_scheme': scheme}}))
+    try:
+        mixed.managers['coro']
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('the cache should be rejected for coroutine managers')
@@ -0,0 +1,83 @@
+from __future__ import print_function, absolute_import
+
+import shutil
+import tempfile
+
+from jupyterdrive.metrics import DispatchMetrics
+from jupyterdrive.mixednbmanager import MixedContentsManager
+from tornado import gen
+from tornado.ioloop import IOLoop
+from traitlets.config import Config
+
+
+FILE_MANAGER = 'notebook.services.contents.filemanager.FileContentsManager'
+
+
+def test_record_and_snapshot():
+    metrics = DispatchMetrics(buckets=(0.1, 1.0))
+    metrics.record('local', 'get', 0.05)
+    metrics.record('local', 'get', 0.5, error=True)
+    metrics.record('local', 'get', 5)
+    stats = metrics.snapshot()['local']['get']
+    assert stats['count'] == 3
+    assert stats['errors'] == 1
+    assert stats['seconds'] == 5.55
+    assert stats['buckets'] == [(0.1, 1), (1.0, 2), (float('inf'), 3)]
+
+
+def test_prometheus_text():
+    metrics = DispatchMetrics(buckets=(0.1,))
+    metrics.record('team/"x"', 'save', 0.05)
+    text = metrics.prometheus_text()
+    assert '# TYPE jupyterdrive_dispatch_seconds histogram' in text
+    assert 'jupyterdrive_dispatch_seconds_bucket{mount="team/\\"x\\"",method="save",le="0.1"} 1' in text
+    assert 'jupyterdrive_dispatch_seconds_bucket{mount="team/\\"x\\"",method="save",le="+Inf"} 1' in text
+    assert 'jupyterdrive_dispatch_seconds_count{mount="team/\\"x\\"",method="save"} 1' in text
+    assert 'jupyterdrive_dispatch_errors_total{mount="team/\\"x\\"",method="save"} 0' in text
+
+
+def test_instrument_coroutine():
+    metrics = DispatchMetrics()
+
+    @gen.coroutine
+    def get(path):
+        yield gen.sleep(0.01)
+        raise ValueError(path)
+
+    timed = metrics.instrument('drive', 'get', get)
+    assert gen.is_coroutine_function(timed)
+
+    @gen.coroutine
+    def call():
+        try:
+            yield timed('a')
+        except ValueError:
+            pass
+    IOLoop.current().run_sync(call)
+    stats = metrics.snapshot()['drive']['get']
+    assert stats['count'] == 1
+    assert stats['errors'] == 1
+    assert stats['seconds'] >= 0.01
+
+
+def test_mixed_manager_metrics():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER}]
+        config = Config({'FileContentsManager': {'root_dir': tmp},
+                         'MixedContentsManager': {'filesystem_scheme': scheme}})
+        assert MixedContentsManager(config=config).dispatch_metrics is None
+
+        config.MixedContentsManager.instrument_dispatch = True
+        mixed = MixedContentsManager(config=config)
+        mixed.dir_exists('local')
+        mixed.dir_exists('local/sub')
+        try:
+            mixed.get('local/missing.txt')
+        except Exception:
+            pass
+        snapshot = mixed.dispatch_metrics.snapshot()
+        assert snapshot['local']['dir_exists']['count'] == 2
+        assert snapshot['local']['get']['errors'] == 1
+    finally:
+        shutil.rmtree(tmp)
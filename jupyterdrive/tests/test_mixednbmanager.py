@@ -0,0 +1,580 @@
+from __future__ import print_function, absolute_import
+
+import base64
+import datetime
+import gc
+import json
+import os
+import tempfile
+import shutil
+import time
+
+import nbformat
+from nbformat.v4 import new_notebook, new_code_cell, new_output
+
+from jupyterdrive.clientsidenbmanager import ClientSideContentsManager
+from jupyterdrive.mixednbmanager import (MixedContentsManager, MountRouter,
+                                        AsyncMixedContentsManager)
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.web import HTTPError
+from traitlets.config import Config
+
+
+FILE_MANAGER = 'notebook.services.contents.filemanager.FileContentsManager'
+LARGE_FILE_MANAGER = 'notebook.services.contents.largefilemanager.LargeFileManager'
+
+
+class Dummy(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def get(self, path, **kwargs):
+        return (self.name, path)
+
+
+class SlowContentsManager(ClientSideContentsManager):
+
+    calls = 0
+
+    def get(self, path, content=True, type=None, format=None):
+        SlowContentsManager.calls += 1
+        time.sleep(1)
+        return {'type': 'directory', 'writable': True}
+
+
+class CountingContentsManager(ClientSideContentsManager):
+
+    instances = 0
+
+    def __init__(self, **kwargs):
+        time.sleep(0.1)
+        CountingContentsManager.instances += 1
+        super(CountingContentsManager, self).__init__(**kwargs)
+
+
+class BatchContentsManager(ClientSideContentsManager):
+
+    batches = []
+
+    def get_metadata_batch(self, paths):
+        BatchContentsManager.batches.append(paths)
+        return [{'exists': True, 'model': {'path': path}} for path in paths]
+
+
+class SlowCoroutineContentsManager(ClientSideContentsManager):
+
+    @gen.coroutine
+    def get(self, path, content=True, type=None, format=None):
+        yield gen.sleep(0.5)
+        raise gen.Return({'type': 'file', 'path': path})
+
+    @gen.coroutine
+    def save(self, model, path):
+        yield gen.sleep(0.5)
+        raise gen.Return(dict(model, path=path))
+
+
+class MemoryCoroutineContentsManager(ClientSideContentsManager):
+    """Coroutine contents manager keeping files in memory, in a single directory"""
+
+    def __init__(self, **kwargs):
+        super(MemoryCoroutineContentsManager, self).__init__(**kwargs)
+        self.files = {}
+        self.modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def dir_exists(self, path):
+        return path == ''
+
+    def file_exists(self, path=''):
+        return path in self.files
+
+    def exists(self, path):
+        return self.dir_exists(path) or self.file_exists(path)
+
+    def _model(self, path, content):
+        model = {'name': path, 'path': path, 'type': 'file', 'writable': True,
+                 'created': self.modified, 'last_modified': self.modified,
+                 'mimetype': None, 'content': None, 'format': None}
+        if content:
+            model.update(content=self.files[path], format='base64')
+        return model
+
+    @gen.coroutine
+    def get(self, path, content=True, type=None, format=None):
+        # needs a running IOLoop.
+        yield gen.moment
+        if path == '':
+            model = dict(self._model('', False), type='directory')
+            if content:
+                model.update(content=[self._model(p, False) for p in self.files],
+                             format='json')
+            raise gen.Return(model)
+        if path not in self.files:
+            raise HTTPError(404)
+        raise gen.Return(self._model(path, content))
+
+    @gen.coroutine
+    def save(self, model, path):
+        yield gen.moment
+        self.files[path] = model['content']
+        raise gen.Return(self._model(path, False))
+
+    @gen.coroutine
+    def delete(self, path):
+        yield gen.moment
+        del self.files[path]
+
+
+class SlowBlockingContentsManager(ClientSideContentsManager):
+    closed = False
+
+    def get(self, path, content=True, type=None, format=None):
+        time.sleep(0.5)
+        return {'type': 'file', 'path': path}
+
+    def close(self):
+        self.closed = True
+
+
+def make_manager(scheme, root_dir, klass=MixedContentsManager, **options):
+    options['filesystem_scheme'] = scheme
+    config = Config({'FileContentsManager': {'root_dir': root_dir},
+                     'MixedContentsManager': options})
+    return klass(config=config)
+
+
+def test_router_resolve():
+    router = MountRouter({'local': Dummy('local'), 'gdrive': Dummy('gdrive')})
+    assert router.resolve('local/a/b.ipynb') == ('local', 'a/b.ipynb')
+    assert router.resolve('/gdrive/') == ('gdrive', '')
+    assert router.resolve('gdrive') == ('gdrive', '')
+    assert router.resolve('localx/a') == (None, 'localx/a')
+    assert router.resolve('') == (None, '')
+
+
+def test_router_nested_longest_prefix():
+    router = MountRouter({'team': Dummy('team'),
+                          'team/shared': Dummy('shared'),
+                          'a/b/c': Dummy('abc')})
+    assert router.resolve('team/shared/x.ipynb') == ('team/shared', 'x.ipynb')
+    assert router.resolve('team/shared') == ('team/shared', '')
+    assert router.resolve('team/other/x.ipynb') == ('team', 'other/x.ipynb')
+    assert router.resolve('a/b/c/d') == ('a/b/c', 'd')
+    assert router.resolve('a/b') == (None, 'a/b')
+    assert set(router.virtual_dirs) == set(['', 'team', 'a', 'a/b'])
+    assert router.virtual_dirs['team'] == set(['shared'])
+
+
+def test_router_caches_bound_methods():
+    router = MountRouter({'team/shared': Dummy('shared')})
+    meth, path = router.route('get', '/team/shared/nb.ipynb')
+    assert meth(path) == ('shared', 'nb.ipynb')
+    assert router.route('get', 'team/shared/other')[0] is meth
+    assert router.route('get', 'elsewhere') == (None, 'elsewhere')
+
+
+def test_dispatch_nested_mounts():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER},
+                  {'root': 'team/shared', 'contents': FILE_MANAGER}]
+        mixed = make_manager(scheme, tmp)
+        assert mixed.dir_exists('')
+        assert mixed.dir_exists('team')
+        assert not mixed.file_exists('team')
+        assert not mixed.is_hidden('team')
+
+        mixed.save({'type': 'file', 'format': 'text', 'content': 'hi'},
+                   'team/shared/a.txt')
+        assert mixed.file_exists('local/a.txt')
+        model = mixed.get('team/shared/a.txt')
+        assert model['content'] == 'hi'
+        assert model['path'] == 'a.txt'
+
+        mixed.rename('team/shared/a.txt', 'team/shared/b.txt')
+        assert mixed.file_exists(path='local/b.txt')
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_get_virtual_root():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER},
+                  {'root': 'team/shared', 'contents': FILE_MANAGER},
+                  {'root': 'slow', 'contents': __name__ + '.SlowContentsManager'}]
+        mixed = make_manager(scheme, tmp, root_listing_timeout=0.2,
+                             root_listing_inline=True)
+        with open(os.path.join(tmp, 'a.txt'), 'w') as f:
+            f.write('hi')
+
+        start = time.time()
+        model = mixed.get('')
+        assert time.time() - start < 1
+        assert model['type'] == 'directory'
+        assert model['format'] == 'json'
+        assert [c['path'] for c in model['content']] == ['local', 'slow', 'team']
+        local, slow, team = model['content']
+        assert local['last_modified'] is not None
+        assert local['writable']
+        assert [c['path'] for c in local['content']] == ['local/a.txt']
+        assert slow['last_modified'] is None
+        assert team['content'] is None
+
+        team = mixed.get('team')
+        assert [c['path'] for c in team['content']] == ['team/shared']
+        assert mixed.get('', content=False)['content'] is None
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_virtual_root_skips_busy_mounts():
+    scheme = [{'root': 'slow', 'contents': __name__ + '.SlowContentsManager'}]
+    mixed = make_manager(scheme, '.', root_listing_timeout=0.2)
+    SlowContentsManager.calls = 0
+    assert mixed.get('')['content'][0]['writable'] is False
+    # the first listing still runs: no second call, nothing known yet.
+    assert mixed.get('')['content'][0]['writable'] is False
+    assert SlowContentsManager.calls == 1
+
+    time.sleep(1)
+    # times out again, the last answer is used.
+    assert mixed.get('')['content'][0]['writable'] is True
+    assert SlowContentsManager.calls == 2
+
+
+def test_lazy_managers():
+    from concurrent.futures import ThreadPoolExecutor
+    counting = __name__ + '.CountingContentsManager'
+    scheme = [{'root': 'one', 'contents': counting},
+              {'root': 'two', 'contents': counting},
+              {'root': 'missing', 'contents': 'no.such.Manager'}]
+    CountingContentsManager.instances = 0
+    mixed = make_manager(scheme, '.')
+    assert CountingContentsManager.instances == 0
+    assert mixed.dir_exists('')
+
+    pool = ThreadPoolExecutor(max_workers=4)
+    assert all(pool.map(mixed.file_exists, ['one/a'] * 4))
+    assert CountingContentsManager.instances == 1
+    assert list(mixed.managers.loaded()) == ['one']
+
+    CountingContentsManager.instances = 0
+    make_manager(scheme[:2], '.', lazy_managers=False)
+    assert CountingContentsManager.instances == 2
+
+
+def test_reload_scheme():
+    from concurrent.futures import ThreadPoolExecutor
+    counting = __name__ + '.CountingContentsManager'
+    blocking = __name__ + '.SlowBlockingContentsManager'
+    scheme = [{'root': 'one', 'contents': counting},
+              {'root': 'two', 'contents': counting},
+              {'root': 'slow', 'contents': blocking}]
+    mixed = make_manager(scheme, '.')
+    one = mixed.managers['one']
+    two = mixed.managers['two']
+    slow = mixed.managers['slow']
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    in_flight = pool.submit(mixed.get, 'slow/nb.ipynb')
+    time.sleep(0.1)
+    mixed.filesystem_scheme = [
+        {'root': 'one', 'contents': counting},
+        {'root': 'two', 'contents': counting, 'cache': True},
+        {'root': 'three', 'contents': counting}]
+    # calls already running on a removed mount point complete, then its
+    # manager is closed.
+    assert not slow.closed
+    assert in_flight.result()['path'] == 'nb.ipynb'
+    for _ in range(20):
+        if slow.closed:
+            break
+        time.sleep(0.05)
+    assert slow.closed
+
+    assert sorted(mixed.managers) == ['one', 'three', 'two']
+    assert mixed.managers['one'] is one
+    assert mixed.managers['two'] is not two
+    assert mixed.dir_exists('three/a')
+    assert not mixed.dir_exists('slow')
+
+    try:
+        mixed.filesystem_scheme = [{'root': 'one', 'contents': counting},
+                                   {'root': 'one/', 'contents': counting}]
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('duplicated mount points should be rejected')
+    assert sorted(mixed.managers) == ['one', 'three', 'two']
+    assert [e['root'] for e in mixed.filesystem_scheme] == ['one', 'two', 'three']
+
+
+def test_reload_scheme_from_config_file():
+    tmp = tempfile.mkdtemp()
+    try:
+        counting = __name__ + '.CountingContentsManager'
+        config_file = os.path.join(tmp, 'jupyter_notebook_config.json')
+        def write(scheme):
+            with open(config_file, 'w') as f:
+                json.dump({'MixedContentsManager': {'filesystem_scheme': scheme}}, f)
+        write([{'root': 'one', 'contents': counting}])
+        mixed = make_manager([], tmp, scheme_config_file=config_file)
+        assert list(mixed.managers) == ['one']
+
+        write([{'root': 'two', 'contents': counting}])
+        os.utime(config_file, (0, 0))
+        mixed._check_scheme_file()
+        assert list(mixed.managers) == ['two']
+
+        # invalid or malformed schemes are not applied.
+        invalid = [[{'root': 'one', 'contents': counting},
+                    {'root': 'one', 'contents': counting}],
+                   'one',
+                   ['one'],
+                   [{'contents': counting}],
+                   [{'root': 1, 'contents': counting}],
+                   [{'root': 'one'}]]
+        for mtime, scheme in enumerate(invalid, 1):
+            write(scheme)
+            os.utime(config_file, (mtime, mtime))
+            mixed._check_scheme_file()
+            assert list(mixed.managers) == ['two']
+            assert [e['root'] for e in mixed.filesystem_scheme] == ['two']
+
+        poller = mixed._scheme_poller
+        assert poller.is_running()
+        mixed.close()
+        assert not poller.is_running()
+
+        # the poller of a manager that was not closed stops once it is gone.
+        write([{'root': 'one', 'contents': counting}])
+        mixed = make_manager([], tmp, scheme_config_file=config_file)
+        poller = mixed._scheme_poller
+        del mixed
+        gc.collect()
+        poller.callback()
+        assert not poller.is_running()
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_get_metadata_batch():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER},
+                  {'root': 'team/drive', 'contents': __name__ + '.BatchContentsManager'}]
+        mixed = make_manager(scheme, tmp)
+        with open(os.path.join(tmp, 'a.txt'), 'w') as f:
+            f.write('hi')
+        BatchContentsManager.batches = []
+        paths = ['team/drive/x.ipynb', 'local/a.txt', 'team', 'nowhere',
+                 'local/missing.txt', '/team/drive/y/']
+        results = mixed.get_metadata_batch(paths)
+        assert [r['path'] for r in results] == paths
+        assert [r['exists'] for r in results] == [True, True, True, False, False, True]
+        assert results[0]['model'] == {'path': 'x.ipynb'}
+        assert results[1]['model']['name'] == 'a.txt'
+        assert results[2]['model']['type'] == 'directory'
+        assert 'error' not in results[4]
+        assert BatchContentsManager.batches == [['x.ipynb', 'y']]
+        try:
+            mixed.get_metadata_batch(['local/a.txt', None])
+        except TypeError:
+            pass
+        else:
+            raise AssertionError('paths that are not strings should be rejected')
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_rename_across_mounts():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'one', 'contents': FILE_MANAGER},
+                  {'root': 'two/sub', 'contents': FILE_MANAGER}]
+        mixed = make_manager(scheme, tmp)
+        mixed.save({'type': 'directory'}, 'one/dir')
+        mixed.save({'type': 'file', 'format': 'text', 'content': 'hi'},
+                   'one/dir/a.txt')
+        mixed.rename('one/dir', 'two/sub/moved')
+        assert not mixed.dir_exists('one/dir')
+        assert mixed.get('two/sub/moved/a.txt')['content'] == 'hi'
+
+        model = mixed.update({'path': 'one/back'}, 'two/sub/moved')
+        assert model['type'] == 'directory'
+        assert mixed.file_exists('one/back/a.txt')
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_copy_across_mounts_in_chunks():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'one', 'contents': LARGE_FILE_MANAGER},
+                  {'root': 'two', 'contents': LARGE_FILE_MANAGER}]
+        mixed = make_manager(scheme, tmp, transfer_chunk_size=10)
+        os.mkdir(os.path.join(tmp, 'dest'))
+        data = os.urandom(95)
+        with open(os.path.join(tmp, 'blob.bin'), 'wb') as f:
+            f.write(data)
+
+        saves = []
+        dest = mixed.managers['two']
+        save = dest.save
+        dest.save = lambda model, path: saves.append(model.get('chunk')) or save(model, path)
+
+        model = mixed.copy('one/blob.bin', 'two/dest')
+        assert model['path'] == 'dest/blob.bin'
+        assert saves == [1, 2, 3, 4, 5, 6, 7, 8, 9, -1]
+        content = mixed.get('two/dest/blob.bin', format='base64')['content']
+        assert base64.b64decode(content) == data
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_transfer_rolls_back_on_failure():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'one', 'contents': LARGE_FILE_MANAGER},
+                  {'root': 'two', 'contents': LARGE_FILE_MANAGER}]
+        mixed = make_manager(scheme, tmp, transfer_chunk_size=10)
+        with open(os.path.join(tmp, 'blob.bin'), 'wb') as f:
+            f.write(os.urandom(95))
+
+        dest = mixed.managers['two']
+        save = dest.save
+        def failing_save(model, path):
+            if model.get('chunk') == 3:
+                raise IOError('connection lost')
+            return save(model, path)
+        dest.save = failing_save
+
+        try:
+            mixed.rename('one/blob.bin', 'two/moved.bin')
+        except IOError:
+            pass
+        else:
+            raise AssertionError('transfer should have failed')
+        assert not os.path.exists(os.path.join(tmp, 'moved.bin'))
+        assert os.path.exists(os.path.join(tmp, 'blob.bin'))
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_async_dispatch_no_head_of_line_blocking():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER},
+                  {'root': 'coro', 'contents': __name__ + '.SlowCoroutineContentsManager'},
+                  {'root': 'blocking', 'contents': __name__ + '.SlowBlockingContentsManager'}]
+        mixed = make_manager(scheme, tmp, klass=AsyncMixedContentsManager)
+        with open(os.path.join(tmp, 'a.txt'), 'w') as f:
+            f.write('hi')
+        # metadata checks stay synchronous
+        assert mixed.dir_exists('local')
+        assert mixed.get('local/a.txt', content=False)['name'] == 'a.txt'
+
+        ticks = []
+        finished = []
+
+        @gen.coroutine
+        def request(path):
+            model = yield mixed.get(path)
+            finished.append(path)
+            raise gen.Return(model)
+
+        @gen.coroutine
+        def ticker():
+            while len(finished) < 12:
+                ticks.append(time.time())
+                yield gen.sleep(0.05)
+
+        @gen.coroutine
+        def load():
+            paths = ['coro/nb%d.ipynb' % i for i in range(5)]
+            paths += ['blocking/nb%d.ipynb' % i for i in range(5)]
+            paths += ['local/a.txt', 'local/a.txt']
+            results = yield [request(path) for path in paths] + [ticker()]
+            saved = yield mixed.save({'type': 'file'}, 'coro/b.txt')
+            raise gen.Return((results, saved))
+
+        start = time.time()
+        (results, saved) = IOLoop.current().run_sync(load, timeout=10)
+        elapsed = time.time() - start
+
+        # slow mounts run concurrently, not one after the other.
+        assert elapsed < 2, elapsed
+        # the fast local mount is not stuck behind the slow ones.
+        assert finished[:2] == ['local/a.txt', 'local/a.txt']
+        assert results[0]['path'] == 'nb0.ipynb'
+        assert results[10]['content'] == 'hi'
+        assert saved['path'] == 'b.txt'
+        # the IOLoop kept running while the blocking mount was busy.
+        assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.3
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_async_transfer_with_coroutine_mount():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER},
+                  {'root': 'coro', 'contents': __name__ + '.MemoryCoroutineContentsManager'}]
+        mixed = make_manager(scheme, tmp, klass=AsyncMixedContentsManager)
+        with open(os.path.join(tmp, 'a.txt'), 'w') as f:
+            f.write('hi')
+        coro = mixed.managers['coro']
+
+        @gen.coroutine
+        def run():
+            to_coro = yield mixed.copy('local/a.txt', 'coro/')
+            to_local = yield mixed.copy('coro/a.txt', 'local/')
+            moved = yield mixed.rename('coro/a.txt', 'local/b.txt')
+            yield mixed.copy('local/b.txt', 'coro/c.txt')
+            root = yield mixed.get('')
+            raise gen.Return((to_coro, to_local, moved, root))
+
+        to_coro, to_local, moved, root = IOLoop.current().run_sync(run, timeout=10)
+        assert to_coro['path'] == 'a.txt'
+        assert to_local['path'] == 'a-Copy1.txt'
+        assert moved['path'] == 'b.txt'
+        for name in ('a-Copy1.txt', 'b.txt'):
+            with open(os.path.join(tmp, name)) as f:
+                assert f.read() == 'hi'
+        assert sorted(coro.files) == ['c.txt']
+        assert mixed._router.in_flight() == 0
+
+        # the virtual root lists the coroutine mount point like the others.
+        mount = dict((child['name'], child) for child in root['content'])['coro']
+        assert mount['writable']
+        assert mount['last_modified'] == coro.modified
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_async_contents_manager_helpers():
+    tmp = tempfile.mkdtemp()
+    try:
+        scheme = [{'root': 'local', 'contents': FILE_MANAGER}]
+        config = Config({'FileContentsManager': {'root_dir': tmp},
+                         'NotebookNotary': {'db_file': ':memory:'},
+                         'MixedContentsManager': {'filesystem_scheme': scheme}})
+        mixed = AsyncMixedContentsManager(config=config)
+        nb = new_notebook(cells=[new_code_cell('display(x)', outputs=[
+            new_output('display_data', data={'text/html': '<b>x</b>'})])])
+
+        @gen.coroutine
+        def run():
+            untitled = yield mixed.new_untitled('local', type='notebook')
+            yield mixed.new({'type': 'notebook', 'content': nb}, 'local/nb.ipynb')
+            yield mixed.trust_notebook('local/nb.ipynb')
+            raise gen.Return(untitled)
+
+        untitled = IOLoop.current().run_sync(run, timeout=10)
+        assert untitled['path'] == 'Untitled.ipynb'
+        assert mixed.notary.check_signature(nbformat.read(os.path.join(tmp, 'nb.ipynb'), 4))
+    finally:
+        shutil.rmtree(tmp)
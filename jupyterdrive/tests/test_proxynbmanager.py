@@ -0,0 +1,141 @@
+from __future__ import print_function, absolute_import
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from jupyterdrive.mixednbmanager import AsyncMixedContentsManager, MixedContentsManager
+from jupyterdrive.proxynbmanager import ContentsBackend, ProxyContentsManager
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.web import HTTPError
+from traitlets.config import Config
+
+
+class InMemoryBackend(ContentsBackend):
+    """Local stand-in for a remote backend, with a configurable latency"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.files = {}
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, name):
+        with self._lock:
+            self.calls.append(name)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+
+    def get(self, path, content=True, type=None, format=None):
+        self._enter('get')
+        if path not in self.files:
+            raise HTTPError(404, 'No such file: %s' % path)
+        return {'name': path.rsplit('/', 1)[-1], 'path': path, 'type': 'file',
+                'content': self.files[path] if content else None,
+                'metadata': {'tags': []}}
+
+    def save(self, model, path):
+        self._enter('save')
+        self.files[path] = model['content']
+        return self.get(path, content=False)
+
+    def delete_file(self, path):
+        self._enter('delete_file')
+        del self.files[path]
+
+    def rename_file(self, old_path, new_path):
+        self._enter('rename_file')
+        self.files[new_path] = self.files.pop(old_path)
+
+    def file_exists(self, path):
+        self._enter('file_exists')
+        return path in self.files
+
+    def dir_exists(self, path):
+        self._enter('dir_exists')
+        return path == ''
+
+
+def test_forwarding():
+    manager = ProxyContentsManager(backend=InMemoryBackend())
+    manager.save({'type': 'file', 'content': 'hi'}, '/a.txt')
+    assert manager.file_exists('a.txt')
+    assert manager.get('a.txt')['content'] == 'hi'
+    manager.rename('a.txt', 'b.txt')
+    assert not manager.file_exists('a.txt')
+    manager.delete('b.txt')
+    assert not manager.file_exists('b.txt')
+    assert manager.list_checkpoints('b.txt') == []
+    try:
+        manager.get('b.txt')
+    except HTTPError as e:
+        assert e.status_code == 404
+    else:
+        raise AssertionError('get of a missing file should fail')
+
+
+def test_coalescing():
+    backend = InMemoryBackend(delay=0.2)
+    backend.files['a.txt'] = 'hi'
+    manager = ProxyContentsManager(backend=backend)
+    pool = ThreadPoolExecutor(max_workers=8)
+    models = list(pool.map(lambda _: manager.get('a.txt'), range(8)))
+    assert backend.calls == ['get']
+    assert all(model['content'] == 'hi' for model in models)
+    # callers get their own copy of the model.
+    models[0]['content'] = 'changed'
+    models[0]['metadata']['tags'].append('changed')
+    assert models[1]['content'] == 'hi'
+    assert models[1]['metadata'] == {'tags': []}
+
+
+def test_concurrency_cap():
+    backend = InMemoryBackend(delay=0.05)
+    config = Config({'ProxyContentsManager': {'max_concurrency': 2}})
+    manager = ProxyContentsManager(backend=backend, config=config)
+    pool = ThreadPoolExecutor(max_workers=8)
+    list(pool.map(lambda i: manager.file_exists('f%d' % i), range(8)))
+    assert len(backend.calls) == 8
+    assert backend.max_running == 2
+
+
+def test_mounted_in_mixed_manager():
+    scheme = [{'root': 'remote', 'contents': 'jupyterdrive.proxynbmanager.ProxyContentsManager'}]
+    config = Config({
+        'MixedContentsManager': {'filesystem_scheme': scheme},
+        'ProxyContentsManager': {'backend_class': __name__ + '.InMemoryBackend',
+                                 'backend_kwargs': {'delay': 0.01}},
+    })
+    mixed = MixedContentsManager(config=config)
+    mixed.save({'type': 'file', 'content': 'hi'}, 'remote/a.txt')
+    assert mixed.get('remote/a.txt')['content'] == 'hi'
+    assert mixed.managers['remote'].backend.delay == 0.01
+
+
+def test_mounted_in_async_mixed_manager():
+    scheme = [{'root': 'remote', 'contents': 'jupyterdrive.proxynbmanager.ProxyContentsManager'}]
+    config = Config({
+        'MixedContentsManager': {'filesystem_scheme': scheme},
+        'ProxyContentsManager': {'backend_class': __name__ + '.InMemoryBackend',
+                                 'backend_kwargs': {'delay': 0.2}},
+    })
+    mixed = AsyncMixedContentsManager(config=config)
+    mixed.managers['remote'].backend.files['a.txt'] = 'hi'
+
+    @gen.coroutine
+    def check():
+        # the backend calls run on the executor, the IOLoop is free meanwhile.
+        start = time.time()
+        future = mixed.get('remote/a.txt')
+        yield gen.sleep(0.01)
+        assert time.time() - start < 0.1
+        model = yield future
+        raise gen.Return(model)
+
+    assert IOLoop.current().run_sync(check)['content'] == 'hi'
@@ -0,0 +1,332 @@
+// Copyright (c) IPython Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+/**
+ * Persistent browser cache of the contents of Google Drive files, so that
+ * opening a file whose head revision did not change since it was last
+ * loaded or saved costs a metadata request instead of a download.
+ *
+ * Contents are stored in IndexedDB, one entry per file id holding the
+ * contents of a single revision, and are only returned for that revision.
+ * The total size of the cached contents is capped, and the least recently
+ * used entries are evicted first.  The cache is an optimization only:
+ * errors (e.g. IndexedDB being unavailable in private browsing) are logged
+ * and handled as cache misses.
+ *
+ * Each Google account has its own database, and the database of an account
+ * is deleted when the user signs out or switches to another account, so
+ * that the contents of files are not left behind in the browser.
+ */
+
+declare var indexedDB;
+declare var localStorage;
+
+/**
+ * Prefix of the names of the IndexedDB databases of the cache, which are
+ * followed by the account.
+ * @type {string}
+ */
+export var CONTENT_CACHE_DB_NAME = 'jupyterdrive-contents';
+
+/**
+ * Maximum total size of the cached contents, in characters.
+ * @type {number}
+ */
+export var CONTENT_CACHE_MAX_SIZE = 64 * 1024 * 1024;
+
+var DB_VERSION = 1;
+/* Object store of {id, revision, size, used}, indexed by `used`. */
+var ENTRIES = 'entries';
+/* Object store of {id, contents}, kept apart so that eviction does not
+ * read the contents. */
+var CONTENTS = 'contents';
+
+/**
+ * Promise of the completion of an IndexedDB transaction.
+ */
+var transaction_done = function(transaction):Promise<any> {
+    return new Promise(function(resolve, reject) {
+        transaction.oncomplete = function() { resolve(); };
+        transaction.onerror = transaction.onabort = function() {
+            reject(transaction.error);
+        };
+    });
+};
+
+var warn = function(error) {
+    console.warn('[content-cache.js] Drive contents cache error', error);
+    return undefined;
+};
+
+/**
+ * Opens an IndexedDB database of the cache, creating its object stores.
+ */
+var open_database = function(name:string):Promise<any> {
+    return new Promise(function(resolve, reject) {
+        if (typeof indexedDB === 'undefined') {
+            reject(new Error('IndexedDB is not available'));
+            return;
+        }
+        var request = indexedDB.open(name, DB_VERSION);
+        request.onupgradeneeded = function() {
+            var db = request.result;
+            db.createObjectStore(ENTRIES, {keyPath: 'id'}).createIndex('used', 'used');
+            db.createObjectStore(CONTENTS, {keyPath: 'id'});
+        };
+        request.onsuccess = function() { resolve(request.result); };
+        request.onerror = function() { reject(request.error); };
+    });
+};
+
+/**
+ * Deletes an IndexedDB database.  If it is open in other windows, it is
+ * deleted once they close it.
+ */
+var delete_database = function(name:string):Promise<any> {
+    return new Promise(function(resolve, reject) {
+        if (typeof indexedDB === 'undefined') {
+            resolve();
+            return;
+        }
+        var request = indexedDB.deleteDatabase(name);
+        request.onsuccess = request.onblocked = function() { resolve(); };
+        request.onerror = function() { reject(request.error); };
+    });
+};
+
+/**
+ * The account whose database was last used, in this or a previous session,
+ * as stored by `remember_account`.
+ */
+var remembered_account = function(name:string):string {
+    try {
+        return localStorage.getItem(name + ':account');
+    } catch (e) {
+        return null;
+    }
+};
+
+var remember_account = function(name:string, account:string) {
+    try {
+        if (account) {
+            localStorage.setItem(name + ':account', account);
+        } else {
+            localStorage.removeItem(name + ':account');
+        }
+    } catch (e) {}
+};
+
+export class ContentCache {
+
+    private _name:string;
+    private _max_size:number;
+    private _db_prm:Promise<any>;
+    private _account:string;
+    private _account_prm:Promise<string>;
+    private _resolve_account:(account:string) => void;
+
+    /**
+     * @param {string?} name Prefix of the names of the IndexedDB databases.
+     * @param {number?} max_size Maximum total size of the cached contents,
+     *     in characters.
+     */
+    constructor(name?:string, max_size?:number) {
+        this._name = name || CONTENT_CACHE_DB_NAME;
+        this._max_size = max_size === undefined ? CONTENT_CACHE_MAX_SIZE : max_size;
+        this._db_prm = null;
+        /**
+         * The account of the cached contents.  Lookups wait for the first
+         * call to `set_account`.
+         */
+        this._account = null;
+        this._account_prm = new Promise((resolve) => {
+            this._resolve_account = resolve;
+        });
+    }
+
+    /**
+     * Sets the Google account of the user, whose database is used from now
+     * on.  The database of the previous account, in this or a previous
+     * session, is deleted.
+     * @param {string} account Identifier of the account, or null if the
+     *     user is not signed in, which disables the cache.
+     * @return {Promise} fullfilled once the database of the previous
+     *     account is deleted.
+     */
+    set_account(account:string):Promise<any> {
+        var name = this._name;
+        var previous:string;
+        var retired:Promise<any> = Promise.resolve(null);
+        if (this._resolve_account !== null) {
+            previous = remembered_account(name);
+            this._resolve_account(account);
+            this._resolve_account = null;
+        } else {
+            previous = this._account;
+            if (previous === account) {
+                return Promise.resolve();
+            }
+            retired = this._db_prm || retired;
+            this._account_prm = Promise.resolve(account);
+            this._db_prm = null;
+        }
+        this._account = account;
+        remember_account(name, account);
+        if (!previous || previous === account) {
+            return Promise.resolve();
+        }
+        return retired.then(function(db) {
+            if (db !== null) {
+                db.close();
+            }
+            return delete_database(name + ':' + previous);
+        }).catch(warn);
+    }
+
+    /**
+     * Deletes the cached contents of the account of the user, who signed
+     * out, and disables the cache until `set_account` is called again.
+     * @return {Promise} fullfilled once the database is deleted.
+     */
+    sign_out():Promise<any> {
+        return this.set_account(null);
+    }
+
+    /**
+     * Opens the database of the account on first use.
+     * @return {Promise} fullfilled with the IDBDatabase, or null if it
+     *     cannot be opened or the account is not known.
+     */
+    private _db():Promise<any> {
+        if (this._db_prm === null) {
+            var name = this._name;
+            this._db_prm = this._account_prm.then(function(account) {
+                if (!account) {
+                    return null;
+                }
+                return open_database(name + ':' + account);
+            }).catch(function(error) {
+                // Not retried: the cache is disabled until the account
+                // changes.
+                warn(error);
+                return null;
+            });
+        }
+        return this._db_prm;
+    }
+
+    /**
+     * Looks up the contents of a revision of a file, and marks them as used.
+     * @param {string} file_id The id of the file.
+     * @param {string} revision The id of the revision, usually the
+     *     `headRevisionId` of the files resource.
+     * @return {Promise} fullfilled with the contents, or undefined if they
+     *     are not cached.
+     */
+    get(file_id:string, revision:string):Promise<string> {
+        if (!revision) {
+            return Promise.resolve(undefined);
+        }
+        return this._db().then(function(db) {
+            if (db === null) {
+                return undefined;
+            }
+            var transaction = db.transaction([ENTRIES, CONTENTS], 'readwrite');
+            var entries = transaction.objectStore(ENTRIES);
+            var contents;
+            entries.get(file_id).onsuccess = function(event) {
+                var entry = event.target.result;
+                if (!entry || entry.revision !== revision) {
+                    return;
+                }
+                entry.used = Date.now();
+                entries.put(entry);
+                transaction.objectStore(CONTENTS).get(file_id).onsuccess = function(event) {
+                    var record = event.target.result;
+                    contents = record && record.contents;
+                };
+            };
+            return transaction_done(transaction).then(function() {
+                return contents;
+            });
+        }).catch(warn);
+    }
+
+    /**
+     * Stores the contents of a revision of a file, replacing the cached
+     * contents of other revisions of the file, and evicts the least recently
+     * used entries until the cache fits its maximum size.
+     * @param {string} file_id The id of the file.
+     * @param {string} revision The id of the revision of these contents.
+     * @param {string} contents The contents of the file, as downloaded.
+     * @return {Promise} fullfilled when the contents are stored.
+     */
+    put(file_id:string, revision:string, contents:string):Promise<any> {
+        var max_size = this._max_size;
+        if (!revision || typeof contents !== 'string' || contents.length > max_size) {
+            return this.forget(file_id);
+        }
+        return this._db().then(function(db) {
+            if (db === null) {
+                return undefined;
+            }
+            var transaction = db.transaction([ENTRIES, CONTENTS], 'readwrite');
+            var entries = transaction.objectStore(ENTRIES);
+            var stored = transaction.objectStore(CONTENTS);
+            entries.put({id: file_id, revision: revision, size: contents.length, used: Date.now()});
+            stored.put({id: file_id, contents: contents});
+            var by_use = [];
+            var total = 0;
+            entries.index('used').openCursor().onsuccess = function(event) {
+                var cursor = event.target.result;
+                if (cursor) {
+                    by_use.push(cursor.value);
+                    total += cursor.value.size;
+                    cursor.continue();
+                    return;
+                }
+                for (var i = 0; total > max_size && i < by_use.length; i++) {
+                    if (by_use[i].id !== file_id) {
+                        total -= by_use[i].size;
+                        entries.delete(by_use[i].id);
+                        stored.delete(by_use[i].id);
+                    }
+                }
+            };
+            return transaction_done(transaction);
+        }).catch(warn);
+    }
+
+    /**
+     * Removes the cached contents of a file.
+     * @param {string} file_id The id of the file.
+     * @return {Promise} fullfilled when the contents are removed.
+     */
+    forget(file_id:string):Promise<any> {
+        return this._db().then(function(db) {
+            if (db === null) {
+                return undefined;
+            }
+            var transaction = db.transaction([ENTRIES, CONTENTS], 'readwrite');
+            transaction.objectStore(ENTRIES).delete(file_id);
+            transaction.objectStore(CONTENTS).delete(file_id);
+            return transaction_done(transaction);
+        }).catch(warn);
+    }
+
+    /**
+     * Removes all the cached contents.
+     * @return {Promise} fullfilled when the cache is empty.
+     */
+    clear():Promise<any> {
+        return this._db().then(function(db) {
+            if (db === null) {
+                return undefined;
+            }
+            var transaction = db.transaction([ENTRIES, CONTENTS], 'readwrite');
+            transaction.objectStore(ENTRIES).clear();
+            transaction.objectStore(CONTENTS).clear();
+            return transaction_done(transaction);
+        }).catch(warn);
+    }
+}
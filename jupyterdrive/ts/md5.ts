@@ -0,0 +1,111 @@
+// Copyright (c) IPython Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+/**
+ * MD5 digest of strings, used to compare contents with the `md5Checksum`
+ * of Google Drive files resources.  Browsers do not provide MD5
+ * (`crypto.subtle` does not support it), hence this implementation of
+ * RFC 1321.
+ */
+
+declare var TextEncoder;
+
+/* Per round shift amounts. */
+var S = [7, 12, 17, 22, 7, 12, 17, 22, 7, 12, 17, 22, 7, 12, 17, 22,
+         5, 9, 14, 20, 5, 9, 14, 20, 5, 9, 14, 20, 5, 9, 14, 20,
+         4, 11, 16, 23, 4, 11, 16, 23, 4, 11, 16, 23, 4, 11, 16, 23,
+         6, 10, 15, 21, 6, 10, 15, 21, 6, 10, 15, 21, 6, 10, 15, 21];
+
+/* Binary integer part of the sines of integers (in radians). */
+var K = [];
+for (var i = 0; i < 64; i++) {
+    K[i] = (Math.abs(Math.sin(i + 1)) * 4294967296) | 0;
+}
+
+/**
+ * Encodes a string as UTF-8, like Drive stores text contents.
+ */
+export var utf8_bytes = function(text:string):Uint8Array {
+    if (typeof TextEncoder !== 'undefined') {
+        return new TextEncoder().encode(text);
+    }
+    var binary = unescape(encodeURIComponent(text));
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return bytes;
+};
+
+/**
+ * MD5 digest of bytes.
+ * @param {Uint8Array} bytes The bytes to digest
+ * @return {string} the digest, as 32 lowercase hexadecimal digits.
+ */
+export var md5_bytes = function(bytes:Uint8Array):string {
+    var length = bytes.length;
+    // Message padded with 0x80, zeros, and the bit length on 64 bits.
+    var padded_length = (((length + 8) >> 6) + 1) << 6;
+    var padded = new Uint8Array(padded_length);
+    padded.set(bytes);
+    padded[length] = 0x80;
+    var bit_length = length * 8;
+    for (var i = 0; i < 8; i++) {
+        padded[padded_length - 8 + i] = (i < 4) ? (bit_length >>> (8 * i)) & 0xff
+                                                : (Math.floor(bit_length / 4294967296) >>> (8 * (i - 4))) & 0xff;
+    }
+
+    var a0 = 0x67452301, b0 = 0xefcdab89, c0 = 0x98badcfe, d0 = 0x10325476;
+    var M = new Array(16);
+    for (var offset = 0; offset < padded_length; offset += 64) {
+        for (var j = 0; j < 16; j++) {
+            var k = offset + 4 * j;
+            M[j] = padded[k] | (padded[k + 1] << 8) | (padded[k + 2] << 16) | (padded[k + 3] << 24);
+        }
+        var a = a0, b = b0, c = c0, d = d0;
+        for (var r = 0; r < 64; r++) {
+            var f, g;
+            if (r < 16) {
+                f = (b & c) | (~b & d);
+                g = r;
+            } else if (r < 32) {
+                f = (d & b) | (~d & c);
+                g = (5 * r + 1) % 16;
+            } else if (r < 48) {
+                f = b ^ c ^ d;
+                g = (3 * r + 5) % 16;
+            } else {
+                f = c ^ (b | ~d);
+                g = (7 * r) % 16;
+            }
+            var t = d;
+            d = c;
+            c = b;
+            var x = (a + f + K[r] + M[g]) | 0;
+            b = (b + ((x << S[r]) | (x >>> (32 - S[r])))) | 0;
+            a = t;
+        }
+        a0 = (a0 + a) | 0;
+        b0 = (b0 + b) | 0;
+        c0 = (c0 + c) | 0;
+        d0 = (d0 + d) | 0;
+    }
+
+    var hex = '';
+    [a0, b0, c0, d0].forEach(function(word) {
+        for (var i = 0; i < 4; i++) {
+            var byte = (word >>> (8 * i)) & 0xff;
+            hex += (byte < 16 ? '0' : '') + byte.toString(16);
+        }
+    });
+    return hex;
+};
+
+/**
+ * MD5 digest of the UTF-8 encoding of a string.
+ * @param {string} text The string to digest
+ * @return {string} the digest, as 32 lowercase hexadecimal digits.
+ */
+export var md5 = function(text:string):string {
+    return md5_bytes(utf8_bytes(text));
+};
@@ -233,6 +233,13 @@ export class MixedContents implements IContents {
             for (var i = 0; i < args.length; i++) {
                 args[i] = this.from_virtual(root, arg_types[i], args[i], this._config.data['mixed_contents']['schema']);
             }
+            if (method_name === 'list_contents' && args[1] && args[1]['on_page']) {
+                // Pages of streamed listings need virtual paths too.
+                var on_page = args[1]['on_page'];
+                args[1] = $.extend({}, args[1], {
+                    'on_page': (page) => on_page(this._to_virtual_list(root, page))
+                });
+            }
             var contents = filesystem[<string>root];
             return contents[method_name].apply(contents, args).then(
                 $.proxy(this._to_virtual, this, root, return_type));